@@ -0,0 +1,100 @@
+"""Benchmark how long it takes to add a task as a task list grows.
+
+Tasks are added to a task list until it reaches each size, and then a batch
+of tasks is added to it, first with no unused IDs below the highest one and
+then after removing as many tasks scattered through the list, whose IDs are
+reused. Finding an ID doesn't depend on the size of the task list, so the
+time per task should stay about the same at every size.
+
+The benchmark fails if adding a task to the largest task list takes much
+longer than adding one to the smallest. Run it from the root of the
+repository:
+
+    python benchmarks/ids.py
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from todo.task import TaskList  # noqa: E402
+
+
+def add_batch(task_list: TaskList, count: int) -> List[int]:
+    """Add tasks to a task list and return their IDs."""
+    return [task_list.add_task("task").task_id for _ in range(count)]
+
+
+def time_batch(task_list: TaskList, count: int) -> float:
+    """Add tasks to a task list and return how many microseconds it took
+    per task."""
+    start = time.perf_counter()
+    add_batch(task_list, count)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main() -> int:
+    """Run the benchmark and return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "-s", "--sizes", type=int, nargs="+",
+        default=[1_000, 10_000, 100_000, 200_000],
+        help="The sizes of the task list to add tasks at."
+    )
+    parser.add_argument(
+        "-b", "--batch", type=int, default=1_000,
+        help="The number of tasks to add at each size."
+    )
+    parser.add_argument(
+        "--max-ratio", type=float, default=3.0,
+        help=(
+            "Fail if adding a task to the largest task list takes more than "
+            "this many times as long as adding one to the smallest."
+        )
+    )
+    args = parser.parse_args()
+
+    generator = random.Random(0)
+    task_list = TaskList("benchmark")
+    ids: List[int] = []
+    results = []
+
+    print(f"{'tasks':>10} {'new IDs':>14} {'reused IDs':>14}")
+    for size in sorted(args.sizes):
+        ids.extend(add_batch(task_list, size - len(ids)))
+
+        appended = time_batch(task_list, args.batch)
+
+        # Free IDs scattered through the task list, then fill them.
+        removed = generator.sample(ids, args.batch)
+        for task_id in removed:
+            task_list.remove_task(task_id)
+        reused = time_batch(task_list, args.batch)
+
+        # Remove the batch added at the end to get back to the size.
+        for task_id in range(size, size + args.batch):
+            task_list.remove_task(task_id)
+
+        results.append((appended, reused))
+        print(f"{size:>10} {appended:>11.2f} us {reused:>11.2f} us")
+
+    failures = []
+    for column, name in enumerate(("new", "reused")):
+        ratio = results[-1][column] / results[0][column]
+        if ratio > args.max_ratio:
+            failures.append(
+                f"Adding a task with a {name} ID got {ratio:.1f} times slower."
+            )
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Benchmark how much memory tasks take.
+
+Memory is measured with `tracemalloc`, which counts the memory allocated by
+Python, for a task list loaded from a file, as the server keeps it. The tasks
+have names, creation dates and some of them descriptions, due dates,
+priorities and tags, like a typical task list. The names are included in the
+memory per task, so how much of it they take is reported too. Run it from
+the root of the repository:
+
+    python benchmarks/memory.py
+
+To compare with an earlier version of the program, copy the script into a
+checkout of that version and run it from there, since it measures the
+package next to it.
+"""
+import argparse
+import datetime
+import random
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from todo.task import TaskList  # noqa: E402
+
+
+def generate(size: int) -> TaskList:
+    """Generate a task list with some of each kind of attribute."""
+    generator = random.Random(0)
+    task_list = TaskList("benchmark")
+    for index in range(size):
+        parent = None
+        if index >= 10 and generator.random() < 0.9:
+            parent = generator.randrange(index)
+        task_list.add_task(
+            f"task {index}", parent=parent,
+            description="a description" if index % 3 == 0 else None,
+            due=(
+                datetime.datetime(2030, 1, 1) if index % 4 == 0 else None
+            ),
+            priority=generator.choice([None, "low", "medium", "high"]),
+            tags=["work"] if index % 5 == 0 else None
+        )
+    return task_list
+
+
+def measure(function: Callable[[], TaskList]) -> int:
+    """Return how many bytes are still allocated for the result of a
+    function once it returns."""
+    tracemalloc.start()
+    try:
+        result = function()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> int:
+    """Run the benchmark and return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "-s", "--size", type=int, default=200_000,
+        help="The number of tasks in the task list."
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "tasks.json"
+        task_list = generate(args.size)
+        task_list.save(path)
+        del task_list
+
+        def load() -> TaskList:
+            with TaskList.load(path, read_only=True) as loaded:
+                return loaded
+
+        loaded = measure(load)
+
+    names = sum(sys.getsizeof(f"task {index}") for index in range(args.size))
+    print(f"{'loaded':10} {loaded / args.size:7.0f} bytes per task")
+    print(f"{'names':10} {names / args.size:7.0f} bytes per task of those")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Benchmark compiled pipelines against running the pipelines in order.
+
+A task list with sub-tasks is generated, and typical combinations of filters
+and sorts are run over all of its tasks at once, and through the formatter,
+which runs them for the sub-tasks of every task. Each combination is run as
+a `MultiPipeline`, which runs the pipelines one after another, and as a
+`CompiledPipeline`, which reorders and fuses them. The indexes of the task
+list aren't used, so every filter checks every task.
+
+The benchmark fails if a compiled pipeline gives a different result. Run it
+from the root of the repository:
+
+    python benchmarks/pipelines.py
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from todo.formatting import SimpleTaskFormatter  # noqa: E402
+from todo.pipelines import (  # noqa: E402
+    CompiledPipeline, CompletionFilter, MultiPipeline, NameSearch, NameSort,
+    PriorityFilter, TaskPipeline
+)
+from todo.task import Task, TaskList  # noqa: E402
+from todo.traversal import walk_preorder  # noqa: E402
+
+# The combinations of pipelines to benchmark, which are created for every run
+# since some pipelines keep state.
+COMBINATIONS: List[Tuple[str, Callable[[], List[TaskPipeline]]]] = [
+    ("3 filters", lambda: [
+        NameSearch(["deploy"]), PriorityFilter("high"), CompletionFilter()
+    ]),
+    ("3 filters, sort", lambda: [
+        NameSearch(["deploy"]), PriorityFilter("high"), CompletionFilter(),
+        NameSort()
+    ]),
+    ("filter, sort, 2 filters", lambda: [
+        CompletionFilter(), NameSort(), PriorityFilter("high"),
+        NameSearch(["deploy"])
+    ]),
+]
+
+
+def best_time(function: Callable[[], object], repeat: int) -> float:
+    """Run a function repeatedly and return the fastest time in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> int:
+    """Run the benchmark and return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "-s", "--size", type=int, default=200_000,
+        help="The number of tasks in the task list."
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=5,
+        help="The number of times to run each combination."
+    )
+    args = parser.parse_args()
+
+    generator = random.Random(0)
+    words = ["deploy", "report", "fix", "write", "call", "plan", "server"]
+    task_list = TaskList("benchmark")
+    for index in range(args.size):
+        parent = None
+        if index >= args.size // 10 and generator.random() < 0.7:
+            parent = generator.randrange(index)
+        task_list.add_task(
+            " ".join(generator.sample(words, 3)), parent=parent,
+            priority=generator.choice(["low", "medium", "high"])
+        )
+        if index % 3 == 0:
+            task_list.check_task(index)
+    tasks = list(walk_preorder(task_list.tasks, lambda task: task.children))
+
+    print(f"{'pipelines':24} {'all tasks':>22} {'formatted':>22}")
+    failures = []
+    for name, create in COMBINATIONS:
+        times = []
+        outputs = []
+        for pipeline_class in (MultiPipeline, CompiledPipeline):
+            def process() -> List[Task]:
+                return list(pipeline_class(create()).process(tasks))
+
+            def format_tasks() -> str:
+                formatter = SimpleTaskFormatter(
+                    pipeline=pipeline_class(create())
+                )
+                return formatter.format(task_list.tasks)
+
+            times.append((
+                best_time(process, args.repeat),
+                best_time(format_tasks, args.repeat)
+            ))
+            outputs.append((process(), format_tasks()))
+
+        (chain_flat, chain_tree), (compiled_flat, compiled_tree) = times
+        print(
+            f"{name:24} {chain_flat * 1000:7.1f} -> "
+            f"{compiled_flat * 1000:7.1f} ms "
+            f"{chain_tree * 1000:7.1f} -> {compiled_tree * 1000:7.1f} ms"
+        )
+        if outputs[0] != outputs[1]:
+            failures.append(f"'{name}' gave a different result compiled.")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Benchmark searching tasks with the text indexes against scanning them.
+
+A task list is generated with names and descriptions made of random words,
+and each search is run over its tasks by checking every task, then with the
+text indexes of the task list, which are built first and timed separately.
+Searches for whole words, for parts of words and for several words at once
+are run, since they are looked up in the index differently.
+
+The benchmark fails if a search finds different tasks with the indexes.
+Run it from the root of the repository:
+
+    python benchmarks/search.py
+"""
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from todo.pipelines import (  # noqa: E402
+    DescriptionSearch, MultiPipeline, NameSearch, RankedSearch, TaskPipeline
+)
+from todo.task import Task, TaskList  # noqa: E402
+
+
+def best_time(
+        function: Callable[[], List[Task]], repeat: int
+) -> Tuple[float, List[Task]]:
+    """Run a function repeatedly and return the fastest time in seconds and
+    the result."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main() -> int:
+    """Run the benchmark and return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "-s", "--size", type=int, default=100_000,
+        help="The number of tasks to search."
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3,
+        help="The number of times to run each search."
+    )
+    args = parser.parse_args()
+
+    generator = random.Random(0)
+    words = sorted({
+        "".join(
+            generator.choice(string.ascii_lowercase)
+            for _ in range(generator.randint(3, 9))
+        )
+        for _ in range(20_000)
+    })
+    generator.shuffle(words)
+
+    task_list = TaskList("benchmark")
+    for _ in range(args.size):
+        task_list.add_task(
+            " ".join(generator.sample(words, generator.randint(3, 6))),
+            description=" ".join(generator.sample(words, 15))
+        )
+    tasks = list(task_list.tasks)
+
+    for attribute in ("name", "description"):
+        start = time.perf_counter()
+        task_list.text_index(attribute)
+        elapsed = time.perf_counter() - start
+        print(f"building the {attribute} index took {elapsed:.2f} s")
+
+    searches: List[Tuple[str, TaskPipeline]] = [
+        ("name, a word", NameSearch([words[0]])),
+        ("name, two words", NameSearch(words[1:3])),
+        ("name, 2 letters", NameSearch([words[3][:2]])),
+        ("name, 4 letters", NameSearch([words[4][:4]])),
+        ("description, a word", DescriptionSearch([words[5]])),
+        ("ranked, two words", RankedSearch(words[6:8])),
+    ]
+
+    print(f"{'search':24} {'scan':>10} {'index':>10} {'tasks':>7}")
+    failures = []
+    for name, pipeline in searches:
+        def search(indexed: bool) -> List[Task]:
+            multi_pipeline = MultiPipeline([pipeline])
+            if indexed:
+                multi_pipeline.plan(task_list)
+            return list(multi_pipeline.process(tasks))
+
+        scan_time, scanned = best_time(lambda: search(False), args.repeat)
+        index_time, found = best_time(lambda: search(True), args.repeat)
+        print(
+            f"{name:24} {scan_time * 1000:>7.1f} ms {index_time * 1000:>7.1f} "
+            f"ms {len(found):>7}"
+        )
+        if found != scanned:
+            failures.append(f"'{name}' found different tasks with the index.")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
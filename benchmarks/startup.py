@@ -0,0 +1,134 @@
+"""Benchmark how long it takes to start each command of the program.
+
+Every command is run repeatedly in a fresh interpreter against a temporary
+task list, and its fastest wall-clock time is compared with the fastest time
+it takes to start an interpreter that does nothing. The fastest times are
+used because noise from other processes only ever makes a run slower. The
+modules each command imports are found with `python -X importtime`.
+
+The benchmark fails if a command takes longer than its threshold on top of
+the interpreter's own start-up time, or if it imports a module it shouldn't
+need. Run it from the root of the repository:
+
+    python benchmarks/startup.py
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The arguments of each command to benchmark, the maximum number of
+# milliseconds it may take on top of starting the interpreter, and modules it
+# must not import.
+COMMANDS: List[Tuple[List[str], float, Set[str]]] = [
+    (["--help"], 40, {"todo.task", "todo.storage", "json"}),
+    (["list"], 60, {"sqlite3", "threading", "asyncio"}),
+    (["list", "-s", "name", "-f", "incomplete"], 60, {"sqlite3", "asyncio"}),
+    (["add", "task"], 50, {"todo.pipelines", "todo.formatting", "asyncio"}),
+    (["check", "0"], 50, {"todo.pipelines", "todo.formatting", "asyncio"}),
+    (["uncheck", "0"], 50, {"todo.pipelines", "todo.formatting", "asyncio"}),
+    (["modify", "0", "-n", "renamed"], 50, {"todo.pipelines", "asyncio"}),
+    (["info", "0", "False"], 50, {"sqlite3", "asyncio"}),
+    (["history"], 50, {"todo.pipelines", "todo.formatting", "asyncio"}),
+]
+
+
+def run(arguments: List[str], environment: Dict[str, str]) -> float:
+    """Run a command and return how many milliseconds it took."""
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, *arguments], env=environment, cwd=ROOT,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def imported_modules(
+        arguments: List[str], environment: Dict[str, str]
+) -> Tuple[Set[str], float]:
+    """Return the modules imported by a command and how many milliseconds it
+    took to import the modules of the program, including their imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *arguments], env=environment,
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        text=True, check=False
+    )
+    modules = set()
+    todo_time = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.add(name.strip())
+
+        # Modules imported at the top level are indented by one space, and
+        # their cumulative time includes the modules they import.
+        if name.startswith(" todo"):
+            todo_time += int(cumulative) / 1000
+    return modules, todo_time
+
+
+def main() -> int:
+    """Run the benchmark and return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=21,
+        help="The number of times to run each command."
+    )
+    parser.add_argument(
+        "--scale", type=float, default=1.0,
+        help="Multiply the thresholds by this, e.g. on slow machines."
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        environment = dict(
+            os.environ, HOME=home, PYTHONPATH=str(ROOT),
+            TODO_LIST_PATH=str(Path(home) / "default.json")
+        )
+        # Compile the modules up front, as an installed package would be.
+        subprocess.run(
+            [sys.executable, "-m", "compileall", "-q", str(ROOT / "todo")],
+            check=True
+        )
+        for index in range(20):
+            run(["-m", "todo", "add", f"task {index}"], environment)
+
+        baseline = min(
+            run(["-c", "pass"], environment) for _ in range(args.repeat)
+        )
+        print(f"{'interpreter':40} {baseline:7.1f} ms")
+
+        failures = []
+        for arguments, threshold, forbidden in COMMANDS:
+            command = ["-m", "todo", *arguments]
+            overhead = min(
+                run(command, environment) for _ in range(args.repeat)
+            ) - baseline
+            modules, todo_time = imported_modules(command, environment)
+
+            name = " ".join(arguments)
+            print(
+                f"{name:40} {overhead:+7.1f} ms "
+                f"(limit {threshold * args.scale:.0f} ms, "
+                f"imports {todo_time:.1f} ms)"
+            )
+
+            if overhead > threshold * args.scale:
+                failures.append(f"'{name}' took {overhead:.1f} ms.")
+            for module in sorted(forbidden.intersection(modules)):
+                failures.append(f"'{name}' imported {module}.")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
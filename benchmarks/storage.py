@@ -0,0 +1,115 @@
+"""Benchmark how long each storage backend takes to save and load task lists.
+
+For each size, a task list of that many tasks is generated, with sub-tasks,
+descriptions, priorities and tags, and saved with every backend. It is then
+loaded in full, as the server and bulk commands do, and lazily with a single
+task looked up, as most commands do. The fastest of several runs is reported
+along with the size on disk, including any files kept next to the task list.
+
+Large sizes take a while and need a lot of memory. Run it from the root of
+the repository:
+
+    python benchmarks/storage.py --sizes 10000 100000
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from todo.task import TaskList  # noqa: E402
+
+# The file extensions of the backends to benchmark.
+EXTENSIONS = (".json", ".bin", ".db", ".shards")
+
+
+def generate(size: int) -> TaskList:
+    """Generate a task list with some of each kind of attribute."""
+    generator = random.Random(0)
+    task_list = TaskList("benchmark")
+    for index in range(size):
+        # About a tenth of the tasks are top-level tasks.
+        parent = None
+        if index >= 10 and generator.random() < 0.9:
+            parent = generator.randrange(index)
+        task_list.add_task(
+            f"task {index}", parent=parent,
+            description="a description" if index % 3 == 0 else None,
+            priority=generator.choice([None, "low", "medium", "high"]),
+            tags=["work"] if index % 5 == 0 else None
+        )
+    return task_list
+
+
+def best_time(function: Callable[[], None], repeat: int) -> float:
+    """Run a function repeatedly and return the fastest time in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def disk_size(path: Path) -> int:
+    """Return the size in bytes of a task list and the files next to it."""
+    paths = [path, *path.parent.glob(f"{path.name}.*")]
+    if path.is_dir():
+        paths.extend(path.iterdir())
+    return sum(
+        path.stat().st_size for path in paths
+        if path.is_file() and path.suffix != ".lock"
+    )
+
+
+def main() -> int:
+    """Run the benchmark and return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "-s", "--sizes", type=int, nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="The numbers of tasks in the task lists to benchmark."
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3,
+        help="The number of times to save and load each task list."
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'tasks':>9} {'format':8} {'save':>11} {'load':>11} "
+        f"{'lookup':>11} {'size':>10}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            task_list = generate(size)
+            task_id = size // 2
+
+            for extension in EXTENSIONS:
+                path = Path(directory) / f"{size}{extension}"
+
+                def load(lazy: bool) -> None:
+                    with TaskList.load(
+                            path, read_only=True, lazy=lazy
+                    ) as loaded:
+                        loaded.get_task(task_id)
+
+                save = best_time(lambda: task_list.save(path), args.repeat)
+                full = best_time(lambda: load(False), args.repeat)
+                lookup = best_time(lambda: load(True), args.repeat)
+                print(
+                    f"{size:>9} {extension:8} {save * 1000:>8.0f} ms "
+                    f"{full * 1000:>8.0f} ms {lookup * 1000:>8.1f} ms "
+                    f"{disk_size(path) / 1e6:>7.1f} MB"
+                )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
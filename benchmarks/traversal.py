@@ -0,0 +1,183 @@
+"""Benchmark walking, saving, loading and listing deep and wide task trees.
+
+Three task lists are generated: a wide one with random parents, a deep one
+made of long chains of sub-tasks, and a single chain nested more deeply than
+the recursion limit. Walking each of them in pre-order and post-order with
+`todo.traversal`, which keeps an explicit stack, is compared with walking
+them with recursive generators, which is how tasks used to be walked and
+which fails on the deepest chain. Each task list is then saved and loaded
+with every backend, and listed like `todo list` does, lazily loaded.
+
+The benchmark fails if saving, loading or listing a task list fails, such as
+by running out of stack. Run it from the root of the repository:
+
+    python benchmarks/traversal.py
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from todo.formatting import SimpleTaskFormatter  # noqa: E402
+from todo.task import Task, TaskList  # noqa: E402
+from todo.traversal import walk_postorder, walk_preorder  # noqa: E402
+
+# The file extensions of the backends to benchmark.
+EXTENSIONS = (".json", ".bin", ".db")
+
+
+def recursive_preorder(tasks: Iterable[Task]) -> Iterator[Task]:
+    """Walk tasks in pre-order with a generator per level."""
+    for task in tasks:
+        yield task
+        yield from recursive_preorder(task.children)
+
+
+def recursive_postorder(tasks: Iterable[Task]) -> Iterator[Task]:
+    """Walk tasks in post-order with a generator per level."""
+    for task in tasks:
+        yield from recursive_postorder(task.children)
+        yield task
+
+
+def generate_wide(size: int) -> TaskList:
+    """Generate a task list whose tasks have random parents."""
+    generator = random.Random(0)
+    task_list = TaskList("wide")
+    for index in range(size):
+        parent = None
+        if index >= 10 and generator.random() < 0.9:
+            parent = generator.randrange(index)
+        task_list.add_task(f"task {index}", parent=parent)
+    return task_list
+
+
+def generate_chains(count: int, depth: int) -> TaskList:
+    """Generate a task list of chains of tasks, each the only sub-task of the
+    one before it."""
+    task_list = TaskList("deep")
+    for _ in range(count):
+        parent = None
+        for index in range(depth):
+            parent = task_list.add_task(f"task {index}", parent=parent).task_id
+    return task_list
+
+
+def best_time(function: Callable[[], object], repeat: int) -> Optional[float]:
+    """Run a function repeatedly and return the fastest time in seconds, or
+    None if it runs out of stack."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            function()
+        except RecursionError:
+            return None
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def describe(seconds: Optional[float]) -> str:
+    """Format a time from `best_time`."""
+    return "RecursionError" if seconds is None else f"{seconds * 1000:.0f} ms"
+
+
+def main() -> int:
+    """Run the benchmark and return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "-s", "--size", type=int, default=50_000,
+        help="The number of tasks in the wide and deep task lists."
+    )
+    parser.add_argument(
+        "-d", "--depth", type=int, default=500,
+        help="The depth of the chains in the deep task list."
+    )
+    parser.add_argument(
+        "-c", "--chain", type=int, default=3_000,
+        help=(
+            "The depth of the single chain, which should be more than the "
+            "recursion limit."
+        )
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3,
+        help="The number of times to run each operation."
+    )
+    args = parser.parse_args()
+
+    task_lists: List[Tuple[str, TaskList]] = [
+        ("wide", generate_wide(args.size)),
+        ("deep", generate_chains(args.size // args.depth, args.depth)),
+        ("chain", generate_chains(1, args.chain)),
+    ]
+
+    print(f"{'tree':8} {'walk':12} {'recursive':>16} {'explicit stack':>16}")
+    for name, task_list in task_lists:
+        tasks = task_list.tasks
+        walks = [
+            ("pre-order", recursive_preorder, lambda tasks: walk_preorder(
+                tasks, lambda task: task.children
+            )),
+            ("post-order", recursive_postorder, lambda tasks: walk_postorder(
+                tasks, lambda task: task.children
+            )),
+        ]
+        for walk_name, recursive, iterative in walks:
+            recursive_time = best_time(
+                lambda: sum(1 for _ in recursive(tasks)), args.repeat
+            )
+            iterative_time = best_time(
+                lambda: sum(1 for _ in iterative(tasks)), args.repeat
+            )
+            print(
+                f"{name:8} {walk_name:12} {describe(recursive_time):>16} "
+                f"{describe(iterative_time):>16}"
+            )
+
+    print()
+    print(f"{'tree':8} {'format':8} {'save':>16} {'load':>16} {'list':>16}")
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, task_list in task_lists:
+            for extension in EXTENSIONS:
+                path = Path(directory) / f"{name}{extension}"
+
+                def load() -> None:
+                    with TaskList.load(path, read_only=True):
+                        pass
+
+                def list_tasks() -> None:
+                    with TaskList.load(
+                            path, read_only=True, lazy=True
+                    ) as loaded:
+                        SimpleTaskFormatter().format(loaded.tasks)
+
+                times = [
+                    best_time(lambda: task_list.save(path), args.repeat),
+                    best_time(load, args.repeat),
+                    best_time(list_tasks, args.repeat)
+                ]
+                print(
+                    f"{name:8} {extension:8} "
+                    + " ".join(f"{describe(seconds):>16}" for seconds in times)
+                )
+                if None in times:
+                    failures.append(
+                        f"The {name} task list ran out of stack with "
+                        f"{extension}."
+                    )
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Test that concurrent commands don't lose each other's changes.
+
+Several processes add tasks to the same task list at once, each loading and
+saving it once per task like separate invocations of the program, for every
+storage backend. Every task must be in the task list afterwards, under the
+ID it was given when it was added. Run the tests from the root of the
+repository:
+
+    python -m unittest discover tests
+"""
+import multiprocessing
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List, Tuple
+
+from todo.task import TaskList
+
+# The file extensions of the backends to test.
+EXTENSIONS = (".json", ".bin", ".db", ".shards")
+
+# The number of processes adding tasks and the number each of them adds.
+WORKERS = 8
+TASKS_PER_WORKER = 25
+
+
+def add_tasks(path: str, worker: int) -> List[Tuple[int, str]]:
+    """Add tasks to a task list one command at a time.
+
+    Every other worker loads the task list lazily, like most commands do.
+
+    Returns:
+        The ID and name of every task that was added.
+    """
+    added = []
+    for index in range(TASKS_PER_WORKER):
+        name = f"worker {worker}, task {index}"
+        with TaskList.load(Path(path), lazy=worker % 2 == 1) as task_list:
+            added.append((task_list.add_task(name).task_id, name))
+    return added
+
+
+class ConcurrentAddTest(unittest.TestCase):
+    """Tests of adding tasks from several processes at once."""
+
+    def test_no_tasks_lost(self) -> None:
+        for extension in EXTENSIONS:
+            with self.subTest(extension=extension), \
+                    tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / f"tasks{extension}"
+                TaskList("concurrent").save(path)
+
+                with multiprocessing.Pool(WORKERS) as pool:
+                    results = pool.starmap(
+                        add_tasks,
+                        [(str(path), worker) for worker in range(WORKERS)]
+                    )
+                added = dict(task for result in results for task in result)
+
+                # Every task got its own ID, and kept it.
+                self.assertEqual(len(added), WORKERS * TASKS_PER_WORKER)
+                with TaskList.load(path, read_only=True) as task_list:
+                    saved = {
+                        task.task_id: task.name for task in task_list.tasks
+                    }
+                self.assertEqual(saved, added)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,226 @@
+"""Test that every storage backend loads the tasks it saved.
+
+A task list with sub-tasks and every kind of attribute is saved with each
+storage backend, and the same changes are made to it in several ways. Loading
+it lazily must give the same tasks as loading it in full, and replaying its
+journal must give the same tasks as the changes did in memory. Run the tests
+from the root of the repository:
+
+    python -m unittest discover tests
+"""
+import datetime
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any, Iterable, List, Tuple
+
+from todo.storage import Journal
+from todo.task import Task, TaskList
+from todo.traversal import walk_preorder
+
+# The file extensions of the backends to test.
+EXTENSIONS = (".json", ".bin", ".db", ".shards")
+
+
+def describe(
+        tasks: Iterable[Task], created: bool = True
+) -> List[Tuple[Any, ...]]:
+    """Return every attribute of tasks and of their sub-tasks, in order.
+
+    Args:
+        tasks: The tasks to describe.
+        created: Whether to include when the tasks were created, which
+            differs between tasks added by separate calls to `change`.
+    """
+    return [
+        (
+            task.task_id, task.name, task.completed,
+            task.created_timestamp if created else None, task.due_timestamp,
+            task.description, task.priority, tuple(task.tags), task.parent,
+            task.descendant_count, task.incomplete_descendant_count,
+            describe(task.children, created)
+        )
+        for task in tasks
+    ]
+
+
+def generate() -> TaskList:
+    """Generate a task list with some of each kind of attribute and a gap in
+    its IDs."""
+    task_list = TaskList("storage")
+    for index in range(5):
+        task_list.add_task(
+            f"task {index}", description=f"description {index}",
+            due=datetime.datetime(2030, 1, index + 1) if index % 2 else None,
+            priority=[None, "low", "medium", "high"][index % 4],
+            tags=["work", "home"][:index % 3]
+        )
+
+    # Sub-tasks, and a chain of them, under the first three tasks.
+    for parent in range(3):
+        for index in range(3):
+            task_list.add_task(f"sub-task {index}", parent=parent)
+    parent = 1
+    for index in range(4):
+        parent = task_list.add_task(f"nested {index}", parent=parent).task_id
+
+    task_list.check_task(0)
+    task_list.check_task(6)
+    task_list.remove_task(8)
+    return task_list
+
+
+def change(task_list: TaskList) -> None:
+    """Make one of each kind of change to a task list from `generate`."""
+    task_list.add_task("new task", tags=["errands"])
+    parent = task_list.add_task("new sub-task", parent=1)
+    task_list.add_task(
+        "new nested sub-task", parent=parent.task_id,
+        due=datetime.datetime(2031, 2, 3)
+    )
+    task_list.check_task(9)
+    task_list.uncheck_task(0)
+    task_list.modify_task(
+        3, name="renamed", description="changed", priority="low",
+        tag="urgent"
+    )
+    task_list.remove_task(2)
+    task_list.add_task("reuses an ID", parent=4)
+
+
+def load(
+        path: Path, lazy: bool = False, created: bool = True
+) -> List[Tuple[Any, ...]]:
+    """Load a task list without changing it and describe its tasks."""
+    with TaskList.load(path, read_only=True, lazy=lazy) as task_list:
+        return describe(task_list.tasks, created)
+
+
+class LazyLoadTest(unittest.TestCase):
+    """Tests that lazily loaded task lists have the same tasks."""
+
+    def test_tasks(self) -> None:
+        for extension in EXTENSIONS:
+            with self.subTest(extension=extension), \
+                    tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / f"tasks{extension}"
+                generate().save(path)
+                self.assertEqual(load(path, lazy=True), load(path))
+
+                # Changes saved to the journal or applied in place.
+                with TaskList.load(path) as task_list:
+                    change(task_list)
+                self.assertEqual(load(path, lazy=True), load(path))
+
+    def test_lookups(self) -> None:
+        for extension in EXTENSIONS:
+            with self.subTest(extension=extension), \
+                    tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / f"tasks{extension}"
+                generate().save(path)
+                with TaskList.load(path) as task_list:
+                    change(task_list)
+
+                with TaskList.load(path, read_only=True) as task_list:
+                    tasks = {
+                        task.task_id: describe([task])
+                        for task in walk_preorder(
+                            task_list.tasks, lambda task: task.children
+                        )
+                    }
+                # The ID of the task removed by `generate` was reused.
+                self.assertIn(8, tasks)
+
+                # Each task is looked up first in its own task list, since
+                # looking up tasks builds some of the others.
+                for task_id in range(25):
+                    with TaskList.load(
+                            path, read_only=True, lazy=True
+                    ) as task_list:
+                        if task_id in tasks:
+                            self.assertEqual(
+                                describe([task_list.get_task(task_id)]),
+                                tasks[task_id]
+                            )
+                        else:
+                            with self.assertRaises(KeyError):
+                                task_list.get_task(task_id)
+
+    def test_changes(self) -> None:
+        for extension in EXTENSIONS:
+            with self.subTest(extension=extension), \
+                    tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / f"tasks{extension}"
+                generate().save(path)
+
+                with TaskList.load(path, read_only=True) as task_list:
+                    change(task_list)
+                    expected = describe(task_list.tasks, created=False)
+
+                with TaskList.load(path, lazy=True) as task_list:
+                    change(task_list)
+                    self.assertEqual(
+                        describe(task_list.tasks, created=False), expected
+                    )
+                self.assertEqual(load(path, created=False), expected)
+
+
+class JournalReplayTest(unittest.TestCase):
+    """Tests of replaying the journal of a task list when loading it."""
+
+    def test_replay(self) -> None:
+        for extension in EXTENSIONS:
+            with self.subTest(extension=extension), \
+                    tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / f"tasks{extension}"
+                generate().save(path)
+
+                with TaskList.load(path, read_only=True) as task_list:
+                    change(task_list)
+                    expected = describe(task_list.tasks)
+                    changes = list(task_list.changes)
+
+                # The backends that can apply changes in place still replay
+                # changes left in the journal, e.g. by a server rolling back.
+                Journal(path).append(changes)
+                self.assertEqual(load(path), expected)
+                self.assertEqual(load(path, lazy=True), expected)
+
+    def test_replay_over_newer_snapshot(self) -> None:
+        for extension in EXTENSIONS:
+            with self.subTest(extension=extension), \
+                    tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / f"tasks{extension}"
+                generate().save(path)
+
+                # The snapshot already includes the changes, as when saving
+                # stops before clearing the journal.
+                with TaskList.load(path, read_only=True) as task_list:
+                    change(task_list)
+                    expected = describe(task_list.tasks)
+                    changes = list(task_list.changes)
+                    task_list.save(path)
+
+                Journal(path).append(changes)
+                self.assertEqual(load(path), expected)
+                self.assertEqual(load(path, lazy=True), expected)
+
+    def test_compaction(self) -> None:
+        for extension in EXTENSIONS:
+            with self.subTest(extension=extension), \
+                    tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / f"tasks{extension}"
+                generate().save(path)
+                with TaskList.load(path) as task_list:
+                    change(task_list)
+                expected = load(path)
+
+                with TaskList.load(path, read_only=True) as task_list:
+                    task_list.save(path)
+                self.assertEqual(Journal(path).size(), 0)
+                self.assertEqual(load(path), expected)
+                self.assertEqual(load(path, lazy=True), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
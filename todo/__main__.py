@@ -1,92 +1,58 @@
 """The main function of the program."""
-from todo.cli import parser
-from todo.commands import (
-    list_tasks, add_task, delete_task, check_task, modify_task, show_info,
-    remove_all_tasks, uncheck_task
+import sys
+from pathlib import Path
+
+from todo.cli import COMMANDS, build_parser
+from todo.constants import (
+    DEFAULT_LIST_PATH, DEFAULT_LIST_NAME, SERVER_SOCKET_PATH
 )
-from todo.constants import DEFAULT_LIST_PATH, DEFAULT_LIST_NAME
-from todo.pipelines import (
-    NameSort, CreationTimeSort, CompletionFilter, PriorityFilter,
-    MultiPipeline,
-    NameSearch, DescriptionSearch)
-from todo.task import TaskList
 
 
 def main():
     """Run the program."""
-    # Create the default task list if it doesn't already exist.
-    if not DEFAULT_LIST_PATH.exists():
-        task_list = TaskList(DEFAULT_LIST_NAME)
-        task_list.save(DEFAULT_LIST_PATH)
-
     # Parse arguments and run the appropriate function based on which command
-    # was called.
-    args = parser.parse_args()
-
-    if args.command == "list":
-        pipelines = []
-        if "name" in args.sort:
-            pipelines.append(NameSort())
-        if "created" in args.sort:
-            pipelines.append(CreationTimeSort(reverse=True))
-        if "complete" in args.filter:
-            pipelines.append(CompletionFilter(completed=True))
-        if "incomplete" in args.filter:
-            pipelines.append(CompletionFilter(completed=False))
-        if "high" in args.priority:
-            pipelines.append(PriorityFilter(priority='high'))
-        if "medium" in args.priority:
-            pipelines.append(PriorityFilter(priority='medium'))
-        if "low" in args.priority:
-            pipelines.append(PriorityFilter(priority='low'))
-
-        if args.name:
-            pipelines.append(NameSearch(names=args.name))
-
-        if args.description:
-            pipelines.append(DescriptionSearch(descriptions=args.description))
-
-        list_tasks(
-            levels=args.levels, info=args.info,
-            pipeline=MultiPipeline(pipelines)
-        )
-
-    elif args.command == "add":
-        add_task(
-            name=args.name, parent_id=args.parent,
-            description=args.description, due=args.due,
-            priority=args.priority, tags=args.tags
-        )
-
-    elif args.command == "delete":
-        for item in args.id:
-            delete_task(item)
+    # was called. Only the parser of that command is built if it's the first
+    # argument, otherwise they all are so that help lists every command.
+    arguments = sys.argv[1:]
+    command = next(iter(arguments), None)
+    if command not in COMMANDS:
+        command = None
+    parser = build_parser(command)
+    args = parser.parse_args(arguments)
+
+    if args.command is None:
+        parser.print_help()
+        return
 
-    elif args.command == "check":
-        for item in args.id:
-            check_task(item)
+    # Let the server run the command on the task list it keeps in memory if
+    # one is running. Otherwise, the command is run on the task list file.
+    if args.command != "serve" and SERVER_SOCKET_PATH.exists():
+        from todo.client import send_command
 
-    elif args.command == "uncheck":
-        for item in args.id:
-            uncheck_task(item)
+        if send_command(arguments, Path.cwd()):
+            return
 
-    elif args.command == "info":
-        if args.children == "True":
-            show_info(args.id, True)
-        else:
-            show_info(args.id, False)
+    # The rest of the program is only imported once a command is known to be
+    # run, and the modules only some commands need are imported by them.
+    from todo.commands import run_command
+    from todo.storage import lock
+    from todo.task import TaskList
 
-    elif args.command == "modify":
-        modify_task(
-            task_id=args.id, name=args.name, description=args.description,
-            due=args.due, priority=args.priority, tag=args.tag
-        )
+    # Create the default task list if it doesn't already exist. The check is
+    # repeated while holding the lock so that a list created by another
+    # process in the meantime isn't overwritten.
+    if not DEFAULT_LIST_PATH.exists():
+        with lock(DEFAULT_LIST_PATH):
+            if not DEFAULT_LIST_PATH.exists():
+                task_list = TaskList(DEFAULT_LIST_NAME)
+                task_list.save(DEFAULT_LIST_PATH)
 
-    elif args.command == "clear":
-        remove_all_tasks()
+    if args.command == "serve":
+        from todo.server import serve
 
+        serve(DEFAULT_LIST_PATH)
     else:
-        parser.print_help()
+        run_command(args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,366 @@
+"""Importing and exporting tasks in bulk as JSONL or CSV records.
+
+Each task is a flat record with the fields in `FIELDS`. The parent of a task
+is referred to by its ID, and dates are POSIX timestamps as in task list
+files. In JSONL, every line is a JSON object with these fields. In CSV, the
+first row names the columns, empty cells are missing values and tags are
+written as a JSON array, since they can contain commas. Tags separated by
+commas are also read, for files written by hand.
+
+Records are read and written one at a time, so files of any size are streamed
+in constant memory on top of the task list itself. Exported tasks always come
+after their parents, but imported ones don't have to.
+"""
+import contextlib
+import csv
+import json
+import math
+import operator
+import sys
+from pathlib import Path
+from typing import (
+    Any, Callable, Dict, Generator, IO, Iterable, Iterator, List, Optional,
+    Tuple
+)
+
+from todo.task import Task, TaskList
+from todo.traversal import walk_preorder
+
+# The fields of a task record, in the order they are written.
+FIELDS = (
+    "id", "parent", "name", "completed", "created", "due", "description",
+    "priority", "tags"
+)
+
+# The types that the optional fields of a record must have, if they're given.
+_FIELD_TYPES: Dict[str, Tuple[type, ...]] = {
+    "id": (int,),
+    "parent": (int,),
+    "completed": (bool,),
+    "created": (int, float),
+    "due": (int, float),
+    "description": (str,),
+    "priority": (str,),
+    "tags": (list,),
+}
+
+# The formats records can be read and written in, by the file extensions that
+# choose them.
+FORMATS = {".jsonl": "jsonl", ".csv": "csv"}
+
+# The number of tasks to add to the task list at a time when importing.
+BATCH_SIZE = 10000
+
+# The function returning the sub-tasks of a task.
+_get_children = operator.attrgetter("children")
+
+
+def get_format(path: Path, format_name: Optional[str] = None) -> str:
+    """Return the format to read or write records from a path in.
+
+    Args:
+        path: The path of the file, or "-" for standard input or output.
+        format_name: The format to use, or None to choose it based on the
+            extension of the path. Standard input and output default to JSONL.
+
+    Throws:
+        ValueError: The format can't be chosen based on the path.
+    """
+    if format_name is not None:
+        return format_name
+    if str(path) == "-":
+        return "jsonl"
+
+    try:
+        return FORMATS[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Can't tell the format of '{path}' from its extension. Use "
+            f"--format to choose one."
+        )
+
+
+@contextlib.contextmanager
+def open_records(path: Path, mode: str) -> Generator[IO[str], None, None]:
+    """Open a file to read or write records, or standard input or output.
+
+    Args:
+        path: The path of the file, or "-" for standard input or output.
+        mode: "r" to read the file or "w" to write it.
+    """
+    if str(path) == "-":
+        yield sys.stdin if mode == "r" else sys.stdout
+        return
+
+    # The csv module handles line endings itself.
+    with path.open(mode, newline="", encoding="utf-8") as file:
+        yield file
+
+
+def export_records(task_list: TaskList) -> Iterator[Dict[str, Any]]:
+    """Return a generator for the records of every task in a task list.
+
+    Every task comes after its parent, so importing the records doesn't need
+    to hold any of them back.
+    """
+    for task in walk_preorder(task_list.tasks, _get_children):
+        yield {
+            "id": task.task_id,
+            "parent": task.parent,
+            "name": task.name,
+            "completed": task.completed,
+            "created": task.created_timestamp,
+            "due": task.due_timestamp,
+            "description": task.description,
+            "priority": task.priority,
+            "tags": list(task.tags)
+        }
+
+
+def write_records(
+        records: Iterable[Dict[str, Any]], file: IO[str], format_name: str
+) -> int:
+    """Write records to a file and return how many there were.
+
+    Args:
+        records: The records to write.
+        file: The file to write them to.
+        format_name: The format to write them in, "jsonl" or "csv".
+    """
+    count = 0
+
+    if format_name == "csv":
+        writer = csv.writer(file)
+        writer.writerow(FIELDS)
+        for record in records:
+            writer.writerow([
+                "" if record["id"] is None else record["id"],
+                "" if record["parent"] is None else record["parent"],
+                record["name"],
+                "true" if record["completed"] else "false",
+                record["created"],
+                "" if record["due"] is None else record["due"],
+                record["description"],
+                record["priority"] or "",
+                json.dumps(record["tags"]) if record["tags"] else ""
+            ])
+            count += 1
+    else:
+        for record in records:
+            file.write(json.dumps(record))
+            file.write("\n")
+            count += 1
+
+    return count
+
+
+def read_records(
+        file: IO[str], format_name: str
+) -> Iterator[Dict[str, Any]]:
+    """Return a generator for the records in a file.
+
+    Args:
+        file: The file to read the records from.
+        format_name: The format the records are in, "jsonl" or "csv".
+
+    Throws:
+        ValueError: The file isn't in the format.
+    """
+    if format_name == "csv":
+        yield from _read_csv(file)
+        return
+
+    for line_number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise ValueError(f"Line {line_number} isn't valid JSON.")
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {line_number} isn't a JSON object.")
+        yield record
+
+
+def _read_csv(file: IO[str]) -> Iterator[Dict[str, Any]]:
+    """Return a generator for the records in a CSV file."""
+    reader = csv.DictReader(file)
+    if reader.fieldnames is None or "name" not in reader.fieldnames:
+        raise ValueError(
+            "The first row must name the columns, including 'name'."
+        )
+
+    for row in reader:
+        tags = _parse_tags(row.get("tags") or "", reader.line_num)
+        try:
+            yield {
+                "id": _parse_optional(row.get("id"), int),
+                "parent": _parse_optional(row.get("parent"), int),
+                "name": row["name"],
+                "completed": (row.get("completed") or "").lower() in (
+                    "true", "1"
+                ),
+                "created": _parse_optional(row.get("created"), float),
+                "due": _parse_optional(row.get("due"), float),
+                "description": row.get("description"),
+                "priority": row.get("priority") or None,
+                "tags": tags
+            }
+        except ValueError:
+            raise ValueError(f"Row {reader.line_num} has an invalid number.")
+
+
+def _parse_tags(text: str, line_number: int) -> List[str]:
+    """Parse the tags in a CSV cell, either as a JSON array or separated by
+    commas."""
+    if not text.startswith("["):
+        return [tag for tag in text.split(",") if tag]
+
+    try:
+        tags = json.loads(text)
+    except ValueError:
+        tags = None
+    if not isinstance(tags, list) or not all(
+            isinstance(tag, str) for tag in tags
+    ):
+        raise ValueError(
+            f"Row {line_number} has tags that aren't a JSON array of strings."
+        )
+    return tags
+
+
+def _parse_optional(
+        text: Optional[str], parse: Callable[[str], Any]
+) -> Any:
+    """Parse the text of a CSV cell, or return None if it's empty."""
+    return parse(text) if text else None
+
+
+def import_records(
+        task_list: TaskList, records: Iterable[Dict[str, Any]]
+) -> Tuple[int, int]:
+    """Add the tasks in records to a task list, giving them new IDs.
+
+    The tasks are added in batches of `BATCH_SIZE`. A task that comes before
+    its parent is held back until its parent has been added.
+
+    Args:
+        task_list: The task list to add the tasks to.
+        records: The records of the tasks to add.
+
+    Returns:
+        How many tasks were added, and how many were skipped because their
+        parent isn't in the records.
+
+    Throws:
+        ValueError: A record is invalid or two of them have the same ID.
+    """
+    # The new IDs of the added tasks by the IDs in the records.
+    ids: Dict[int, int] = {}
+
+    # The IDs in the records of every task so far, and of the tasks that have
+    # been accepted, either added or in the current batch.
+    seen = set()
+    accepted = set()
+
+    # The tasks held back until their parent is accepted, by their parent's
+    # ID in the records.
+    waiting: Dict[int, List[Task]] = {}
+
+    batch: List[Task] = []
+    count = 0
+
+    for record_number, record in enumerate(records, 1):
+        task = _record_to_task(record, record_number)
+
+        if task.task_id is not None:
+            if task.task_id in seen:
+                raise ValueError(
+                    f"More than one task has the ID {task.task_id}."
+                )
+            seen.add(task.task_id)
+
+        if task.parent is not None and task.parent not in accepted:
+            waiting.setdefault(task.parent, []).append(task)
+            continue
+
+        # Accept the task and any tasks that were waiting for it, parents
+        # first.
+        if task.task_id in waiting:
+            for accepted_task in walk_preorder([task], _pop_waiting(waiting)):
+                if accepted_task.task_id is not None:
+                    accepted.add(accepted_task.task_id)
+                batch.append(accepted_task)
+        else:
+            if task.task_id is not None:
+                accepted.add(task.task_id)
+            batch.append(task)
+
+        if len(batch) >= BATCH_SIZE:
+            task_list.add_tasks(batch, ids)
+            count += len(batch)
+            batch = []
+
+    task_list.add_tasks(batch, ids)
+    count += len(batch)
+
+    # The tasks still waiting are the ones whose parent never came, and their
+    # descendants.
+    skipped = sum(len(tasks) for tasks in waiting.values())
+    return count, skipped
+
+
+def _record_to_task(record: Dict[str, Any], record_number: int) -> Task:
+    """Build a task from a record, keeping the IDs in it."""
+    name = record.get("name")
+    if not isinstance(name, str):
+        raise ValueError(f"Task {record_number} doesn't have a name.")
+
+    # Check the types of the fields that `Task` would store as they are, so
+    # that an invalid record is rejected now rather than saved.
+    for field, types in _FIELD_TYPES.items():
+        value = record.get(field)
+        if value is not None and not _has_type(value, types):
+            raise ValueError(
+                f"Task {record_number} has an invalid '{field}' field."
+            )
+    tags = record.get("tags")
+    if tags is not None and not all(isinstance(tag, str) for tag in tags):
+        raise ValueError(f"Task {record_number} has an invalid 'tags' field.")
+
+    try:
+        return Task(
+            name=name, task_id=record.get("id"),
+            completed=bool(record.get("completed")),
+            created=record.get("created"), parent=record.get("parent"),
+            description=record.get("description"), due=record.get("due"),
+            priority=record.get("priority"), tags=tags
+        )
+    except (TypeError, ValueError):
+        raise ValueError(f"Task {record_number} has an invalid field.")
+
+
+def _has_type(value: Any, types: Tuple[type, ...]) -> bool:
+    """Return whether a value of a record field has one of some types.
+
+    Booleans only count as booleans, not as numbers, and numbers must be
+    finite.
+    """
+    if isinstance(value, bool):
+        return bool in types
+    if isinstance(value, float) and not math.isfinite(value):
+        return False
+    return isinstance(value, types)
+
+
+def _pop_waiting(
+        waiting: Dict[int, List[Task]]
+) -> Callable[[Task], List[Task]]:
+    """Return a function that removes and returns the tasks waiting for a
+    task, for walking them."""
+    def children(task: Task) -> List[Task]:
+        if task.task_id is None:
+            return []
+        return waiting.pop(task.task_id, [])
+
+    return children
@@ -1,120 +1,343 @@
 """The command-line interface for the program."""
 import argparse
+import datetime
+from pathlib import Path
+from typing import Any, Optional
 
-parser = argparse.ArgumentParser(
-    prog="todo", description="Track and manage tasks.",
-    usage="todo [OPTIONS] COMMAND",
-    formatter_class=argparse.RawTextHelpFormatter
-)
-
-subparsers = parser.add_subparsers(title="Commands", dest="command")
-
-list_parser = subparsers.add_parser("list", help="List tasks.")
-list_parser.add_argument(
-    "-i", "--info", action="store_true",
-    help="Show detailed information about each task."
-)
-list_parser.add_argument(
-    "-l", "--levels", type=int, default=None,
-    help="Limit the number of levels of displayed sub-tasks."
-)
-list_parser.add_argument(
-    "-s", "--sort", choices=["name", "created"], action="append", default=[],
-    help="Sort the tasks by this criteria."
-)
-list_parser.add_argument(
-    "-f", "--filter", choices=["complete", "incomplete"], action="append",
-    default=[], help="Filter the tasks by this criteria."
-)
-list_parser.add_argument(
-    "--priority", choices=["low", "medium", "high"], action="append",
-    default=[], help="Filter the tasks based on priority"
-)
-list_parser.add_argument(
-    "-n", "--name",
-    help="Filter tasks matching this name. This can be passed multiple times.",
-    action="append",
-    default=[]
-)
-list_parser.add_argument(
-    "-d", "--description",
-    help=(
-        "Filter tasks matching this description. "
-        "This can be passed multiple times."
-    ),
-    action="append",
-    default=[],
-)
-
-add_parser = subparsers.add_parser("add", help="Add a task.")
-add_parser.add_argument("name", help="The name of the task.")
-add_parser.add_argument(
-    "-p", "--parent", type=int,
-    help="Used when creating sub-task; designates parent task.", default=None
-)
-add_parser.add_argument(
-    "-d", "--description", help="Give your task a description.", default=None
-)
-add_parser.add_argument(
-    "--due", help="Give your task a due date.", default=None
-)
-add_parser.add_argument(
-    "--priority", choices=["low", "medium", "high"],
-    help="Give your task a priority number.", default=None
-)
-add_parser.add_argument(
-    "-t", "--tag", dest="tags", type=str, action="append", default=[],
-    help="Assign a tag to the task. This can be passed multiple times."
-)
-
-remove_parser = subparsers.add_parser("delete", help="Delete a task.")
-remove_parser.add_argument(
-    "id", type=int, nargs="+", help="The ID(s) of the task(s) to be deleted."
-)
-
-check_parser = subparsers.add_parser("check", help="Mark a task as completed.")
-check_parser.add_argument(
-    "id", type=int, nargs="+",
-    help="The ID(s) of the task(s) to be marked as completed."
-)
-
-uncheck_parser = subparsers.add_parser("uncheck",
-                                       help="Mark a task as uncompleted.")
-uncheck_parser.add_argument("id", type=int, nargs="+",
-                            help="The ID of the task to mark uncompleted.")
-
-info_parser = subparsers.add_parser(
-    "info", help="Display detailed information about individual tasks."
-)
-info_parser.add_argument(
-    "id", type=int, help="The ID of the task to show information for."
-)
-info_parser.add_argument(
-    "children", type=str, choices=["True", "False"], help="Shows all children of the task"
-)
-
-modify_parser = subparsers.add_parser("modify", help="Modify tasks.")
-modify_parser.add_argument(
-    "id", type=int, help="The ID of the task to modify."
-)
-modify_parser.add_argument(
-    "-n", "--name", type=str, help="Modify the name of the task.", default=None
-)
-modify_parser.add_argument(
-    "-d", "--description", type=str, help="Modify the description for a task.",
-    default=None
-)
-modify_parser.add_argument(
-    "-t", "--due", type=str, help="Modify the due date for a task.", default=None
-)
-modify_parser.add_argument(
-    "-p", "--priority", choices=["low", "medium", "high"], type=str, help="Modify your task's priority number.",
-    default=None
-)
-modify_parser.add_argument(
-    "-a", "--tag", type=str, help="Modify your task's tag.", default=None
-)
-
-clear_parser = subparsers.add_parser(
-    "clear", help="clear all tasks from the whole list"
-)
\ No newline at end of file
+from todo.constants import DATE_FORMAT
+
+
+def _date(text: str) -> datetime.datetime:
+    """Parse a date given as an argument."""
+    try:
+        return datetime.datetime.strptime(text, DATE_FORMAT)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"'{text}' isn't a date in YYYY-MM-DD format."
+        )
+
+
+def _count(text: str) -> int:
+    """Parse a number of tasks given as an argument."""
+    try:
+        count = int(text)
+    except ValueError:
+        count = -1
+    if count < 0:
+        raise argparse.ArgumentTypeError(
+            f"'{text}' isn't a non-negative whole number."
+        )
+    return count
+
+
+def _add_list_parser(subparsers: Any) -> None:
+    """Add the parser of the `list` command."""
+    list_parser = subparsers.add_parser(
+        "list", help="List tasks.",
+        description=(
+            "List tasks. While `todo serve` runs, tasks are filtered and "
+            "searched for using indexes kept by the server. Otherwise, every "
+            "task is checked."
+        )
+    )
+    list_parser.add_argument(
+        "-i", "--info", action="store_true",
+        help="Show detailed information about each task."
+    )
+    list_parser.add_argument(
+        "-l", "--levels", type=int, default=None,
+        help="Limit the number of levels of displayed sub-tasks."
+    )
+    list_parser.add_argument(
+        "-s", "--sort", choices=["name", "created"], action="append",
+        default=[], help="Sort the tasks by this criteria."
+    )
+    list_parser.add_argument(
+        "-f", "--filter", choices=["complete", "incomplete"], action="append",
+        default=[], help="Filter the tasks by this criteria."
+    )
+    list_parser.add_argument(
+        "--priority", choices=["low", "medium", "high"], action="append",
+        default=[], help="Filter the tasks based on priority"
+    )
+    list_parser.add_argument(
+        "-t", "--tag", dest="tags", action="append", default=[],
+        help=(
+            "Only show tasks with this tag. This can be passed multiple times "
+            "to only show tasks with all of the tags."
+        )
+    )
+    list_parser.add_argument(
+        "--due-from", type=_date, default=None, metavar="DATE",
+        help=(
+            "Only show tasks due on or after this date, in YYYY-MM-DD format."
+        )
+    )
+    list_parser.add_argument(
+        "--due-until", type=_date, default=None, metavar="DATE",
+        help=(
+            "Only show tasks due on or before this date, in YYYY-MM-DD "
+            "format."
+        )
+    )
+    list_parser.add_argument(
+        "--overdue", action="store_true",
+        help="Only show incomplete tasks that were due before today."
+    )
+    list_parser.add_argument(
+        "--upcoming", type=int, default=None, metavar="DAYS",
+        help="Only show tasks due today or in the next DAYS days."
+    )
+    list_parser.add_argument(
+        "-n", "--name",
+        help=(
+            "Filter tasks matching this name. "
+            "This can be passed multiple times."
+        ),
+        action="append",
+        default=[]
+    )
+    list_parser.add_argument(
+        "-d", "--description",
+        help=(
+            "Filter tasks matching this description. "
+            "This can be passed multiple times."
+        ),
+        action="append",
+        default=[],
+    )
+    list_parser.add_argument(
+        "-q", "--search", action="append", default=[],
+        help=(
+            "Search the names and descriptions of tasks for this text, "
+            "showing the most relevant tasks first. This can be passed "
+            "multiple times."
+        )
+    )
+    list_parser.add_argument(
+        "--limit", type=_count, default=None,
+        help="Show at most this many tasks, counting sub-tasks."
+    )
+    list_parser.add_argument(
+        "--offset", type=_count, default=0,
+        help="Skip this many tasks before the shown ones, counting sub-tasks."
+    )
+
+
+def _add_add_parser(subparsers: Any) -> None:
+    """Add the parser of the `add` command."""
+    add_parser = subparsers.add_parser("add", help="Add a task.")
+    add_parser.add_argument("name", help="The name of the task.")
+    add_parser.add_argument(
+        "-p", "--parent", type=int,
+        help="Used when creating sub-task; designates parent task.",
+        default=None
+    )
+    add_parser.add_argument(
+        "-d", "--description", help="Give your task a description.",
+        default=None
+    )
+    add_parser.add_argument(
+        "--due", help="Give your task a due date.", default=None
+    )
+    add_parser.add_argument(
+        "--priority", choices=["low", "medium", "high"],
+        help="Give your task a priority number.", default=None
+    )
+    add_parser.add_argument(
+        "-t", "--tag", dest="tags", type=str, action="append", default=[],
+        help="Assign a tag to the task. This can be passed multiple times."
+    )
+
+
+def _add_delete_parser(subparsers: Any) -> None:
+    """Add the parser of the `delete` command."""
+    remove_parser = subparsers.add_parser("delete", help="Delete a task.")
+    remove_parser.add_argument(
+        "id", type=int, nargs="+",
+        help="The ID(s) of the task(s) to be deleted."
+    )
+
+
+def _add_check_parser(subparsers: Any) -> None:
+    """Add the parser of the `check` command."""
+    check_parser = subparsers.add_parser(
+        "check", help="Mark a task as completed."
+    )
+    check_parser.add_argument(
+        "id", type=int, nargs="+",
+        help="The ID(s) of the task(s) to be marked as completed."
+    )
+
+
+def _add_uncheck_parser(subparsers: Any) -> None:
+    """Add the parser of the `uncheck` command."""
+    uncheck_parser = subparsers.add_parser(
+        "uncheck", help="Mark a task as uncompleted."
+    )
+    uncheck_parser.add_argument(
+        "id", type=int, nargs="+",
+        help="The ID of the task to mark uncompleted."
+    )
+
+
+def _add_info_parser(subparsers: Any) -> None:
+    """Add the parser of the `info` command."""
+    info_parser = subparsers.add_parser(
+        "info", help="Display detailed information about individual tasks."
+    )
+    info_parser.add_argument(
+        "id", type=int, help="The ID of the task to show information for."
+    )
+    info_parser.add_argument(
+        "children", type=str, choices=["True", "False"],
+        help="Shows all children of the task"
+    )
+
+
+def _add_modify_parser(subparsers: Any) -> None:
+    """Add the parser of the `modify` command."""
+    modify_parser = subparsers.add_parser("modify", help="Modify tasks.")
+    modify_parser.add_argument(
+        "id", type=int, help="The ID of the task to modify."
+    )
+    modify_parser.add_argument(
+        "-n", "--name", type=str, help="Modify the name of the task.",
+        default=None
+    )
+    modify_parser.add_argument(
+        "-d", "--description", type=str,
+        help="Modify the description for a task.", default=None
+    )
+    modify_parser.add_argument(
+        "-t", "--due", type=str, help="Modify the due date for a task.",
+        default=None
+    )
+    modify_parser.add_argument(
+        "-p", "--priority", choices=["low", "medium", "high"], type=str,
+        help="Modify your task's priority number.", default=None
+    )
+    modify_parser.add_argument(
+        "-a", "--tag", type=str, help="Modify your task's tag.", default=None
+    )
+
+
+def _add_clear_parser(subparsers: Any) -> None:
+    """Add the parser of the `clear` command."""
+    subparsers.add_parser(
+        "clear", help="clear all tasks from the whole list"
+    )
+
+
+def _add_history_parser(subparsers: Any) -> None:
+    """Add the parser of the `history` command."""
+    subparsers.add_parser(
+        "history", help="Show the recent changes made to the task list."
+    )
+
+
+def _add_convert_parser(subparsers: Any) -> None:
+    """Add the parser of the `convert` command."""
+    convert_parser = subparsers.add_parser(
+        "convert",
+        help="Convert a task list to another format (.json or compact .bin)."
+    )
+    convert_parser.add_argument(
+        "source", type=Path, help="The path of the task list to convert."
+    )
+    convert_parser.add_argument(
+        "destination", type=Path,
+        help="The path to save the converted task list to."
+    )
+
+
+def _add_import_parser(subparsers: Any) -> None:
+    """Add the parser of the `import` command."""
+    import_parser = subparsers.add_parser(
+        "import", help="Add the tasks in a JSONL or CSV file to the task list."
+    )
+    import_parser.add_argument(
+        "path", type=Path,
+        help="The path of the file to import, or - for standard input."
+    )
+    import_parser.add_argument(
+        "--format", choices=["jsonl", "csv"], default=None,
+        help=(
+            "The format of the file. By default, this is based on its "
+            "extension."
+        )
+    )
+
+
+def _add_export_parser(subparsers: Any) -> None:
+    """Add the parser of the `export` command."""
+    export_parser = subparsers.add_parser(
+        "export", help="Write every task to a JSONL or CSV file."
+    )
+    export_parser.add_argument(
+        "path", type=Path,
+        help="The path of the file to write, or - for standard output."
+    )
+    export_parser.add_argument(
+        "--format", choices=["jsonl", "csv"], default=None,
+        help=(
+            "The format of the file. By default, this is based on its "
+            "extension."
+        )
+    )
+
+
+def _add_serve_parser(subparsers: Any) -> None:
+    """Add the parser of the `serve` command."""
+    subparsers.add_parser(
+        "serve",
+        help=(
+            "Keep the task list in memory and run the commands of other "
+            "invocations of the program on it, until interrupted. Listings "
+            "only use indexes of the tasks while the server runs."
+        )
+    )
+
+
+# The function that adds the parser of each command, by the name of the
+# command, in the order they are listed in the help.
+COMMANDS = {
+    "list": _add_list_parser,
+    "add": _add_add_parser,
+    "delete": _add_delete_parser,
+    "check": _add_check_parser,
+    "uncheck": _add_uncheck_parser,
+    "info": _add_info_parser,
+    "modify": _add_modify_parser,
+    "clear": _add_clear_parser,
+    "history": _add_history_parser,
+    "convert": _add_convert_parser,
+    "import": _add_import_parser,
+    "export": _add_export_parser,
+    "serve": _add_serve_parser,
+}
+
+
+def build_parser(command: Optional[str] = None) -> argparse.ArgumentParser:
+    """Build the parser for the command-line arguments.
+
+    Building the parsers of all the commands takes a noticeable part of the
+    time it takes to run a command, so only the parser of the command that is
+    being run is built when it is known.
+
+    Args:
+        command: The name of the command to build the parser for, or None to
+            build the parsers of all the commands, e.g. to show help.
+    """
+    parser = argparse.ArgumentParser(
+        prog="todo", description="Track and manage tasks.",
+        usage="todo [OPTIONS] COMMAND",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    subparsers = parser.add_subparsers(title="Commands", dest="command")
+    for name, add_parser in COMMANDS.items():
+        if command is None or name == command:
+            add_parser(subparsers)
+
+    return parser
@@ -0,0 +1,100 @@
+"""Sending commands to a running `todo serve` server."""
+import json
+import socket
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from todo.constants import SERVER_SOCKET_PATH
+
+# The number of bytes to receive from the server at a time.
+CHUNK_SIZE = 64 * 1024
+
+
+def send_command(arguments: List[str], directory: Path) -> bool:
+    """Run a command on the server and print its output, if one is running.
+
+    This only imports what's needed to talk to the server, so that sending a
+    command costs little more than starting the interpreter. The program only
+    imports this module if `SERVER_SOCKET_PATH` exists, so it costs nothing
+    when no server has been started.
+
+    Args:
+        arguments: The command-line arguments of the command.
+        directory: The directory relative paths in the arguments are relative
+            to.
+
+    Returns:
+        Whether the command was run by a server. If False, no server is
+        running and the command should be run on the task list file instead.
+
+    Throws:
+        SystemExit: The server is running but the command failed or
+            couldn't be run. The task list file mustn't be changed directly
+            while it runs.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return False
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with connection:
+        try:
+            connection.connect(str(SERVER_SOCKET_PATH))
+        except (ConnectionRefusedError, FileNotFoundError):
+            # The socket was left behind by a server that has stopped.
+            return False
+
+        request = {"arguments": arguments, "directory": str(directory)}
+        try:
+            connection.sendall(json.dumps(request).encode("utf-8"))
+            connection.shutdown(socket.SHUT_WR)
+            status, output = _receive_status(connection)
+        except ConnectionError:
+            status, output = None, b""
+
+        if status is None:
+            sys.exit(
+                "Error: The server stopped without running the command."
+            )
+        # Write the output as it arrives, so long listings start immediately.
+        try:
+            sys.stdout.buffer.write(output)
+            while True:
+                chunk = connection.recv(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # The reader stopped early, e.g. `todo list | head`.
+            pass
+
+        # A command that failed exits with its message and a non-zero status
+        # after its output, as it would if it were run directly.
+        if status.get("error") is not None:
+            sys.exit(status["error"])
+
+    return True
+
+
+def _receive_status(
+        connection: socket.socket
+) -> Tuple[Optional[Dict[str, Any]], bytes]:
+    """Receive the status line the server sends before the output.
+
+    Returns:
+        The status, or None if the connection was closed before the whole
+        line was received, and the output received along with it.
+    """
+    data = b""
+    while b"\n" not in data:
+        chunk = connection.recv(CHUNK_SIZE)
+        if not chunk:
+            return None, b""
+        data += chunk
+
+    line, output = data.split(b"\n", 1)
+    try:
+        return json.loads(line), output
+    except ValueError:
+        return None, b""
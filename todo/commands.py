@@ -1,15 +1,24 @@
 """A function for each command."""
+import argparse
 import datetime
-from typing import Optional, List
+import os
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, List, Iterable, Dict, Any
 
-from todo.constants import DEFAULT_LIST_PATH, DATE_FORMAT
-from todo.formatting import SimpleTaskFormatter, DetailedTaskFormatter
-from todo.pipelines import TaskPipeline
+from todo.constants import DEFAULT_LIST_PATH, DATE_FORMAT, TIME_FORMAT
+from todo.storage import Journal, lock
 from todo.task import TaskList
 
+# Formatting and pipelines are only imported by the commands that display
+# tasks, so that the others start faster.
+if TYPE_CHECKING:
+    from todo.pipelines import TaskPipeline
+
 
 def list_tasks(
-        levels: Optional[int], info: bool, pipeline: TaskPipeline
+        levels: Optional[int], info: bool, pipeline: "TaskPipeline",
+        limit: Optional[int] = None, offset: int = 0
 ) -> None:
     """List all tasks in the console.
 
@@ -18,14 +27,31 @@ def list_tasks(
             If `None`, there is no limit.
         info: Show detailed information about each task.
         pipeline: The pipeline used to sort/filter tasks.
+        limit: The maximum number of tasks to display, counting sub-tasks. If
+            `None`, there is no limit.
+        offset: The number of tasks to skip before the displayed ones.
     """
-    if info:
-        formatter = DetailedTaskFormatter(max_depth=levels, pipeline=pipeline)
-    else:
-        formatter = SimpleTaskFormatter(max_depth=levels, pipeline=pipeline)
+    from todo.formatting import SimpleTaskFormatter, DetailedTaskFormatter
 
-    with TaskList.load(DEFAULT_LIST_PATH) as task_list:
-        print(formatter.format(task_list.tasks))
+    formatter_class = DetailedTaskFormatter if info else SimpleTaskFormatter
+    formatter = formatter_class(
+        max_depth=levels, pipeline=pipeline, limit=limit, offset=offset
+    )
+
+    with TaskList.load(
+            DEFAULT_LIST_PATH, read_only=True, lazy=True
+    ) as task_list:
+        pipeline.plan(task_list)
+
+        # Write the tasks as they are formatted so output starts immediately.
+        try:
+            formatter.write(task_list.tasks, sys.stdout)
+            print()
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # The reader stopped early, e.g. `todo list | head`. Point stdout
+            # at /dev/null so Python doesn't fail flushing it on exit.
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
 
 
 def add_task(
@@ -52,10 +78,13 @@ def add_task(
             print("Error: Due dates must be in YYYY-MM-DD format.")
             return
 
-        task = task_list.add_task(
-            name, parent=parent_id, description=description, due=due_date,
-            priority=priority, tags=tags
-        )
+        try:
+            task = task_list.add_task(
+                name, parent=parent_id, description=description, due=due_date,
+                priority=priority, tags=tags
+            )
+        except KeyError:
+            sys.exit(f"Error: There is no task with the ID {parent_id}.")
 
         print(f"Created new task '{task.name}' with ID {task.task_id}.")
 
@@ -66,13 +95,33 @@ def delete_task(task_id: int) -> None:
     Args:
         task_id: The ID of the task to delete.
     """
-    try:
-        with TaskList.load(DEFAULT_LIST_PATH) as task_list:
-            task = task_list.remove_task(task_id)
-    except KeyError:
-        print(f"There is no task with the ID {task_id}.")
+    delete_tasks([task_id])
+
 
-    print(f"Deleted the task '{task.name}'.")
+def delete_tasks(task_ids: Iterable[int]) -> None:
+    """Delete several tasks in a single load and save of the task list.
+
+    Args:
+        task_ids: The IDs of the tasks to delete.
+    """
+    with TaskList.load(DEFAULT_LIST_PATH) as task_list:
+        for task_id in task_ids:
+            try:
+                task = task_list.remove_task(task_id)
+            except KeyError:
+                print(f"There is no task with the ID {task_id}.")
+                continue
+
+            sub_task_count = task.descendant_count
+            if sub_task_count == 0:
+                print(f"Deleted the task '{task.name}'.")
+            elif sub_task_count == 1:
+                print(f"Deleted the task '{task.name}' and its sub-task.")
+            else:
+                print(
+                    f"Deleted the task '{task.name}' and its "
+                    f"{sub_task_count} sub-tasks."
+                )
 
 
 def check_task(task_id: int) -> None:
@@ -81,18 +130,29 @@ def check_task(task_id: int) -> None:
     Args:
         task_id: The ID of the task to mark as completed.
     """
-    try:
-        with TaskList.load(DEFAULT_LIST_PATH) as task_list:
-            task = task_list.get_task(task_id)
+    check_tasks([task_id])
 
-            if any(not task.completed for task in task.walk()):
+
+def check_tasks(task_ids: Iterable[int]) -> None:
+    """Mark several tasks as completed in a single load and save.
+
+    Args:
+        task_ids: The IDs of the tasks to mark as completed.
+    """
+    with TaskList.load(DEFAULT_LIST_PATH, lazy=True) as task_list:
+        for task_id in task_ids:
+            try:
+                task = task_list.get_task(task_id)
+            except KeyError:
+                print(f"There is no task with the ID {task_id}.")
+                continue
+
+            if task.incomplete_descendant_count:
                 print("Not all sub-tasks have been completed!")
-                return
+                continue
 
-            task.completed = True
+            task_list.check_task(task_id)
             print(f"Task '{task.name}' has been completed.")
-    except KeyError:
-        print(f"There is no task with the ID {task_id}.")
 
 
 def uncheck_task(task_id: int) -> None:
@@ -101,13 +161,24 @@ def uncheck_task(task_id: int) -> None:
     Args:
         task_id: The ID of the task to mark as completed.
     """
-    try:
-        with TaskList.load(DEFAULT_LIST_PATH) as task_list:
-            task = task_list.get_task(task_id)
-            task.completed = False
+    uncheck_tasks([task_id])
+
+
+def uncheck_tasks(task_ids: Iterable[int]) -> None:
+    """Mark several tasks as uncompleted in a single load and save.
+
+    Args:
+        task_ids: The IDs of the tasks to mark as uncompleted.
+    """
+    with TaskList.load(DEFAULT_LIST_PATH, lazy=True) as task_list:
+        for task_id in task_ids:
+            try:
+                task = task_list.uncheck_task(task_id)
+            except KeyError:
+                print(f"There is no task with the ID {task_id}.")
+                continue
+
             print(f"Task '{task.name}' has been marked incomplete.")
-    except KeyError:
-        print(f"There is no task with the ID {task_id}.")
 
 
 def show_info(task_id: int, show_children: Optional[bool]) -> None:
@@ -117,14 +188,15 @@ def show_info(task_id: int, show_children: Optional[bool]) -> None:
         task_id: The ID of the task to show information for.
         show_children: Enter 'True' if you want to show. 'False' to not.
     """
-    formatter = DetailedTaskFormatter(max_depth=1)
+    from todo.formatting import DetailedTaskFormatter
+
+    formatter = DetailedTaskFormatter(max_depth=None if show_children else 1)
 
     try:
-        with TaskList.load(DEFAULT_LIST_PATH) as task_list:
-            if show_children == False:
-                print(formatter.format([task_list.get_task(task_id)], False))
-            else:
-                print(formatter.format([task_list.get_task(task_id)], True))
+        with TaskList.load(
+                DEFAULT_LIST_PATH, read_only=True, lazy=True
+        ) as task_list:
+            print(formatter.format([task_list.get_task(task_id)]))
     except KeyError:
         print(f"There is no task with the ID {task_id}.")
 
@@ -151,7 +223,7 @@ def modify_task(task_id: int, name: Optional[str], description: Optional[str],
         return
 
     try:
-        with TaskList.load(DEFAULT_LIST_PATH) as task_list:
+        with TaskList.load(DEFAULT_LIST_PATH, lazy=True) as task_list:
             task_list.modify_task(
                 task_id=task_id, name=name, description=description,
                 due=due_date, priority=priority, tag=tag)
@@ -166,3 +238,257 @@ def remove_all_tasks()-> None:
     print (f" All Tasks have been deleted. ")
 
 
+def convert_task_list(source: Path, destination: Path) -> None:
+    """Copy a task list to another file, converting its storage format.
+
+    The formats are chosen based on the extensions of the paths.
+
+    Args:
+        source: The path of the task list to convert.
+        destination: The path to save the converted task list to.
+    """
+    try:
+        with TaskList.load(source, read_only=True) as task_list:
+            task_list.save(destination)
+    except FileNotFoundError:
+        print(f"There is no task list at '{source}'.")
+        return
+
+    print(f"Converted '{source}' to '{destination}'.")
+
+
+def import_tasks(path: Path, format_name: Optional[str]) -> None:
+    """Add the tasks in a JSONL or CSV file to the task list.
+
+    The tasks are given new IDs, and the task list is written once at the end
+    instead of recording every added task in its journal.
+
+    Args:
+        path: The path of the file to import, or "-" for standard input.
+        format_name: The format of the file, or None to choose it based on
+            the extension of the path.
+    """
+    from todo.bulk import (
+        get_format, open_records, read_records, import_records
+    )
+
+    try:
+        records_format = get_format(path, format_name)
+        with open_records(path, "r") as file:
+            with TaskList.load(DEFAULT_LIST_PATH) as task_list:
+                count, skipped = import_records(
+                    task_list, read_records(file, records_format)
+                )
+    except FileNotFoundError:
+        print(f"There is no file at '{path}'.")
+        return
+    except ValueError as error:
+        print(f"Error: {error} No tasks were imported.")
+        return
+
+    print(f"Imported {count} tasks.")
+    if skipped:
+        print(f"Skipped {skipped} tasks whose parent isn't in the file.")
+
+
+def export_tasks(path: Path, format_name: Optional[str]) -> None:
+    """Write every task in the task list to a JSONL or CSV file.
+
+    Args:
+        path: The path of the file to write, or "-" for standard output.
+        format_name: The format of the file, or None to choose it based on
+            the extension of the path.
+    """
+    from todo.bulk import (
+        get_format, open_records, export_records, write_records
+    )
+
+    try:
+        records_format = get_format(path, format_name)
+    except ValueError as error:
+        print(f"Error: {error}")
+        return
+
+    with TaskList.load(
+            DEFAULT_LIST_PATH, read_only=True, lazy=True
+    ) as task_list, open_records(path, "w") as file:
+        count = write_records(export_records(task_list), file, records_format)
+
+    # Only report where the tasks went if they didn't go to standard output.
+    if str(path) != "-":
+        print(f"Exported {count} tasks to '{path}'.")
+
+
+def show_history() -> None:
+    """Show the changes made to the task list since its last compaction."""
+    with lock(DEFAULT_LIST_PATH, shared=True):
+        changes = list(Journal(DEFAULT_LIST_PATH).read())
+
+    if not changes:
+        print("No changes have been recorded since the last compaction.")
+        return
+
+    try:
+        for change in changes:
+            saved_at = datetime.datetime.fromtimestamp(change["time"])
+            print(
+                f"{saved_at.strftime(TIME_FORMAT)}  {_describe_change(change)}"
+            )
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader stopped early, e.g. `todo history | head`. Point stdout
+        # at /dev/null so Python doesn't fail flushing it on exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+def _describe_change(change: Dict[str, Any]) -> str:
+    """Describe a change recorded in a task list journal."""
+    op = change["op"]
+
+    if op == "add":
+        task = change["task"]
+        return f"Added the task '{task['name']}' with ID {task['id']}."
+    elif op == "remove":
+        return f"Deleted the task with ID {change['id']}."
+    elif op == "modify":
+        return (
+            f"Modified the {', '.join(change['fields'])} of the task with ID "
+            f"{change['id']}."
+        )
+    elif op == "check":
+        return f"Completed the task with ID {change['id']}."
+    elif op == "uncheck":
+        return f"Marked the task with ID {change['id']} incomplete."
+    elif op == "clear":
+        return "Deleted all tasks."
+    return f"Unknown change '{op}'."
+
+
+def run_command(args: argparse.Namespace) -> None:
+    """Run the function of a command with the arguments it was given.
+
+    Args:
+        args: The command-line arguments, as parsed by the parser built by
+            `todo.cli.build_parser`.
+    """
+    if args.command == "list":
+        # Pipelines are only needed to list tasks, so they are only imported
+        # then to keep the other commands fast to start.
+        from todo.pipelines import (
+            NameSort, CreationTimeSort, CompositeSort, CompletionFilter,
+            PriorityFilter, TagFilter, DueFilter, OverdueFilter,
+            CompiledPipeline, Limit, NameSearch, DescriptionSearch,
+            RankedSearch
+        )
+
+        pipelines = []
+
+        if "complete" in args.filter:
+            pipelines.append(CompletionFilter(completed=True))
+        if "incomplete" in args.filter:
+            pipelines.append(CompletionFilter(completed=False))
+        if "high" in args.priority:
+            pipelines.append(PriorityFilter(priority='high'))
+        if "medium" in args.priority:
+            pipelines.append(PriorityFilter(priority='medium'))
+        if "low" in args.priority:
+            pipelines.append(PriorityFilter(priority='low'))
+        for tag in args.tags:
+            pipelines.append(TagFilter(tag))
+
+        # Due dates are days, so ranges of them start at midnight and end at
+        # the start of the day after the last one.
+        one_day = datetime.timedelta(days=1)
+        today = datetime.datetime.combine(
+            datetime.date.today(), datetime.time()
+        )
+        if args.due_from is not None or args.due_until is not None:
+            start = args.due_from and args.due_from.timestamp()
+            end = args.due_until and (args.due_until + one_day).timestamp()
+            pipelines.append(DueFilter(start=start, end=end))
+        if args.overdue:
+            pipelines.append(OverdueFilter(now=today.timestamp()))
+        if args.upcoming is not None:
+            end = today + (args.upcoming + 1) * one_day
+            pipelines.append(
+                DueFilter(start=today.timestamp(), end=end.timestamp())
+            )
+
+        if args.name:
+            pipelines.append(NameSearch(names=args.name))
+
+        if args.description:
+            pipelines.append(DescriptionSearch(descriptions=args.description))
+
+        # Sort after filtering so that only the remaining tasks are sorted, by
+        # each criteria in the order they were given with the first one being
+        # the most significant.
+        sorts = []
+        for criteria in dict.fromkeys(args.sort):
+            if criteria == "name":
+                sorts.append(NameSort())
+            elif criteria == "created":
+                sorts.append(CreationTimeSort(reverse=True))
+        if len(sorts) == 1:
+            pipelines.append(sorts[0])
+        elif sorts:
+            pipelines.append(CompositeSort(sorts))
+
+        # Ranking comes last so that any other sort only breaks ties.
+        if args.search:
+            pipelines.append(RankedSearch(args.search))
+
+        # A page can't include more tasks from any level than the number of
+        # rows up to its end, so the rest of each level doesn't need sorting.
+        if args.limit is not None:
+            pipelines.append(Limit(args.offset + args.limit))
+
+        list_tasks(
+            levels=args.levels, info=args.info,
+            pipeline=CompiledPipeline(pipelines), limit=args.limit,
+            offset=args.offset
+        )
+
+    elif args.command == "add":
+        add_task(
+            name=args.name, parent_id=args.parent,
+            description=args.description, due=args.due,
+            priority=args.priority, tags=args.tags
+        )
+
+    elif args.command == "delete":
+        delete_tasks(args.id)
+
+    elif args.command == "check":
+        check_tasks(args.id)
+
+    elif args.command == "uncheck":
+        uncheck_tasks(args.id)
+
+    elif args.command == "info":
+        if args.children == "True":
+            show_info(args.id, True)
+        else:
+            show_info(args.id, False)
+
+    elif args.command == "modify":
+        modify_task(
+            task_id=args.id, name=args.name, description=args.description,
+            due=args.due, priority=args.priority, tag=args.tag
+        )
+
+    elif args.command == "clear":
+        remove_all_tasks()
+
+    elif args.command == "history":
+        show_history()
+
+    elif args.command == "convert":
+        convert_task_list(args.source, args.destination)
+
+    elif args.command == "import":
+        import_tasks(args.path, args.format)
+
+    elif args.command == "export":
+        export_tasks(args.path, args.format)
+
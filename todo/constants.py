@@ -1,14 +1,35 @@
 """Constants to be used program-wide."""
+import os
 from pathlib import Path
 
 # The directory where task lists are stored.
 TODO_DIRECTORY = Path.home() / ".todo"
 
-# The path of the user's default task list.
-DEFAULT_LIST_PATH = TODO_DIRECTORY / "default.json"
+# The path of the user's default task list. This can be overridden with the
+# TODO_LIST_PATH environment variable. The extension of the path determines the
+# format the task list is stored in.
+DEFAULT_LIST_PATH = Path(
+    os.environ.get("TODO_LIST_PATH", TODO_DIRECTORY / "default.json")
+)
 
 # The name of the user's default task list.
 DEFAULT_LIST_NAME = "default"
 
 # The format for parsing and formatting dates.
 DATE_FORMAT = "%Y-%m-%d"
+
+# The format for formatting times.
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# The journal of changes to a task list is compacted into a new snapshot once it
+# grows past both this many bytes and the size of the current snapshot.
+JOURNAL_COMPACTION_SIZE = 64 * 1024
+
+# The path of the Unix socket a `todo serve` server listens on for commands.
+SERVER_SOCKET_PATH = DEFAULT_LIST_PATH.with_name(
+    DEFAULT_LIST_PATH.name + ".sock"
+)
+
+# How many seconds a server waits after a task list is first changed before
+# saving it, so that a burst of changes is saved at once.
+SERVER_SAVE_DELAY = 1.0
@@ -1,12 +1,14 @@
 """Formatters for formatting tasks."""
 
 import abc
+import itertools
 import math
-from typing import Collection, Optional
+from typing import Collection, Optional, Iterator, TextIO, TypeVar
 
 from todo.constants import DATE_FORMAT
 from todo.pipelines import TaskPipeline, PassThroughPipeline
 from todo.task import Task
+from todo.traversal import walk_with_depth
 
 # The string to indent nested levels of tasks with.
 INDENT_PREFIX = " " * 4
@@ -14,6 +16,32 @@ INDENT_PREFIX = " " * 4
 # The number of columns to wrap text to.
 WRAP_WIDTH = 80
 
+T = TypeVar("T")
+
+
+def format_progress(task: Task) -> Optional[str]:
+    """Describe how many of the descendants of a task have been completed.
+
+    Returns:
+        A string such as "3/10 done", or None if the task has no sub-tasks.
+    """
+    total = task.descendant_count
+    if not total:
+        return None
+    return f"{total - task.incomplete_descendant_count}/{total} done"
+
+
+def _walk_page(
+        rows: Iterator[T], limit: Optional[int], offset: int
+) -> Iterator[T]:
+    """Return the rows of one page of a listing, stopping at its end.
+
+    The rows after the page are never requested, so the tasks after it are
+    never formatted and their sub-tasks are never sorted or filtered.
+    """
+    stop = None if limit is None else offset + limit
+    return itertools.islice(rows, offset, stop)
+
 
 class TaskFormatter(abc.ABC):
     """A formatter for formatting a list of tasks.
@@ -22,11 +50,25 @@ class TaskFormatter(abc.ABC):
     for different methods of formatting tasks. We may want to add new ways of
     formatting tasks in the future, and making classes that implement this
     interface allows us to do that without breaking existing code.
+
+    Formatters produce their output line by line, so it can be written out as
+    it is produced instead of being built up as one large string.
     """
 
     @abc.abstractmethod
+    def format_lines(self, tasks: Collection[Task]) -> Iterator[str]:
+        """Return a generator for the lines of the formatted tasks.
+
+        Each line ends with a newline character.
+        """
+
     def format(self, tasks: Collection[Task]) -> str:
         """Format the given tasks as a string."""
+        return "".join(self.format_lines(tasks))
+
+    def write(self, tasks: Collection[Task], stream: TextIO) -> None:
+        """Write the formatted tasks to a stream as they are formatted."""
+        stream.writelines(self.format_lines(tasks))
 
 
 class SimpleTaskFormatter(TaskFormatter):
@@ -37,34 +79,37 @@ class SimpleTaskFormatter(TaskFormatter):
     """
     def __init__(
             self, max_depth: Optional[int] = None,
-            pipeline: TaskPipeline = PassThroughPipeline()
+            pipeline: TaskPipeline = PassThroughPipeline(),
+            limit: Optional[int] = None, offset: int = 0
     ) -> None:
         """Initialize the object.
 
         Args:
             pipeline: The pipeline to use to sort/filter the tasks.
             max_depth: The maximum number of levels of nested tasks to display.
+            limit: The maximum number of tasks to display, counting sub-tasks,
+                or None to display every task.
+            offset: The number of tasks to skip before the displayed ones.
         """
         self.max_depth: int = max_depth or math.inf
         self.pipeline = pipeline
-        self._current_depth: int = 0
-
-    def format(self, tasks: Collection[Task]) -> str:
-        output = ""
-
-        self._current_depth += 1
-
-        for task in self.pipeline.process(tasks):
+        self.limit = limit
+        self.offset = offset
+
+    def format_lines(self, tasks: Collection[Task]) -> Iterator[str]:
+        for task, depth in _walk_page(
+                walk_with_depth(
+                    self.pipeline.process(tasks),
+                    lambda task: self.pipeline.process(task.children),
+                    self.max_depth
+                ),
+                self.limit, self.offset
+        ):
+            indent = INDENT_PREFIX * (depth - 1)
             checkbox = "[x]" if task.completed else "[ ]"
-            output += INDENT_PREFIX * (self._current_depth - 1)
-            output += f"{checkbox} {task.name} ({task.task_id})\n"
-
-            if self._current_depth < self.max_depth:
-                output += self.format(task.children)
-
-        self._current_depth -= 1
-
-        return output
+            progress = format_progress(task)
+            suffix = "" if progress is None else f" [{progress}]"
+            yield f"{indent}{checkbox} {task.name} ({task.task_id}){suffix}\n"
 
 
 class DetailedTaskFormatter(TaskFormatter):
@@ -76,53 +121,49 @@ class DetailedTaskFormatter(TaskFormatter):
 
     def __init__(
             self, max_depth: Optional[int] = None,
-            pipeline: TaskPipeline = PassThroughPipeline()
+            pipeline: TaskPipeline = PassThroughPipeline(),
+            limit: Optional[int] = None, offset: int = 0
     ) -> None:
         """Initialize the object.
 
         Args:
             pipeline: The pipeline to use to sort/filter the tasks.
             max_depth: The maximum number of levels of nested tasks to display.
+            limit: The maximum number of tasks to display, counting sub-tasks,
+                or None to display every task.
+            offset: The number of tasks to skip before the displayed ones.
         """
         self.max_depth: int = max_depth or math.inf
         self.pipeline = pipeline
-        self._current_depth: int = 0
-
-    def format(self, tasks: Collection[Task]) -> str:
-        output = ""
-
-        self._current_depth += 1
-
-        for task in self.pipeline.process(tasks):
+        self.limit = limit
+        self.offset = offset
+
+    def format_lines(self, tasks: Collection[Task]) -> Iterator[str]:
+        for task, depth in _walk_page(
+                walk_with_depth(
+                    self.pipeline.process(tasks),
+                    lambda task: self.pipeline.process(task.children),
+                    self.max_depth
+                ),
+                self.limit, self.offset
+        ):
+            indent = INDENT_PREFIX * (depth - 1)
+            detail_indent = INDENT_PREFIX * depth
             checkbox = "[x]" if task.completed else "[ ]"
             due_date = (
                 None if task.due is None
                 else task.due.strftime(DATE_FORMAT)
             )
 
-            output += INDENT_PREFIX * (self._current_depth - 1)
-            output += f"{checkbox} {task.name} ({task.task_id})\n"
-
-            output += INDENT_PREFIX * self._current_depth
-            output += f"Due: {due_date}\n"
-
-            output += INDENT_PREFIX * self._current_depth
-            output += f"Description: {task.description}\n"
-
-            output += INDENT_PREFIX * self._current_depth
-            output += f"Priority: {task.priority}\n"
-
-            output += INDENT_PREFIX * self._current_depth
-            output += f"Tags: {', '.join(task.tags)}\n"
-
-            output += "\n"
-
-            if self._current_depth < self.max_depth:
-                output += self.format(task.children)
-
-        self._current_depth -= 1
-
-        return output
+            yield f"{indent}{checkbox} {task.name} ({task.task_id})\n"
+            yield f"{detail_indent}Due: {due_date}\n"
+            yield f"{detail_indent}Description: {task.description}\n"
+            yield f"{detail_indent}Priority: {task.priority}\n"
+            yield f"{detail_indent}Tags: {', '.join(task.tags)}\n"
+            progress = format_progress(task)
+            if progress is not None:
+                yield f"{detail_indent}Progress: {progress}\n"
+            yield "\n"
 
 
 class SingleTaskFormatter(TaskFormatter):
@@ -141,23 +182,14 @@ class SingleTaskFormatter(TaskFormatter):
             max_depth: The maximum number of levels of nested tasks to display.
         """
         self.max_depth: int = max_depth or math.inf
-        self._current_depth: int = 0
 
     def format(self, task) -> str:
-        output = ""
-        self._current_depth += 1
-
-        checkbox = "[x]" if task.completed else "[ ]"
+        return "".join(self.format_lines([task]))
 
-        output += INDENT_PREFIX * (self._current_depth - 1)
-        output += f"{checkbox} {task.name} ({task.task_id})\n"
-
-        output += INDENT_PREFIX * self._current_depth
-        output += f"Due: {task.due}\n"
-
-        output += INDENT_PREFIX * self._current_depth
-        output += f"{task.description}\n"
-
-        self._current_depth -= 1
+    def format_lines(self, tasks: Collection[Task]) -> Iterator[str]:
+        for task in tasks:
+            checkbox = "[x]" if task.completed else "[ ]"
 
-        return output
+            yield f"{checkbox} {task.name} ({task.task_id})\n"
+            yield f"{INDENT_PREFIX}Due: {task.due}\n"
+            yield f"{INDENT_PREFIX}{task.description}\n"
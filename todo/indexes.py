@@ -0,0 +1,383 @@
+"""Secondary indexes for finding tasks by their attributes."""
+import bisect
+import itertools
+from typing import (
+    Any, Callable, Collection, Dict, Iterable, List, Optional, Set, Tuple
+)
+
+# The attributes of a task that are indexed: its ID, whether it is completed,
+# its priority, its tags and its due date as a POSIX timestamp.
+IndexedAttributes = Tuple[
+    int, bool, Optional[str], Iterable[str], Optional[float]
+]
+
+
+class TaskIndex:
+    """Indexes of the tasks in a task list by their attributes.
+
+    Tasks are indexed by whether they are completed, their priority, their
+    tags and their due date. The first three map each value to the set of IDs
+    of the tasks with it, so that filters can be answered by intersecting sets
+    instead of looking at every task. Due dates are kept in a sorted list so
+    that the tasks due in a range of dates can be found with a binary search.
+
+    Only task IDs are stored, so the index can be built from serialized tasks
+    without building the tasks themselves. The sets returned by the methods of
+    this class are the index itself and must not be modified.
+    """
+
+    def __init__(self, tasks: Iterable[IndexedAttributes] = ()) -> None:
+        """Initialize the object.
+
+        Args:
+            tasks: The initial tasks to index, each as a tuple of the
+                arguments to `add`.
+        """
+        self._completion: Dict[bool, Set[int]] = {False: set(), True: set()}
+        self._priority: Dict[Optional[str], Set[int]] = {}
+        self._tag: Dict[str, Set[int]] = {}
+
+        # Pairs of a due date as a POSIX timestamp and a task ID, in order.
+        # Tasks without a due date aren't included.
+        self._due: List[Tuple[float, int]] = []
+
+        # Add the initial tasks in bulk, sorting the due dates once at the
+        # end instead of inserting each of them in order.
+        completion = self._completion
+        priority_index = self._priority
+        tag_index = self._tag
+
+        for task_id, completed, priority, tags, due in tasks:
+            completion[bool(completed)].add(task_id)
+
+            task_ids = priority_index.get(priority)
+            if task_ids is None:
+                task_ids = priority_index[priority] = set()
+            task_ids.add(task_id)
+
+            for tag in tags:
+                tag_index.setdefault(tag, set()).add(task_id)
+
+            if due is not None:
+                self._due.append((due, task_id))
+
+        self._due.sort()
+
+    def add(
+            self, task_id: int, completed: bool, priority: Optional[str],
+            tags: Iterable[str], due: Optional[float]
+    ) -> None:
+        """Add a task to the index.
+
+        Args:
+            task_id: The ID of the task.
+            completed: Whether the task has been completed.
+            priority: The priority level of the task, if it has one.
+            tags: The tags of the task.
+            due: The due date of the task as a POSIX timestamp, if it has one.
+        """
+        self._completion[bool(completed)].add(task_id)
+        self._priority.setdefault(priority, set()).add(task_id)
+        for tag in tags:
+            self._tag.setdefault(tag, set()).add(task_id)
+        if due is not None:
+            bisect.insort(self._due, (due, task_id))
+
+    def discard(
+            self, task_id: int, completed: bool, priority: Optional[str],
+            tags: Iterable[str], due: Optional[float]
+    ) -> None:
+        """Remove a task from the index.
+
+        The attributes of the task must be the ones it was added with. See
+        `add` for the arguments.
+        """
+        self._completion[bool(completed)].discard(task_id)
+        self._priority.get(priority, set()).discard(task_id)
+        for tag in tags:
+            self._tag.get(tag, set()).discard(task_id)
+        if due is not None:
+            position = bisect.bisect_left(self._due, (due, task_id))
+            if self._due[position:position + 1] == [(due, task_id)]:
+                del self._due[position]
+
+    def with_completion(self, completed: bool) -> Set[int]:
+        """Return the IDs of the tasks that are or aren't completed."""
+        return self._completion[completed]
+
+    def with_priority(self, priority: Optional[str]) -> Set[int]:
+        """Return the IDs of the tasks with a priority level."""
+        return self._priority.get(priority, set())
+
+    def with_tag(self, tag: str) -> Set[int]:
+        """Return the IDs of the tasks with a tag."""
+        return self._tag.get(tag, set())
+
+    def due_between(
+            self, start: Optional[float] = None, end: Optional[float] = None
+    ) -> List[int]:
+        """Return the IDs of the tasks due in a range of dates.
+
+        Args:
+            start: The earliest due date to include as a POSIX timestamp, or
+                None to include every date before `end`.
+            end: The due date to stop at as a POSIX timestamp, which isn't
+                included, or None to include every date after `start`.
+
+        Returns:
+            The IDs of the matching tasks, from the earliest due to the latest.
+        """
+        low = 0 if start is None else bisect.bisect_left(
+            self._due, (start, -1)
+        )
+        high = len(self._due) if end is None else bisect.bisect_left(
+            self._due, (end, -1)
+        )
+        return [task_id for _, task_id in self._due[low:high]]
+
+
+# The length of the substrings of text that are indexed.
+NGRAM_LENGTH = 3
+
+
+def _ngrams(text: str) -> Set[str]:
+    """Return the distinct substrings of a text that are indexed."""
+    return {
+        text[start:start + NGRAM_LENGTH]
+        for start in range(len(text) - NGRAM_LENGTH + 1)
+    }
+
+
+class TextIndex:
+    """An inverted index for finding the tasks whose text contains a string.
+
+    The index maps every substring of length `NGRAM_LENGTH` (trigram) of the
+    indexed texts to the IDs of the tasks containing it. A text can only
+    contain a query if it contains every trigram of the query, so the tasks
+    with all of them are the only candidates, and only those are checked for
+    the whole query. Queries shorter than a trigram are looked up in every
+    trigram containing them, plus the texts too short to have any.
+
+    This finds exactly the same tasks as checking `query in text` for each of
+    them, including being case-sensitive.
+    """
+
+    def __init__(self, tasks: Iterable[Tuple[int, str]] = ()) -> None:
+        """Initialize the object.
+
+        Args:
+            tasks: The ID and text of each task to index initially.
+        """
+        # The indexed text of each task.
+        self._texts: Dict[int, str] = {}
+
+        # The IDs of the tasks containing each trigram.
+        self._ngrams: Dict[str, Set[int]] = {}
+
+        # The IDs of the tasks whose text is too short to have a trigram.
+        self._short: Set[int] = set()
+
+        # Add the initial tasks in bulk. Appending to lists and converting
+        # them to sets at the end is faster than adding to the sets directly.
+        postings: Dict[str, List[int]] = {}
+        for task_id, text in tasks:
+            self._texts[task_id] = text
+            if len(text) < NGRAM_LENGTH:
+                self._short.add(task_id)
+            for ngram in _ngrams(text):
+                task_ids = postings.get(ngram)
+                if task_ids is None:
+                    postings[ngram] = [task_id]
+                else:
+                    task_ids.append(task_id)
+
+        self._ngrams = {
+            ngram: set(task_ids) for ngram, task_ids in postings.items()
+        }
+
+    def add(self, task_id: int, text: str) -> None:
+        """Add the text of a task to the index."""
+        self._texts[task_id] = text
+
+        if len(text) < NGRAM_LENGTH:
+            self._short.add(task_id)
+        for ngram in _ngrams(text):
+            task_ids = self._ngrams.get(ngram)
+            if task_ids is None:
+                task_ids = self._ngrams[ngram] = set()
+            task_ids.add(task_id)
+
+    def discard(self, task_id: int) -> None:
+        """Remove the text of a task from the index if it is in it."""
+        text = self._texts.pop(task_id, None)
+        if text is None:
+            return
+
+        self._short.discard(task_id)
+        for ngram in _ngrams(text):
+            task_ids = self._ngrams[ngram]
+            task_ids.discard(task_id)
+            if not task_ids:
+                del self._ngrams[ngram]
+
+    def _candidates(self, query: str) -> Iterable[int]:
+        """Return the IDs of the tasks whose text might contain a query."""
+        if not query:
+            return self._texts.keys()
+
+        if len(query) < NGRAM_LENGTH:
+            candidates = set(self._short)
+            for ngram, task_ids in self._ngrams.items():
+                if query in ngram:
+                    candidates |= task_ids
+            return candidates
+
+        # Intersect the smallest sets first to keep the intermediate ones
+        # small.
+        ngram_sets = sorted(
+            (self._ngrams.get(ngram, set()) for ngram in _ngrams(query)),
+            key=len
+        )
+        return ngram_sets[0].intersection(*ngram_sets[1:])
+
+    def find(self, query: str) -> Set[int]:
+        """Return the IDs of the tasks whose text contains a query."""
+        texts = self._texts
+        return {
+            task_id for task_id in self._candidates(query)
+            if query in texts[task_id]
+        }
+
+    def count(self, query: str) -> Dict[int, int]:
+        """Count the occurrences of a query in the texts of the tasks.
+
+        Returns:
+            The number of times the query occurs in the text of each task, for
+            each task whose text contains it at least once.
+        """
+        texts = self._texts
+        counts = {}
+        for task_id in self._candidates(query):
+            occurrences = texts[task_id].count(query)
+            if occurrences:
+                counts[task_id] = occurrences
+        return counts
+
+
+class SiblingOrder:
+    """The sub-tasks of each task, kept sorted by one of their attributes.
+
+    The sub-tasks of a task are sorted the first time they are requested, and
+    are then kept sorted with binary insertion as tasks are added, removed and
+    changed, so requesting them again only needs to pick out the requested
+    tasks in order. The top-level tasks are treated as the sub-tasks of None.
+
+    Tasks with equal keys keep the order in which they were added, which is
+    the same order a stable sort of the sub-tasks would leave them in.
+    """
+
+    # Sorting fewer tasks than this is faster than finding them in an order.
+    MIN_SIBLINGS = 64
+
+    def __init__(
+            self, key: Callable[[Any], Any],
+            children: Callable[[Optional[int]], Collection[Any]],
+            reverse: bool = False
+    ) -> None:
+        """Initialize the object.
+
+        Args:
+            key: A function returning the value to sort a task by.
+            children: A function returning the sub-tasks of the task with an
+                ID, or the top-level tasks if the ID is None.
+            reverse: Sort the tasks in descending order.
+        """
+        self.key = key
+        self.reverse = reverse
+        self._children = children
+
+        # The key, position and task of the sub-tasks of each parent that has
+        # been sorted, in ascending order. The position is a counter that
+        # increases as tasks are added, to keep tasks with equal keys in the
+        # order they were added. It is negated for a descending order so that
+        # they are still in that order once the order is reversed.
+        self._orders: Dict[Optional[int], List[Tuple[Any, int, Any]]] = {}
+
+        # The entry of each task in the order of its parent.
+        self._entries: Dict[int, Tuple[Any, int, Any]] = {}
+        self._positions = itertools.count()
+
+    def _make_entry(self, task: Any, key: Any) -> Tuple[Any, int, Any]:
+        """Return the entry for a task that is being added to an order."""
+        position = next(self._positions)
+        return key, -position if self.reverse else position, task
+
+    def add(self, task: Any) -> None:
+        """Add a task after its siblings with equal keys."""
+        order = self._orders.get(task.parent)
+        if order is not None:
+            entry = self._make_entry(task, self.key(task))
+            bisect.insort(order, entry)
+            self._entries[task.task_id] = entry
+
+    def discard(self, task: Any) -> None:
+        """Remove a task if its siblings have been sorted."""
+        entry = self._entries.pop(task.task_id, None)
+        if entry is not None:
+            order = self._orders[task.parent]
+            del order[bisect.bisect_left(order, entry)]
+
+    def update(self, task: Any) -> None:
+        """Move a task whose key may have changed to its new position."""
+        entry = self._entries.get(task.task_id)
+        key = self.key(task)
+
+        if entry is not None and entry[0] != key:
+            order = self._orders[task.parent]
+            del order[bisect.bisect_left(order, entry)]
+            entry = (key, entry[1], task)
+            bisect.insort(order, entry)
+            self._entries[task.task_id] = entry
+
+    def _get_order(self, parent: Optional[int]) -> List[Tuple[Any, int, Any]]:
+        """Return the sorted sub-tasks of a task, sorting them if needed."""
+        order = self._orders.get(parent)
+
+        if order is None:
+            order = sorted(
+                self._make_entry(task, self.key(task))
+                for task in self._children(parent)
+            )
+            self._orders[parent] = order
+            for entry in order:
+                self._entries[entry[2].task_id] = entry
+
+        return order
+
+    def sort(self, tasks: Iterable[Any]) -> List[Any]:
+        """Sort tasks the same way `sorted` would with the key of this order.
+
+        Many sub-tasks of the same task are picked out of the order of their
+        parent instead of being sorted, unless they are only a small part of
+        their siblings, in which case sorting them is faster.
+        """
+        tasks = list(tasks)
+        if len(tasks) < self.MIN_SIBLINGS:
+            return sorted(tasks, key=self.key, reverse=self.reverse)
+
+        parent = tasks[0].parent
+        order = None
+        if all(task.parent == parent for task in tasks):
+            order = self._get_order(parent)
+
+        # Picking the tasks out of the order takes time proportional to the
+        # number of siblings, and sorting them to n * log(n) of their number.
+        if order is None or len(tasks) * len(tasks).bit_length() < len(order):
+            return sorted(tasks, key=self.key, reverse=self.reverse)
+
+        entries = reversed(order) if self.reverse else order
+        if len(tasks) == len(order):
+            return [entry[2] for entry in entries]
+
+        task_ids = {task.task_id for task in tasks}
+        return [entry[2] for entry in entries if entry[2].task_id in task_ids]
@@ -1,26 +1,66 @@
 import abc
-from typing import Iterable
+import heapq
+import itertools
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
 
-from todo.task import Task
+from todo.indexes import SiblingOrder
+from todo.task import Task, TaskList
 
 
 class TaskPipeline(abc.ABC):
     """A method of sorting or filtering tasks."""
 
+    # Whether this pipeline only changes the order of the tasks, or removes
+    # tasks in a way that doesn't depend on their order, so that filters can
+    # be moved from after it to before it. See `CompiledPipeline`.
+    commutes_with_filters = False
+
     @abc.abstractmethod
     def process(self, tasks: Iterable[Task]) -> Iterable[Task]:
         """Return the sorted or filtered tasks."""
 
+    def select(self, task_list: TaskList) -> Optional[Set[int]]:
+        """Find the tasks this pipeline keeps using the indexes of a task list.
+
+        Filters that can be answered from the indexes of a task list override
+        this so that `MultiPipeline` can combine them without looking at every
+        task. Building an index means looking at every task, which costs more
+        than filtering only the tasks that are listed, so indexes are only
+        used if something that keeps the task list around has already built
+        them.
+
+        Returns:
+            The IDs of the tasks in the task list that this pipeline doesn't
+            filter out, or None if this pipeline can't use the indexes.
+        """
+        return None
+
+    def plan(self, task_list: TaskList) -> None:
+        """Prepare to process the tasks of a task list.
+
+        This is called before processing the tasks of a task list so that the
+        pipeline can make use of its indexes. It does nothing by default.
+        """
+
 
 class PassThroughPipeline(TaskPipeline):
     """A pipeline that returns the data unmodified."""
 
+    commutes_with_filters = True
+
     def process(self, tasks: Iterable[Task]) -> Iterable[Task]:
         return tasks
 
 
 class MultiPipeline(TaskPipeline):
-    """A pipeline that sorts or filters on multiple criteria."""
+    """A pipeline that sorts or filters on multiple criteria.
+
+    Once planned for a task list, the filters that can be answered from its
+    indexes are replaced by a single check of whether each task is in the
+    intersection of their results. This check happens before the remaining
+    pipelines run, so that they only see the tasks that pass it.
+    """
 
     def __init__(self, pipelines: Iterable[TaskPipeline]) -> None:
         """Initialize the pipeline.
@@ -28,46 +68,325 @@ class MultiPipeline(TaskPipeline):
         Args:
             pipelines: The pipelines to combine to process the tasks.
         """
-        self.pipelines = pipelines
+        self.pipelines = list(pipelines)
+
+        # The IDs of the tasks that pass the indexed filters and the pipelines
+        # that still need to be run, once the pipeline has been planned.
+        self._matches: Optional[Set[int]] = None
+        self._remaining: List[TaskPipeline] = self.pipelines
+
+    def plan(self, task_list: TaskList) -> None:
+        # Planned sorts break ties by the order the task list keeps sub-tasks
+        # in, so they are only planned while the tasks are still in it.
+        reordered = False
+        for pipeline in self.pipelines:
+            sorts = isinstance(
+                pipeline, (SortPipeline, CompositeSort, MultiPipeline)
+            )
+            if not (sorts and reordered):
+                pipeline.plan(task_list)
+            reordered = reordered or not isinstance(
+                pipeline, (FilterPipeline, Limit, PassThroughPipeline)
+            )
+
+        selections = []
+        self._remaining = []
+
+        # The check happens first, so only filters that could be moved there
+        # can be replaced by it.
+        movable = True
+        for pipeline in self.pipelines:
+            selection = pipeline.select(task_list) if movable else None
+            if selection is None:
+                self._remaining.append(pipeline)
+            else:
+                selections.append(selection)
+            movable = movable and pipeline.commutes_with_filters
+
+        # Intersect the smallest sets first to keep the intermediate ones
+        # small.
+        selections.sort(key=len)
+        self._matches = (
+            None if not selections
+            else selections[0].intersection(*selections[1:])
+        )
+
+    def select(self, task_list: TaskList) -> Optional[Set[int]]:
+        self.plan(task_list)
+        return None if self._remaining else self._matches
 
     def process(self, tasks: Iterable[Task]) -> Iterable[Task]:
         output = tasks
-        for pipeline in self.pipelines:
-            output = pipeline.process(output)
+        if self._matches is not None:
+            matches = self._matches
+            output = [task for task in output if task.task_id in matches]
+
+        pipelines = self._remaining
+        index = 0
+        while index < len(pipelines):
+            pipeline = pipelines[index]
+            next_pipeline = pipelines[index + 1:index + 2]
+
+            # Only select the tasks that will be kept instead of sorting all
+            # of them if a sort is followed by a limit.
+            if isinstance(pipeline, SortPipeline) and next_pipeline and (
+                    isinstance(next_pipeline[0], Limit)
+            ):
+                limit = next_pipeline[0]
+                output = limit.process(pipeline.first(output, limit.stop))
+                index += 2
+            else:
+                output = pipeline.process(output)
+                index += 1
+
         return output
 
 
-class NameSort(TaskPipeline):
-    """A pipeline that sorts tasks alphabetically by name."""
+class CompiledPipeline(MultiPipeline):
+    """A `MultiPipeline` that rearranges its pipelines to run faster.
+
+    Filters are moved before any sorts they follow, so that only the tasks
+    they keep are sorted, unless a pipeline in between depends on the order
+    of the tasks, like `Limit`. Consecutive filters are then fused into a
+    single `FusedFilter`, which checks the cheapest conditions first, so that
+    the more expensive ones are only checked for the tasks they kept.
+
+    The result is the same as running the pipelines in the given order.
+    """
+
+    def __init__(self, pipelines: Iterable[TaskPipeline]) -> None:
+        super().__init__(pipelines)
+        self._remaining = self.compile(self.pipelines)
+
+    def plan(self, task_list: TaskList) -> None:
+        super().plan(task_list)
+        self._remaining = self.compile(self._remaining)
+
+    @staticmethod
+    def compile(pipelines: Iterable[TaskPipeline]) -> List[TaskPipeline]:
+        """Rearrange and fuse pipelines as described above.
+
+        Args:
+            pipelines: The pipelines to compile, in the order they would run.
+
+        Returns:
+            Pipelines with the same result when run in order.
+        """
+        compiled: List[TaskPipeline] = []
+        filters: List[FilterPipeline] = []
+        others: List[TaskPipeline] = []
+
+        for pipeline in [*pipelines, None]:
+            if isinstance(pipeline, FilterPipeline):
+                filters.append(pipeline)
+            elif pipeline is not None and pipeline.commutes_with_filters:
+                others.append(pipeline)
+            else:
+                # Filters can't be moved past this pipeline, so emit the
+                # filters and the pipelines they were moved before.
+                if len(filters) == 1:
+                    compiled.extend(filters)
+                elif filters:
+                    compiled.append(FusedFilter(filters))
+                compiled.extend(others)
+                filters, others = [], []
+
+                if pipeline is not None:
+                    compiled.append(pipeline)
+
+        return compiled
+
+
+class SortPipeline(TaskPipeline):
+    """A pipeline that sorts tasks by one of their attributes.
+
+    Once planned for a task list, sub-tasks are picked out of the order the
+    task list keeps them in instead of being sorted every time. See
+    `TaskList.sibling_order`.
+    """
+
+    commutes_with_filters = True
+
+    # The attribute to sort by, as accepted by `TaskList.sibling_order`.
+    attribute: str
 
     def __init__(self, reverse: bool = False) -> None:
         """Initialize the pipeline.
 
         Args:
-            reverse: Sort reverse-alphabetically instead of alphabetically.
+            reverse: Sort in descending order instead of ascending order.
         """
         self.reverse = reverse
+        self._order: Optional[SiblingOrder] = None
+
+    @abc.abstractmethod
+    def key(self, task: Task) -> Any:
+        """Return the value to sort a task by."""
+
+    def plan(self, task_list: TaskList) -> None:
+        self._order = task_list.sibling_order(self.attribute, self.reverse)
+
+    def first(self, tasks: Iterable[Task], count: Optional[int]) -> List[Task]:
+        """Return the first tasks in sorted order without sorting all of them.
+
+        The tasks are selected with a heap, which takes O(n * log(count))
+        time for n tasks instead of O(n * log(n)) to sort all of them.
+
+        Args:
+            tasks: The tasks to select from.
+            count: The number of tasks to return, or None to return all of
+                them.
+        """
+        if count is None:
+            return list(self.process(tasks))
+        if self.reverse:
+            return heapq.nlargest(count, tasks, key=self.key)
+        return heapq.nsmallest(count, tasks, key=self.key)
 
     def process(self, tasks: Iterable[Task]) -> Iterable[Task]:
-        return sorted(tasks, key=lambda x: x.name, reverse=self.reverse)
+        if self._order is None:
+            return sorted(tasks, key=self.key, reverse=self.reverse)
+        return self._order.sort(tasks)
 
 
-class CreationTimeSort(TaskPipeline):
-    """A pipeline that sorts tasks by when they were created."""
+class NameSort(SortPipeline):
+    """A pipeline that sorts tasks alphabetically by name.
 
-    def __init__(self, reverse: bool = False) -> None:
+    Sorting in reverse sorts reverse-alphabetically.
+    """
+    attribute = "name"
+
+    def key(self, task: Task) -> Any:
+        return task.name
+
+
+class CreationTimeSort(SortPipeline):
+    """A pipeline that sorts tasks by when they were created.
+
+    Sorting in reverse sorts from newest to oldest.
+    """
+    attribute = "created"
+
+    def key(self, task: Task) -> Any:
+        return task.created_timestamp
+
+
+class CompositeSort(TaskPipeline):
+    """A pipeline that sorts tasks by several criteria at once.
+
+    Tasks are sorted by the first criterion, tasks that are equal by it are
+    sorted by the second one, and so on.
+
+    This is done in one pipeline stage with one stable sort per criterion,
+    from the least to the most significant, which is faster in Python than a
+    single sort with a combined key once one of the keys has to be reversed.
+    Only the first sort can pick the tasks out of a pre-sorted order.
+    """
+
+    commutes_with_filters = True
+
+    def __init__(self, sorts: Iterable[SortPipeline]) -> None:
         """Initialize the pipeline.
 
         Args:
-            reverse: Sort from newest to oldest instead of oldest to newest.
+            sorts: The pipelines whose keys to sort by, from the most to the
+                least significant.
         """
-        self.reverse = reverse
+        self.sorts = list(sorts)
+
+    def plan(self, task_list: TaskList) -> None:
+        self.sorts[-1].plan(task_list)
+
+    def process(self, tasks: Iterable[Task]) -> Iterable[Task]:
+        *significant_sorts, least_significant_sort = self.sorts
+        output = list(least_significant_sort.process(tasks))
+        for sort in reversed(significant_sorts):
+            output.sort(key=sort.key, reverse=sort.reverse)
+        return output
+
+
+class Limit(TaskPipeline):
+    """A pipeline that keeps a range of tasks, like a page of results.
+
+    When this directly follows a `SortPipeline` in a `MultiPipeline`, only the
+    tasks up to the end of the range are selected from the sorted tasks,
+    without sorting the rest.
+    """
+
+    def __init__(self, limit: Optional[int] = None, offset: int = 0) -> None:
+        """Initialize the pipeline.
+
+        Args:
+            limit: The maximum number of tasks to keep, or None to keep every
+                task after the offset.
+            offset: The number of tasks to skip before the kept ones.
+        """
+        self.limit = limit
+        self.offset = offset
+
+    @property
+    def stop(self) -> Optional[int]:
+        """The number of tasks up to the end of the range, if it ends."""
+        return None if self.limit is None else self.offset + self.limit
 
     def process(self, tasks: Iterable[Task]) -> Iterable[Task]:
-        return sorted(tasks, key=lambda x: x.created, reverse=self.reverse)
+        return itertools.islice(tasks, self.offset, self.stop)
+
+
+class FilterPipeline(TaskPipeline):
+    """A pipeline that keeps the tasks matching a condition, in order.
 
+    Filters can be reordered and combined with each other by
+    `CompiledPipeline`, which checks the cheapest conditions first so that
+    the more expensive ones are only checked for the tasks they kept.
+    """
 
-class CompletionFilter(TaskPipeline):
+    commutes_with_filters = True
+
+    # How expensive the condition is to check, relative to comparing an
+    # attribute. `CompiledPipeline` checks cheaper conditions first.
+    cost = 1
+
+    @abc.abstractmethod
+    def predicate(self, task: Task) -> bool:
+        """Return whether a task is kept by this filter."""
+
+    def process(self, tasks: Iterable[Task]) -> Iterable[Task]:
+        return (task for task in tasks if self.predicate(task))
+
+
+class FusedFilter(FilterPipeline):
+    """A filter that keeps the tasks kept by all of several filters.
+
+    The predicates of the filters are checked from the cheapest to the most
+    expensive, each in a list comprehension over the tasks kept by the ones
+    before it, which avoids the generators chained by running the filters one
+    after another.
+    """
+
+    def __init__(self, filters: Iterable[FilterPipeline]) -> None:
+        """Initialize the pipeline.
+
+        Args:
+            filters: The filters to combine.
+        """
+        self.filters = sorted(filters, key=lambda pipeline: pipeline.cost)
+        self.cost = sum(pipeline.cost for pipeline in self.filters)
+        self._predicates = tuple(
+            pipeline.predicate for pipeline in self.filters
+        )
+
+    def predicate(self, task: Task) -> bool:
+        return all(predicate(task) for predicate in self._predicates)
+
+    def process(self, tasks: Iterable[Task]) -> Iterable[Task]:
+        kept = list(tasks)
+        for predicate in self._predicates:
+            kept = [task for task in kept if predicate(task)]
+        return kept
+
+
+class CompletionFilter(FilterPipeline):
     """A pipeline that filters tasks by whether they are complete."""
 
     def __init__(self, completed: bool = False) -> None:
@@ -78,13 +397,20 @@ class CompletionFilter(TaskPipeline):
         """
         self.completed = completed
 
-    def process(self, tasks: Iterable[Task]) -> Iterable[Task]:
-        return (task for task in tasks if task.completed == self.completed)
+    def predicate(self, task: Task) -> bool:
+        return task.completed == self.completed
+
+    def select(self, task_list: TaskList) -> Optional[Set[int]]:
+        if not task_list.indexed:
+            return None
+        return task_list.index.with_completion(self.completed)
 
 
-class PriorityFilter(TaskPipeline):
+class PriorityFilter(FilterPipeline):
     """A pipeline that filters tasks by their priority."""
 
+    cost = 2
+
     def __init__(self, priority: str = '') -> None:
         """Initialize the pipeline.
 
@@ -93,11 +419,97 @@ class PriorityFilter(TaskPipeline):
         """
         self.priority = priority
 
-    def process(self, tasks: Iterable[Task]) -> Iterable[Task]:
-        return (task for task in tasks if task.priority == self.priority)
+    def predicate(self, task: Task) -> bool:
+        return task.priority == self.priority
+
+    def select(self, task_list: TaskList) -> Optional[Set[int]]:
+        if not task_list.indexed:
+            return None
+        return task_list.index.with_priority(self.priority)
+
+
+class TagFilter(FilterPipeline):
+    """A pipeline that filters tasks by their tags."""
+
+    cost = 2
+
+    def __init__(self, tag: str) -> None:
+        """Initialize the pipeline.
+
+        Args:
+            tag: Only tasks with this tag are returned.
+        """
+        self.tag = tag
+
+    def predicate(self, task: Task) -> bool:
+        return self.tag in task.tags
+
+    def select(self, task_list: TaskList) -> Optional[Set[int]]:
+        if not task_list.indexed:
+            return None
+        return task_list.index.with_tag(self.tag)
+
+
+class DueFilter(FilterPipeline):
+    """A pipeline that filters tasks by whether they are due in a range.
 
+    Tasks without a due date are filtered out. Once the indexes of a task list
+    are built, the tasks due in the range are found with a binary search of
+    its due dates instead of checking every task.
+    """
 
-class NameSearch(TaskPipeline):
+    cost = 2
+
+    def __init__(
+            self, start: Optional[float] = None, end: Optional[float] = None
+    ) -> None:
+        """Initialize the pipeline.
+
+        Args:
+            start: The earliest due date to return tasks for as a POSIX
+                timestamp, or None for no earliest date.
+            end: The due date to stop at as a POSIX timestamp, which isn't
+                included, or None for no latest date.
+        """
+        self.start = start
+        self.end = end
+
+    def predicate(self, task: Task) -> bool:
+        due = task.due_timestamp
+        return due is not None and (
+            (self.start is None or self.start <= due)
+            and (self.end is None or due < self.end)
+        )
+
+    def select(self, task_list: TaskList) -> Optional[Set[int]]:
+        if not task_list.indexed:
+            return None
+        return set(task_list.index.due_between(self.start, self.end))
+
+
+class OverdueFilter(DueFilter):
+    """A pipeline that keeps incomplete tasks that were due before a time."""
+
+    def __init__(self, now: Optional[float] = None) -> None:
+        """Initialize the pipeline.
+
+        Args:
+            now: The time as a POSIX timestamp before which incomplete tasks
+                are overdue. If None, this is the current time.
+        """
+        super().__init__(end=time.time() if now is None else now)
+
+    def predicate(self, task: Task) -> bool:
+        return not task.completed and super().predicate(task)
+
+    def select(self, task_list: TaskList) -> Optional[Set[int]]:
+        due = super().select(task_list)
+        if due is None:
+            return None
+        return due.intersection(task_list.index.with_completion(False))
+
+
+class NameSearch(FilterPipeline):
     """A pipeline that filters tasks by their name."""
 
     def __init__(self, names: Iterable[str]) -> None:
@@ -107,16 +519,20 @@ class NameSearch(TaskPipeline):
             names: Only tasks containing one of these strings in their name
                 will be returned.
         """
-        self.names = names
+        self.names = list(names)
+        self.cost = 3 * len(self.names)
 
-    def process(self, tasks: Iterable[Task]) -> Iterable[Task]:
-        return (
-            task for task in tasks
-            if any(name in task.name for name in self.names)
-        )
+    def predicate(self, task: Task) -> bool:
+        return any(name in task.name for name in self.names)
+
+    def select(self, task_list: TaskList) -> Optional[Set[int]]:
+        if not task_list.has_text_index("name"):
+            return None
+        text_index = task_list.text_index("name")
+        return set().union(*(text_index.find(name) for name in self.names))
 
 
-class DescriptionSearch(TaskPipeline):
+class DescriptionSearch(FilterPipeline):
     """A pipeline that filters tasks by their description."""
 
     def __init__(self, descriptions: Iterable[str]) -> None:
@@ -126,13 +542,81 @@ class DescriptionSearch(TaskPipeline):
             descriptions: Only tasks containing one of these strings in their
                 description will be returned.
         """
-        self.descriptions = descriptions
+        self.descriptions = list(descriptions)
+        self.cost = 4 * len(self.descriptions)
 
-    def process(self, tasks: Iterable[Task]) -> Iterable[Task]:
-        return (
-            task for task in tasks
-            if any(
+    def predicate(self, task: Task) -> bool:
+        return any(
             description in task.description
             for description in self.descriptions
         )
+
+    def select(self, task_list: TaskList) -> Optional[Set[int]]:
+        if not task_list.has_text_index("description"):
+            return None
+        text_index = task_list.text_index("description")
+        return set().union(*(
+            text_index.find(description) for description in self.descriptions
+        ))
+
+
+class RankedSearch(TaskPipeline):
+    """A pipeline that searches the names and descriptions of tasks.
+
+    Tasks containing any of the search terms in their name or description are
+    returned, from the most to the least relevant. Each occurrence of a term
+    in the name of a task counts twice as much towards its relevance as an
+    occurrence in its description. Tasks that are equally relevant keep their
+    order.
+    """
+
+    commutes_with_filters = True
+
+    # How much more an occurrence in the name counts than in the description.
+    NAME_WEIGHT = 2
+
+    def __init__(self, terms: Iterable[str]) -> None:
+        """Initialize the pipeline.
+
+        Args:
+            terms: The strings to search for.
+        """
+        self.terms = list(terms)
+
+        # The relevance of every matching task by ID, if it was found using
+        # the inverted indexes of the task list when it was planned.
+        self._scores: Optional[Dict[int, int]] = None
+
+    def plan(self, task_list: TaskList) -> None:
+        self._scores = None
+        if not (
+                task_list.has_text_index("name")
+                and task_list.has_text_index("description")
+        ):
+            return
+
+        scores: Dict[int, int] = {}
+        for attribute, weight in (
+                ("name", self.NAME_WEIGHT), ("description", 1)
+        ):
+            text_index = task_list.text_index(attribute)
+            for term in self.terms:
+                for task_id, count in text_index.count(term).items():
+                    scores[task_id] = scores.get(task_id, 0) + weight * count
+        self._scores = scores
+
+    def _score(self, task: Task) -> int:
+        """Return the relevance of a task to the search terms."""
+        if self._scores is not None:
+            return self._scores.get(task.task_id, 0)
+        return sum(
+            self.NAME_WEIGHT * task.name.count(term)
+            + task.description.count(term)
+            for term in self.terms
         )
+
+    def process(self, tasks: Iterable[Task]) -> Iterable[Task]:
+        scored = [(self._score(task), task) for task in tasks]
+        scored = [(score, task) for score, task in scored if score]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [task for _, task in scored]
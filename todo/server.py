@@ -0,0 +1,256 @@
+"""A server that keeps a task list in memory and runs commands on it.
+
+Every command run at the command line normally loads the task list from its
+file and saves it again, which takes time proportional to the size of the task
+list. `todo serve` instead loads the task list once, builds its indexes and
+keeps them up to date as it runs the commands that other invocations of the
+program send it over a Unix socket. See `todo.client`.
+
+Commands are run one at a time, so changes never interleave. Changed task
+lists are saved once `SERVER_SAVE_DELAY` seconds have passed since the first
+unsaved change, so a burst of commands is saved at once, and when the server
+stops. A change can therefore be lost if the server is killed before saving
+it.
+
+While a server is running, the task list should only be changed through it,
+which the client does whenever the server is running.
+"""
+import asyncio
+import contextlib
+import io
+import json
+import signal
+import socket
+import sys
+import traceback
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from todo.cli import build_parser
+from todo.commands import run_command
+from todo.constants import SERVER_SOCKET_PATH, SERVER_SAVE_DELAY
+from todo.storage import lock
+from todo.task import TaskList
+
+# Commands that read the task list file directly instead of loading it, so
+# that unsaved changes have to be saved before they run.
+_FILE_COMMANDS = ("history", "convert")
+
+# Commands that read or write a file given as an argument, or standard input
+# or output for "-".
+_PATH_COMMANDS = ("import", "export")
+
+
+class TaskListServer:
+    """A server for running commands on a task list kept in memory."""
+
+    def __init__(self, path: Path) -> None:
+        """Load the task list and build its indexes.
+
+        Args:
+            path: The path of the task list file.
+        """
+        self.path = path
+
+        with TaskList.load(path, read_only=True) as task_list:
+            TaskList.resident[path] = task_list
+
+        # Build the indexes up front, since pipelines only use indexes that
+        # have already been built.
+        task_list.index
+        task_list.text_index("name")
+        task_list.text_index("description")
+
+        # The pending call to save the task list, if it has unsaved changes.
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def task_list(self) -> TaskList:
+        """The task list kept in memory.
+
+        This can be replaced by a reloaded task list if a command fails
+        halfway through changing it. See `TaskList.load`.
+        """
+        return TaskList.resident[self.path]
+
+    def save(self) -> None:
+        """Save the changes made to the task list since it was last saved."""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+
+        if self.task_list.dirty:
+            with lock(self.path):
+                self.task_list.save(self.path, incremental=True)
+
+    def run(
+            self, arguments: List[str], directory: Path
+    ) -> Tuple[str, Optional[str]]:
+        """Run a command and return its output.
+
+        Args:
+            arguments: The command-line arguments of the command.
+            directory: The directory relative paths in the arguments are
+                relative to.
+
+        Returns:
+            The output of the command, and None if it succeeded or the
+            message to exit with if it failed, as it would if it were run
+            directly.
+        """
+        output = io.StringIO()
+        error_message = None
+        with contextlib.redirect_stdout(output):
+            try:
+                args = build_parser(arguments[0]).parse_args(arguments)
+            except SystemExit:
+                # The client checks the arguments before sending them, so
+                # this only happens if it runs a different version.
+                return (
+                    output.getvalue(),
+                    "Error: The server couldn't parse the arguments."
+                )
+
+            if args.command in _FILE_COMMANDS:
+                self.save()
+            if args.command == "convert":
+                args.source = directory / args.source
+                args.destination = directory / args.destination
+            elif args.command in _PATH_COMMANDS:
+                if str(args.path) != "-":
+                    args.path = directory / args.path
+                elif args.command == "import":
+                    return output.getvalue(), (
+                        "Error: Tasks can't be imported from standard input "
+                        "while a server is running."
+                    )
+
+            # Imported tasks aren't recorded as changes, so a command that
+            # fails while they are unsaved couldn't keep them when rolling
+            # back. Saving before and after importing prevents that. See
+            # `TaskList.load`.
+            if args.command == "import":
+                self.save()
+
+            try:
+                run_command(args)
+            except SystemExit as error:
+                # Commands exit with a message when they fail.
+                if isinstance(error.code, str):
+                    error_message = error.code
+                elif error.code:
+                    error_message = (
+                        f"Error: The command exited with status {error.code}."
+                    )
+            except Exception as error:
+                # Report unexpected errors like the last line of the
+                # traceback they would end with, e.g. "KeyError: 99".
+                error_message = "Error: " + "".join(
+                    traceback.format_exception_only(error)
+                ).strip()
+
+            if args.command == "import":
+                self.save()
+
+        if self.task_list.dirty and self._save_handle is None:
+            self._save_handle = asyncio.get_running_loop().call_later(
+                SERVER_SAVE_DELAY, self.save
+            )
+
+        return output.getvalue(), error_message
+
+    async def handle(
+            self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Run the command sent over a connection and send back its output.
+
+        The output is preceded by a line with a JSON object whose "error" is
+        None if the command was run and succeeded, or the message to exit
+        with if it failed or couldn't be run. The connection is never closed
+        without one, so the client can tell a command that failed from one
+        with no output.
+        """
+        output = ""
+        error_message = None
+        try:
+            # The client closes its end once it has sent the request, which
+            # can be arbitrarily long, e.g. when it lists many task IDs.
+            request = json.loads(await reader.read())
+            arguments = request["arguments"]
+            directory = Path(request["directory"])
+        except ConnectionError:
+            writer.close()
+            return
+        except (ValueError, KeyError, TypeError):
+            error_message = "Error: The server received an invalid request."
+        else:
+            try:
+                output, error_message = self.run(arguments, directory)
+            except Exception as error:
+                error_message = (
+                    f"Error: The server failed to run the command: {error}"
+                )
+
+        try:
+            status = {"error": error_message}
+            writer.write(json.dumps(status).encode("utf-8") + b"\n")
+            writer.write(output.encode("utf-8"))
+            await writer.drain()
+        except ConnectionError:
+            # The client stopped waiting for the output.
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: Path) -> None:
+        """Accept connections until the process is interrupted or terminated.
+
+        Args:
+            socket_path: The path of the Unix socket to listen on.
+        """
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, stopped.set)
+
+        server = await asyncio.start_unix_server(
+            self.handle, path=str(socket_path)
+        )
+        try:
+            async with server:
+                print(f"Serving '{self.path}' on '{socket_path}'.")
+                sys.stdout.flush()
+                await stopped.wait()
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                socket_path.unlink()
+            self.save()
+            del TaskList.resident[self.path]
+
+
+def serve(path: Path, socket_path: Path = SERVER_SOCKET_PATH) -> None:
+    """Run a server for a task list until interrupted.
+
+    Args:
+        path: The path of the task list file.
+        socket_path: The path of the Unix socket to listen on.
+    """
+    if not hasattr(asyncio, "start_unix_server"):
+        print("Error: Serving requires Unix sockets.")
+        return
+
+    # Only one server can run for a task list. A socket nobody is listening on
+    # was left behind by a server that didn't stop cleanly.
+    if socket_path.exists():
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            try:
+                connection.connect(str(socket_path))
+            except ConnectionRefusedError:
+                socket_path.unlink()
+            else:
+                print(
+                    f"Error: A server is already running on '{socket_path}'."
+                )
+                return
+
+    asyncio.run(TaskListServer(path).serve(socket_path))
@@ -0,0 +1,1632 @@
+"""Storage backends for task lists and helpers for writing them safely."""
+import abc
+import array
+import contextlib
+import json
+import math
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import (
+    IO, TYPE_CHECKING, Generator, Dict, Any, List, Sequence, Tuple, Optional,
+    Union
+)
+
+# Modules that are only needed by some backends or in rare cases are imported
+# where they are used, since every command imports this module and start-up
+# time matters for a command-line program.
+if TYPE_CHECKING:
+    import mmap
+    import sqlite3
+
+try:
+    import fcntl
+except ImportError:
+    # File locking is not available on this platform (e.g. Windows).
+    fcntl = None
+
+# The string to indent with when formatting JSON.
+JSON_INDENT = "  "
+
+
+def lock_path(path: Path) -> Path:
+    """Return the path of the lock file guarding the given task list file."""
+    return path.with_name(path.name + ".lock")
+
+
+@contextlib.contextmanager
+def lock(path: Path, shared: bool = False) -> Generator[None, None, None]:
+    """Hold an advisory lock on a task list file.
+
+    Other processes using this function block until the lock is released, so
+    concurrent invocations of the program serialize instead of overwriting each
+    other's changes. A separate lock file is used because saving replaces the
+    task list file itself. On platforms without `fcntl`, this does nothing.
+
+    Args:
+        path: The path of the task list file to lock.
+        shared: Take a shared lock, which only excludes exclusive locks. Use
+            this when the task list is only being read.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with lock_path(path).open("a") as lock_file:
+        fcntl.flock(
+            lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        )
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def atomic_replace(path: Path) -> Generator[Path, None, None]:
+    """Create a temporary file that atomically replaces a file when done.
+
+    The temporary file is in the same directory as the target and is renamed
+    over it when the `with` block finishes, so a crash at any point leaves
+    either the old or the new file, never a truncated one. If the `with` block
+    raises, the target is left untouched. The caller is responsible for
+    flushing the temporary file to disk before the block ends.
+
+    Args:
+        path: The path of the file to replace.
+    """
+    import tempfile
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    file_descriptor, temp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    os.close(file_descriptor)
+
+    try:
+        # Keep the permissions of the file being replaced. `mkstemp` only lets
+        # the owner read and write the file, so a new file gets the default
+        # permissions of the umask instead.
+        try:
+            mode = path.stat().st_mode
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(temp_name, mode)
+
+        yield Path(temp_name)
+
+        os.replace(temp_name, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_name)
+        raise
+
+    _sync_directory(path.parent)
+
+
+@contextlib.contextmanager
+def atomic_write(path: Path, mode: str = "w") -> Generator[IO, None, None]:
+    """Open a file for writing such that it is replaced atomically.
+
+    The data is written to a temporary file, flushed to disk and then renamed
+    over the target. See `atomic_replace`.
+
+    Args:
+        path: The path of the file to write.
+        mode: The mode to open the temporary file with.
+    """
+    with atomic_replace(path) as temp_path:
+        with temp_path.open(mode) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+
+
+def _sync_directory(path: Path) -> None:
+    """Flush a directory entry to disk so that a rename inside it persists."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+
+    directory = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+class Journal:
+    """An append-only log of the changes made to a task list file.
+
+    Saving a change to the journal only costs as much as the change itself,
+    instead of rewriting the whole task list. The task list file then acts as
+    a snapshot which the journal is replayed on top of when loading. Once the
+    journal grows large, it is compacted by writing a new snapshot and
+    clearing the journal.
+
+    The journal is stored next to the task list file with one JSON-encoded
+    change per line. Each change also records the time it was saved at.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Initialize the object.
+
+        Args:
+            path: The path of the task list file this is the journal of.
+        """
+        self.path: Path = path.with_name(path.name + ".journal")
+
+    def size(self) -> int:
+        """Return the size of the journal in bytes."""
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def read(self) -> Generator[Dict[str, Any], None, None]:
+        """Return a generator for iterating the changes in the journal."""
+        try:
+            file = self.path.open()
+        except FileNotFoundError:
+            return
+
+        with file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # The line was only partially written before a crash.
+                    continue
+
+    def append(self, changes: List[Dict[str, Any]]) -> None:
+        """Durably append changes to the journal."""
+        saved_at = time.time()
+        lines = "".join(
+            json.dumps({**change, "time": saved_at}) + "\n"
+            for change in changes
+        )
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self.path.open("a+b") as file:
+            # Start on a new line if a previous write was cut off by a crash.
+            if file.tell() > 0:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    lines = "\n" + lines
+
+            file.write(lines.encode("utf-8"))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def clear(self) -> None:
+        """Remove every change from the journal."""
+        with contextlib.suppress(FileNotFoundError):
+            self.path.unlink()
+
+
+class StorageBackend(abc.ABC):
+    """A file format for storing task lists.
+
+    Backends convert between files and task list documents. A document is a
+    JSON-compatible dictionary with the name of the task list under "name" and
+    its serialized top-level tasks, each with their nested "children", under
+    "tasks".
+    """
+
+    # The file extensions that select this backend.
+    extensions: Tuple[str, ...] = ()
+
+    @abc.abstractmethod
+    def read(self, path: Path) -> Dict[str, Any]:
+        """Read a task list document from a file."""
+
+    @abc.abstractmethod
+    def write(self, path: Path, document: Dict[str, Any]) -> None:
+        """Atomically write a task list document to a file."""
+
+    def read_lazy(self, path: Path) -> Dict[str, Any]:
+        """Read a task list document whose records may be read when needed.
+
+        The top-level tasks and the sub-tasks of records may be sequences
+        that are only read from the file when they are first accessed. The
+        document may also map the ID of every task to its record under
+        "records", so that a task can be found without reading any other
+        top-level task. Backends that can't read parts of a file don't need
+        to implement this.
+
+        Args:
+            path: The path of the file to read.
+        """
+        return self.read(path)
+
+    def update(self, path: Path, changes: List[Dict[str, Any]]) -> bool:
+        """Apply changes to a task list file in place.
+
+        Backends that can't update a file without rewriting it don't need to
+        implement this.
+
+        Args:
+            path: The path of the file to update.
+            changes: The changes to apply, as recorded by `TaskList.changes`.
+
+        Returns:
+            Whether the changes were applied. If False, the caller must write
+            the whole task list instead.
+        """
+        return False
+
+
+class JsonBackend(StorageBackend):
+    """A backend that stores task lists as human-readable JSON.
+
+    Sub-tasks are nested inside their parents, and the `json` module recurses
+    once per level of nesting. To support deeply nested task lists, documents
+    are encoded without recursion, and decoded on a thread with a larger stack
+    if they are nested too deeply for the main one.
+
+    Next to a task list file, an index of the byte offsets of the record of
+    every task in it is written. See `OffsetIndex`. Lazily loaded task lists
+    map the file into memory and decode only the records of the tasks that
+    are accessed, so a command that reads or changes a single task doesn't
+    decode the whole file.
+    """
+
+    extensions = (".json",)
+
+    # The stack space to allow per level of nesting when decoding.
+    _STACK_SIZE_PER_LEVEL = 1024
+
+    def __init__(self, index_offsets: bool = True) -> None:
+        """Initialize the object.
+
+        Args:
+            index_offsets: Whether to write an offset index next to task list
+                files.
+        """
+        self.index_offsets = index_offsets
+
+    def read(self, path: Path) -> Dict[str, Any]:
+        with path.open() as file:
+            text = file.read()
+
+        return self._decode(text)
+
+    def read_lazy(self, path: Path) -> Dict[str, Any]:
+        # A mapped file can't be replaced on Windows, which saving a lazily
+        # loaded task list may do.
+        offsets = None
+        if self.index_offsets and os.name != "nt":
+            offsets = OffsetIndex.open(path)
+        if offsets is None:
+            return self.read(path)
+
+        return {
+            "name": offsets.name,
+            "tasks": _IndexedRecords(offsets, None, True),
+            "records": offsets
+        }
+
+    @classmethod
+    def _decode(cls, text: Union[str, bytes]) -> Any:
+        """Decode a JSON document of any depth."""
+        try:
+            return json.loads(text)
+        except RecursionError:
+            if isinstance(text, bytes):
+                text = text.decode("utf-8")
+            return cls._decode_deep(text)
+
+    @classmethod
+    def _decode_deep(cls, text: str) -> Dict[str, Any]:
+        """Decode a JSON document that is nested more deeply than the
+        recursion limit allows."""
+        import threading
+
+        # Every level of nesting opens at least one object or array.
+        max_depth = text.count("{") + text.count("[")
+        result = {}
+
+        def decode() -> None:
+            try:
+                result["document"] = json.loads(text)
+            except BaseException as error:
+                result["error"] = error
+
+        recursion_limit = sys.getrecursionlimit()
+        stack_size = threading.stack_size()
+        sys.setrecursionlimit(recursion_limit + max_depth)
+        threading.stack_size(
+            min(max_depth * cls._STACK_SIZE_PER_LEVEL + 2 ** 24, 2 ** 31)
+        )
+        try:
+            thread = threading.Thread(target=decode)
+            thread.start()
+            thread.join()
+        finally:
+            threading.stack_size(stack_size)
+            sys.setrecursionlimit(recursion_limit)
+
+        if "error" in result:
+            raise result["error"]
+        return result["document"]
+
+    def write(self, path: Path, document: Dict[str, Any]) -> None:
+        if not self.index_offsets:
+            with atomic_write(path) as file:
+                file.writelines(_encode_json(document))
+            return
+
+        spans: Dict[int, List[int]] = {}
+        with atomic_write(path) as file:
+            file.writelines(_encode_json(document, spans))
+        OffsetIndex.write(path, document["name"], spans)
+
+
+def _encode_json(
+        document: Any, spans: Optional[Dict[int, List[int]]] = None
+) -> Generator[str, None, None]:
+    """Encode a JSON document without recursion.
+
+    The output is the same as `json.dump` with an indent of `JSON_INDENT`.
+
+    Args:
+        document: The document to encode.
+        spans: If given, the byte offsets of every task record in the document
+            are added to it by the ID of the task once the document has been
+            encoded. These are the start and end of the record, and the
+            start and end of its "children" array in between.
+
+    Returns:
+        A generator for the pieces of the encoded document.
+    """
+    # An entry for each object or array that is being encoded, with an
+    # iterator over its remaining items, whether it is an object, whether no
+    # items have been encoded yet, and a span and the index in it to set to
+    # the offset of the end of the object or array, if any.
+    stack = []
+
+    # The length of the output so far. Since `json.dumps` escapes any
+    # characters that aren't ASCII, this is also its size in bytes.
+    position = 0
+
+    def start(value: Any, span: Optional[List[int]], index: int) -> str:
+        """Encode a value, or the start of it if it is an object or array.
+
+        The offset of the end of the value is set at an index of a span, if
+        given.
+        """
+        if isinstance(value, dict) and value:
+            if spans is not None and "children" in value:
+                span = spans[value["id"]] = [position, 0, 0, 0]
+                index = 3
+            stack.append([iter(value.items()), True, True, span, index])
+            return "{"
+        elif isinstance(value, list) and value:
+            stack.append([iter(value), False, True, span, index])
+            return "["
+
+        encoded = json.dumps(value)
+        if span is not None:
+            span[index] = position + len(encoded)
+        return encoded
+
+    piece = start(document, None, 0)
+    position += len(piece)
+    yield piece
+
+    while stack:
+        entry = stack[-1]
+        items, is_object, first, span, index = entry
+        indent = JSON_INDENT * len(stack)
+
+        for item in items:
+            entry[2] = False
+            separator = "\n" if first else ",\n"
+
+            if is_object:
+                key, value = item
+                piece = f"{separator}{indent}{json.dumps(key)}: "
+            else:
+                key, value = None, item
+                piece = f"{separator}{indent}"
+            position += len(piece)
+            yield piece
+
+            # Only the "children" of a record are given its span.
+            if key == "children" and span is not None:
+                span[1] = position
+                piece = start(value, span, 2)
+            else:
+                piece = start(value, None, 0)
+            position += len(piece)
+            yield piece
+            break
+        else:
+            stack.pop()
+            piece = "\n" + JSON_INDENT * len(stack)
+            piece += "}" if is_object else "]"
+            position += len(piece)
+            yield piece
+            if span is not None:
+                span[index] = position
+
+
+class OffsetIndex:
+    """The byte offsets of the task records in a JSON task list file.
+
+    The index is stored next to the file. After a header, it holds the name
+    of the task list and then a slot for every task ID up to the highest one
+    in use, with the offsets of the start and end of the task's record and of
+    the "children" array in it, or zeros if no task has the ID. A record is
+    found by reading its slot, so looking up a task doesn't read the rest of
+    the index either.
+
+    The index records the size, modification time and inode of the file it
+    was written for and is ignored if they don't match, so a file that was
+    changed without updating its index, such as by editing it, is read as
+    usual. Both files are mapped into memory when the index is opened.
+
+    Attributes:
+        name: The name of the task list.
+        data: The mapped task list file.
+    """
+
+    # The header, with a magic number, the size, modification time and inode
+    # of the task list file, the length of the name and the number of slots.
+    _HEADER = struct.Struct("<4sQqQQQ")
+    _SLOT = struct.Struct("<4Q")
+    MAGIC = b"TDOX"
+
+    def __init__(self, data: "mmap.mmap", index: "mmap.mmap") -> None:
+        """Initialize the object.
+
+        Args:
+            data: The mapped task list file.
+            index: The mapped index.
+        """
+        _, _, _, _, name_length, count = self._HEADER.unpack_from(index)
+        name_end = self._HEADER.size + name_length
+
+        self.name: str = index[self._HEADER.size:name_end].decode("utf-8")
+        self.data = data
+        self._index = index
+        self._slots = name_end
+        self._count = count
+
+        # The records that have been decoded with their sub-tasks, by ID.
+        self._decoded: Dict[int, Dict[str, Any]] = {}
+
+    @staticmethod
+    def path_of(path: Path) -> Path:
+        """Return the path of the offset index of a task list file."""
+        return path.with_name(path.name + ".offsets")
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["OffsetIndex"]:
+        """Open the offset index of a task list file.
+
+        Returns:
+            The index, or None if there is no index for the current version
+            of the file.
+        """
+        import mmap
+
+        try:
+            with cls.path_of(path).open("rb") as index_file:
+                header = index_file.read(cls._HEADER.size)
+                if len(header) < cls._HEADER.size:
+                    return None
+                magic, size, modified, inode, _, _ = cls._HEADER.unpack(header)
+
+                stat = os.stat(path)
+                if (magic, size, modified, inode) != (
+                        cls.MAGIC, stat.st_size, stat.st_mtime_ns, stat.st_ino
+                ) or size == 0:
+                    return None
+
+                index = mmap.mmap(
+                    index_file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            with path.open("rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+        return cls(data, index)
+
+    @classmethod
+    def write(
+            cls, path: Path, name: str, spans: Dict[int, List[int]]
+    ) -> None:
+        """Atomically write the offset index of a task list file.
+
+        Args:
+            path: The path of the task list file, which must already have
+                been written.
+            name: The name of the task list.
+            spans: The offsets of the records in the file by task ID, as
+                found by `_encode_json`.
+        """
+        slots = array.array("Q", bytes(
+            cls._SLOT.size * (max(spans, default=-1) + 1)
+        ))
+        for task_id, span in spans.items():
+            slots[task_id * 4:task_id * 4 + 4] = array.array("Q", span)
+        if sys.byteorder == "big":
+            slots.byteswap()
+
+        encoded_name = name.encode("utf-8")
+        stat = os.stat(path)
+
+        with atomic_write(cls.path_of(path), "wb") as file:
+            file.write(cls._HEADER.pack(
+                cls.MAGIC, stat.st_size, stat.st_mtime_ns, stat.st_ino,
+                len(encoded_name), len(slots) // 4
+            ))
+            file.write(encoded_name)
+            file.write(slots.tobytes())
+
+    def __getitem__(self, task_id: int) -> Dict[str, Any]:
+        """Decode the record of a task, without its sub-tasks, which are
+        decoded when first accessed."""
+        record = self._decoded.get(task_id)
+        if record is not None:
+            return record
+
+        start, children_start, children_end, end = self._slot(task_id)
+        data = self.data
+        record = json.loads(
+            data[start:children_start] + b"[]" + data[children_end:end]
+        )
+        # An empty array is encoded as "[]", so a longer one has records.
+        record["children"] = _IndexedRecords(
+            self, task_id, children_end - children_start > 2
+        )
+        return record
+
+    def children(self, task_id: Optional[int]) -> List[Dict[str, Any]]:
+        """Decode the records of the sub-tasks of a task.
+
+        The sub-tasks of a task are decoded along with every other descendant
+        of its top-level task, whose records are then kept. Walking the tasks
+        therefore decodes each part of the file once, rather than once for
+        every task it is nested in.
+
+        Args:
+            task_id: The ID of the task, or None for the top-level tasks, in
+                which case the whole file is decoded.
+        """
+        if task_id is None:
+            records = JsonBackend._decode(self.data[:])["tasks"]
+            self._keep(records)
+            return records
+
+        record = self._decoded.get(task_id)
+        if record is None:
+            top_record = self[task_id]
+            while top_record["parent"] is not None:
+                top_record = self[top_record["parent"]]
+
+            _, children_start, children_end, _ = self._slot(top_record["id"])
+            top_record["children"] = JsonBackend._decode(
+                self.data[children_start:children_end]
+            )
+            self._keep([top_record])
+            record = self._decoded[task_id]
+
+        return record["children"]
+
+    def _slot(self, task_id: int) -> Tuple[int, int, int, int]:
+        """Return the offsets in the slot of a task.
+
+        Throws:
+            KeyError: There is no task with the ID.
+        """
+        if not 0 <= task_id < self._count:
+            raise KeyError(task_id)
+
+        slot = self._SLOT.unpack_from(
+            self._index, self._slots + task_id * self._SLOT.size
+        )
+        if slot[3] == 0:
+            raise KeyError(task_id)
+        return slot
+
+    def _keep(self, records: List[Dict[str, Any]]) -> None:
+        """Keep decoded records and those of their descendants by ID."""
+        stack = list(records)
+        while stack:
+            record = stack.pop()
+            self._decoded[record["id"]] = record
+            stack.extend(record["children"])
+
+
+class BinaryBackend(StorageBackend):
+    """A backend that stores task lists in a compact binary format.
+
+    Each task field is stored as a packed column with one entry per task, in
+    pre-order so that parents come before their children. Strings are stored
+    once in a string table and referenced by their index in it.
+
+    The file starts with a header containing a magic number, the format
+    version, the number of tasks and the number of tags. It is followed by the
+    string table and then the columns. Every array is stored little-endian and
+    prefixed with its length in bytes.
+    """
+
+    extensions = (".bin",)
+
+    MAGIC = b"TODO"
+    VERSION = 1
+    _HEADER = struct.Struct("<4sBQQ")
+    _LENGTH = struct.Struct("<Q")
+
+    # The string index used for a missing string, and the timestamp for a
+    # missing date.
+    _NO_STRING = -1
+    _NO_DATE = math.nan
+
+    def read(self, path: Path) -> Dict[str, Any]:
+        with path.open("rb") as file:
+            data = memoryview(file.read())
+
+        magic, version, task_count, tag_count = self._HEADER.unpack_from(data)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"'{path}' is not a supported task list file.")
+
+        reader = _ArrayReader(data, self._HEADER.size)
+        string_ends = reader.read("Q")
+        string_data = reader.read_bytes()
+        strings = []
+        start = 0
+        for end in string_ends:
+            strings.append(str(string_data[start:end], "utf-8"))
+            start = end
+
+        name = reader.read("q")[0]
+        ids = reader.read("q")
+        parents = reader.read("q")
+        completed = reader.read("B")
+        created = reader.read("d")
+        due = reader.read("d")
+        names = reader.read("q")
+        descriptions = reader.read("q")
+        priorities = reader.read("q")
+        tag_counts = reader.read("Q")
+        tags = reader.read("q")
+
+        if len(ids) != task_count or len(tags) != tag_count:
+            raise ValueError(f"'{path}' is corrupted.")
+
+        top_level_tasks = []
+        json_tasks = {}
+        tag_start = 0
+        for index in range(task_count):
+            tag_end = tag_start + tag_counts[index]
+            json_task = {
+                "name": strings[names[index]],
+                "id": ids[index],
+                "completed": bool(completed[index]),
+                "created": created[index],
+                "parent": None if parents[index] < 0 else parents[index],
+                "children": [],
+                "due": None if math.isnan(due[index]) else due[index],
+                "description": strings[descriptions[index]],
+                "priority": (
+                    None if priorities[index] == self._NO_STRING
+                    else strings[priorities[index]]
+                ),
+                "tags": [strings[tag] for tag in tags[tag_start:tag_end]]
+            }
+            tag_start = tag_end
+
+            json_tasks[json_task["id"]] = json_task
+            if json_task["parent"] is None:
+                top_level_tasks.append(json_task)
+            else:
+                json_tasks[json_task["parent"]]["children"].append(json_task)
+
+        return {"name": strings[name], "tasks": top_level_tasks}
+
+    def write(self, path: Path, document: Dict[str, Any]) -> None:
+        strings: Dict[str, int] = {}
+
+        def intern(string: Optional[str]) -> int:
+            if string is None:
+                return self._NO_STRING
+            return strings.setdefault(string, len(strings))
+
+        name = array.array("q", [intern(document["name"])])
+        ids = array.array("q")
+        parents = array.array("q")
+        completed = array.array("B")
+        created = array.array("d")
+        due = array.array("d")
+        names = array.array("q")
+        descriptions = array.array("q")
+        priorities = array.array("q")
+        tag_counts = array.array("Q")
+        tags = array.array("q")
+
+        # Visit the tasks in pre-order so that parents are read first.
+        stack = list(reversed(document["tasks"]))
+        while stack:
+            json_task = stack.pop()
+            stack.extend(reversed(json_task["children"]))
+
+            ids.append(json_task["id"])
+            parents.append(
+                -1 if json_task["parent"] is None else json_task["parent"]
+            )
+            completed.append(json_task["completed"])
+            created.append(json_task["created"])
+            due.append(
+                self._NO_DATE if json_task["due"] is None
+                else json_task["due"]
+            )
+            names.append(intern(json_task["name"]))
+            descriptions.append(intern(json_task["description"] or ""))
+            priorities.append(intern(json_task["priority"]))
+
+            task_tags = json_task["tags"] or []
+            tag_counts.append(len(task_tags))
+            tags.extend(intern(tag) for tag in task_tags)
+
+        string_data = bytearray()
+        string_ends = array.array("Q")
+        for string in strings:
+            string_data += string.encode("utf-8")
+            string_ends.append(len(string_data))
+
+        with atomic_write(path, "wb") as file:
+            file.write(self._HEADER.pack(
+                self.MAGIC, self.VERSION, len(ids), len(tags)
+            ))
+            self._write_array(file, string_ends)
+            self._write_bytes(file, string_data)
+            for column in (
+                    name, ids, parents, completed, created, due, names,
+                    descriptions, priorities, tag_counts, tags
+            ):
+                self._write_array(file, column)
+
+    @classmethod
+    def _write_array(cls, file: IO[bytes], values: array.array) -> None:
+        """Write an array in little-endian byte order."""
+        if sys.byteorder == "big":
+            values = array.array(values.typecode, values)
+            values.byteswap()
+        cls._write_bytes(file, values.tobytes())
+
+    @classmethod
+    def _write_bytes(cls, file: IO[bytes], data: bytes) -> None:
+        """Write a blob of bytes prefixed with its length."""
+        file.write(cls._LENGTH.pack(len(data)))
+        file.write(data)
+
+
+class _ArrayReader:
+    """Reads the length-prefixed arrays written by `BinaryBackend`."""
+
+    def __init__(self, data: memoryview, offset: int) -> None:
+        self.data = data
+        self.offset = offset
+
+    def read_bytes(self) -> memoryview:
+        """Read the next blob of bytes."""
+        (length,) = BinaryBackend._LENGTH.unpack_from(self.data, self.offset)
+        self.offset += BinaryBackend._LENGTH.size
+        blob = self.data[self.offset:self.offset + length]
+        self.offset += length
+        return blob
+
+    def read(self, typecode: str) -> array.array:
+        """Read the next array, whose items have the given type code."""
+        values = array.array(typecode)
+        values.frombytes(self.read_bytes())
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+
+class SqliteBackend(StorageBackend):
+    """A backend that stores task lists in an SQLite database.
+
+    Unlike the other backends, changes are applied to the database row by row,
+    so saving a change to a single task doesn't depend on the size of the task
+    list.
+    """
+
+    extensions = (".db", ".sqlite", ".sqlite3")
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS task_list (name TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER NOT NULL UNIQUE,
+            parent INTEGER REFERENCES tasks (id) ON DELETE CASCADE,
+            name TEXT NOT NULL,
+            completed INTEGER NOT NULL,
+            created REAL NOT NULL,
+            due REAL,
+            description TEXT NOT NULL,
+            priority TEXT
+        );
+        CREATE TABLE IF NOT EXISTS tags (
+            task_id INTEGER NOT NULL REFERENCES tasks (id) ON DELETE CASCADE,
+            tag TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS tasks_parent ON tasks (parent);
+        CREATE INDEX IF NOT EXISTS tasks_completed ON tasks (completed);
+        CREATE INDEX IF NOT EXISTS tasks_priority ON tasks (priority);
+        CREATE INDEX IF NOT EXISTS tasks_due ON tasks (due);
+        CREATE INDEX IF NOT EXISTS tasks_created ON tasks (created);
+        CREATE INDEX IF NOT EXISTS tags_task_id ON tags (task_id);
+        CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag);
+    """
+
+    # The columns of a task that can be changed by a "modify" change.
+    _MODIFIABLE_COLUMNS = ("name", "description", "due", "priority")
+
+    # The columns of a task selected to build its record.
+    _COLUMNS = (
+        "id, parent, name, completed, created, due, description, priority"
+    )
+
+    @staticmethod
+    def _connect(path: Path) -> "sqlite3.Connection":
+        import sqlite3
+
+        connection = sqlite3.connect(str(path))
+        connection.execute("PRAGMA foreign_keys = ON")
+        return connection
+
+    def read(self, path: Path) -> Dict[str, Any]:
+        if not path.exists():
+            # Don't let SQLite create an empty database.
+            raise FileNotFoundError(path)
+
+        connection = self._connect(path)
+        try:
+            (name,) = connection.execute(
+                "SELECT name FROM task_list"
+            ).fetchone()
+            top_level_tasks = self._read_tasks(connection)
+        finally:
+            connection.close()
+
+        return {"name": name, "tasks": top_level_tasks}
+
+    def read_lazy(self, path: Path) -> Dict[str, Any]:
+        if not path.exists():
+            raise FileNotFoundError(path)
+
+        # The connection stays open while the records are in use. Every query
+        # is read to the end, so the database isn't locked in between.
+        connection = self._connect(path)
+        try:
+            (name,) = connection.execute(
+                "SELECT name FROM task_list"
+            ).fetchone()
+        except BaseException:
+            connection.close()
+            raise
+
+        records = _SqliteRecords(connection)
+        return {
+            "name": name,
+            "tasks": _SqliteTasks(records),
+            "records": records
+        }
+
+    @classmethod
+    def _read_tasks(
+            cls, connection: "sqlite3.Connection"
+    ) -> List[Dict[str, Any]]:
+        """Read the records of the top-level tasks, with their descendants."""
+        tags: Dict[int, List[str]] = {}
+        for task_id, tag in connection.execute(
+                "SELECT task_id, tag FROM tags ORDER BY rowid"
+        ):
+            tags.setdefault(task_id, []).append(tag)
+
+        # Rows are inserted parent-first, so ordering by row ID visits parents
+        # before their children and keeps children in order.
+        top_level_tasks = []
+        json_tasks = {}
+        for row in connection.execute(
+                f"SELECT {cls._COLUMNS} FROM tasks ORDER BY rowid"
+        ):
+            json_task = cls._to_record(row, tags.get(row[0], []), [])
+
+            json_tasks[json_task["id"]] = json_task
+            if json_task["parent"] is None:
+                top_level_tasks.append(json_task)
+            else:
+                json_tasks[json_task["parent"]]["children"].append(json_task)
+
+        return top_level_tasks
+
+    @staticmethod
+    def _to_record(
+            row: Tuple[Any, ...], tags: List[str],
+            children: Sequence[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Convert a row of the tasks table, selected as `_COLUMNS`, to a
+        task record."""
+        return {
+            "name": row[2],
+            "id": row[0],
+            "completed": bool(row[3]),
+            "created": row[4],
+            "parent": row[1],
+            "children": children,
+            "due": row[5],
+            "description": row[6],
+            "priority": row[7],
+            "tags": tags
+        }
+
+    def write(self, path: Path, document: Dict[str, Any]) -> None:
+        with atomic_replace(path) as temp_path:
+            connection = self._connect(temp_path)
+            try:
+                with connection:
+                    connection.executescript(self._SCHEMA)
+                    connection.execute(
+                        "INSERT INTO task_list (name) VALUES (?)",
+                        (document["name"],)
+                    )
+
+                    # Insert the tasks in pre-order so that parents come first.
+                    stack = list(reversed(document["tasks"]))
+                    while stack:
+                        json_task = stack.pop()
+                        stack.extend(reversed(json_task["children"]))
+                        self._insert_task(connection, json_task)
+            finally:
+                connection.close()
+
+    def update(self, path: Path, changes: List[Dict[str, Any]]) -> bool:
+        if not path.exists():
+            return False
+
+        connection = self._connect(path)
+        try:
+            with connection:
+                for change in changes:
+                    self._apply_change(connection, change)
+        finally:
+            connection.close()
+
+        return True
+
+    @classmethod
+    def _apply_change(
+            cls, connection: "sqlite3.Connection", change: Dict[str, Any]
+    ) -> None:
+        """Apply a change recorded by a task list to the database."""
+        op = change["op"]
+
+        if op == "add":
+            cls._insert_task(connection, change["task"])
+        elif op == "remove":
+            # Sub-tasks and tags are deleted by the foreign key constraints.
+            connection.execute(
+                "DELETE FROM tasks WHERE id = ?", (change["id"],)
+            )
+        elif op == "modify":
+            fields = change["fields"]
+            columns = [
+                column for column in cls._MODIFIABLE_COLUMNS
+                if column in fields
+            ]
+            if columns:
+                connection.execute(
+                    f"UPDATE tasks "
+                    f"SET {', '.join(f'{column} = ?' for column in columns)} "
+                    f"WHERE id = ?",
+                    [fields[column] for column in columns] + [change["id"]]
+                )
+            if "tags" in fields:
+                cls._replace_tags(connection, change["id"], fields["tags"])
+        elif op in ("check", "uncheck"):
+            connection.execute(
+                "UPDATE tasks SET completed = ? WHERE id = ?",
+                (op == "check", change["id"])
+            )
+        elif op == "clear":
+            connection.execute("DELETE FROM tasks")
+        else:
+            raise ValueError(f"Unknown change '{op}'.")
+
+    @classmethod
+    def _insert_task(
+            cls, connection: "sqlite3.Connection", json_task: Dict[str, Any]
+    ) -> None:
+        """Insert a serialized task, without its children, into the database."""
+        connection.execute(
+            "INSERT INTO tasks (id, parent, name, completed, created, due, "
+            "description, priority) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                json_task["id"], json_task["parent"], json_task["name"],
+                json_task["completed"], json_task["created"],
+                json_task["due"], json_task["description"] or "",
+                json_task["priority"]
+            )
+        )
+        cls._replace_tags(connection, json_task["id"], json_task["tags"])
+
+    @staticmethod
+    def _replace_tags(
+            connection: "sqlite3.Connection", task_id: int,
+            tags: Optional[List[str]]
+    ) -> None:
+        """Set the tags of a task in the database."""
+        connection.execute("DELETE FROM tags WHERE task_id = ?", (task_id,))
+        connection.executemany(
+            "INSERT INTO tags (task_id, tag) VALUES (?, ?)",
+            [(task_id, tag) for tag in tags or []]
+        )
+
+
+class ShardedBackend(StorageBackend):
+    """A backend that stores every top-level task in a separate file.
+
+    A task list is stored as a directory holding a manifest and a shard for
+    each top-level task, which holds its sub-tasks as JSON. For each top-level
+    task in order, the manifest holds the task itself, the name of its shard
+    and the IDs of the tasks in the shard as ranges, so the shard of any task
+    can be found from the manifest alone.
+
+    Changes are applied by rewriting only the shards they touch, and lazily
+    loaded task lists only read a shard once one of its tasks is accessed. A
+    command that changes a single task therefore only reads and writes the
+    manifest and one shard.
+
+    Shards are never changed in place. Changed shards are written to new
+    files, then the manifest is atomically replaced to refer to them, and only
+    then are the old shards deleted. A crash therefore leaves either the old or
+    the new task list, plus possibly some unused shards that are deleted by
+    the next save.
+    """
+
+    extensions = (".shards",)
+
+    # The name of the manifest in the directory of a task list.
+    _MANIFEST = "manifest.json"
+
+    # The backend used to read and write shards, which are never lazily
+    # loaded by themselves.
+    _json = JsonBackend(index_offsets=False)
+
+    def read(self, path: Path) -> Dict[str, Any]:
+        manifest = self._read_manifest(path)
+
+        return {
+            "name": manifest["name"],
+            "tasks": [
+                dict(shard["task"], children=self._json.read(
+                    path / shard["file"]
+                ))
+                for shard in manifest["shards"]
+            ]
+        }
+
+    def read_lazy(self, path: Path) -> Dict[str, Any]:
+        manifest = self._read_manifest(path)
+
+        tasks = [
+            dict(shard["task"], children=_LazyShard(
+                path / shard["file"],
+                sum(stop - start for start, stop in shard["ids"]) > 1
+            ))
+            for shard in manifest["shards"]
+        ]
+
+        return {
+            "name": manifest["name"],
+            "tasks": tasks,
+            "records": _ShardRecords(tasks, manifest["shards"])
+        }
+
+    def write(self, path: Path, document: Dict[str, Any]) -> None:
+        path.mkdir(parents=True, exist_ok=True)
+        generation = self._next_generation(path)
+
+        shards = [
+            self._write_shard(path, generation, task, task["children"])
+            for task in document["tasks"]
+        ]
+        self._write_manifest(path, document["name"], generation, shards)
+
+    def update(self, path: Path, changes: List[Dict[str, Any]]) -> bool:
+        if not (path / self._MANIFEST).exists():
+            return False
+
+        manifest = self._read_manifest(path)
+        generation = manifest["generation"] + 1
+
+        # The shards by the ID of their top-level task, in order, and the
+        # top-level task of every task before the changes.
+        shards = {shard["task"]["id"]: shard for shard in manifest["shards"]}
+        roots = _ShardIds(manifest["shards"])
+
+        # The sub-tasks of the shards that have been read, by the ID of their
+        # top-level task, the record of every task in them and the list it is
+        # in by its ID, the top-level tasks of added tasks and the shards
+        # whose sub-tasks have changed.
+        children: Dict[int, List[Dict[str, Any]]] = {}
+        records: Dict[int, Tuple[Dict[str, Any], List[Dict[str, Any]]]] = {}
+        added_roots: Dict[int, int] = {}
+        changed = set()
+
+        def add_records(
+                root_id: int, siblings: List[Dict[str, Any]]
+        ) -> None:
+            """Add records and their descendants to the lookup tables."""
+            stack = [siblings]
+            while stack:
+                siblings = stack.pop()
+                for record in siblings:
+                    records[record["id"]] = (record, siblings)
+                    added_roots[record["id"]] = root_id
+                    stack.append(record["children"])
+
+        def root_of(task_id: int) -> Optional[int]:
+            """Return the ID of the top-level task of a task."""
+            root_id = added_roots.get(task_id)
+            return roots.get(task_id) if root_id is None else root_id
+
+        def read_children(root_id: int) -> List[Dict[str, Any]]:
+            """Return the sub-tasks of a shard, reading it if it hasn't been."""
+            if root_id not in children:
+                children[root_id] = self._json.read(
+                    path / shards[root_id]["file"]
+                )
+                add_records(root_id, children[root_id])
+            return children[root_id]
+
+        def find(task_id: int) -> Optional[Dict[str, Any]]:
+            """Return the record of a task, or None if there is no such
+            task. The shard of the task is read if it hasn't been."""
+            root_id = root_of(task_id)
+            if root_id not in shards:
+                return None
+            if root_id == task_id:
+                return shards[root_id]["task"]
+
+            read_children(root_id)
+            found = records.get(task_id)
+            return None if found is None else found[0]
+
+        for change in changes:
+            op = change["op"]
+
+            if op == "add":
+                task = change["task"]
+                if task["parent"] is None:
+                    # Adding a task that exists moves it to the end.
+                    shards.pop(task["id"], None)
+                    shards[task["id"]] = {
+                        "task": _without_children(task), "ids": []
+                    }
+                    children[task["id"]] = task["children"]
+                    add_records(task["id"], task["children"])
+                    added_roots[task["id"]] = task["id"]
+                    changed.add(task["id"])
+                elif find(task["parent"]) is not None:
+                    root_id = root_of(task["parent"])
+                    siblings = (
+                        read_children(root_id) if root_id == task["parent"]
+                        else records[task["parent"]][0]["children"]
+                    )
+                    siblings.append(task)
+                    add_records(root_id, [task])
+                    records[task["id"]] = (task, siblings)
+                    changed.add(root_id)
+            elif op == "remove":
+                record = find(change["id"])
+                if record is None:
+                    continue
+                if change["id"] in shards:
+                    del shards[change["id"]]
+                else:
+                    _, siblings = records.pop(change["id"])
+                    siblings[:] = [
+                        sibling for sibling in siblings
+                        if sibling is not record
+                    ]
+                    changed.add(root_of(change["id"]))
+            elif op in ("modify", "check", "uncheck"):
+                record = find(change["id"])
+                if record is None:
+                    continue
+                if op == "modify":
+                    record.update(change["fields"])
+                else:
+                    record["completed"] = op == "check"
+                if change["id"] not in shards:
+                    changed.add(root_of(change["id"]))
+            elif op == "clear":
+                shards.clear()
+                children.clear()
+                records.clear()
+                added_roots.clear()
+                changed.clear()
+            else:
+                raise ValueError(f"Unknown change '{op}'.")
+
+        new_shards = []
+        for root_id, shard in shards.items():
+            if root_id in changed:
+                shard = self._write_shard(
+                    path, generation, shard["task"], children[root_id]
+                )
+            new_shards.append(shard)
+        self._write_manifest(path, manifest["name"], generation, new_shards)
+
+        return True
+
+    def _read_manifest(self, path: Path) -> Dict[str, Any]:
+        """Read the manifest of a task list."""
+        with (path / self._MANIFEST).open() as file:
+            return json.load(file)
+
+    def _next_generation(self, path: Path) -> int:
+        """Return the generation of the next version of a task list."""
+        try:
+            return self._read_manifest(path)["generation"] + 1
+        except FileNotFoundError:
+            return 0
+
+    def _write_shard(
+            self, path: Path, generation: int, task: Dict[str, Any],
+            children: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Write the shard of a top-level task and return its manifest entry.
+
+        Args:
+            path: The path of the task list.
+            generation: The generation of the version of the task list the
+                shard is part of, which makes the name of its file unique.
+            task: The record of the top-level task.
+            children: The records of the sub-tasks of the task.
+        """
+        name = f"{task['id']}.{generation}.json"
+        self._json.write(path / name, children)
+
+        ids = [task["id"]]
+        stack = list(children)
+        while stack:
+            record = stack.pop()
+            ids.append(record["id"])
+            stack.extend(record["children"])
+
+        return {
+            "task": _without_children(task), "file": name,
+            "ids": _to_ranges(ids)
+        }
+
+    def _write_manifest(
+            self, path: Path, name: str, generation: int,
+            shards: List[Dict[str, Any]]
+    ) -> None:
+        """Replace the manifest of a task list and delete unused shards."""
+        manifest = {"name": name, "generation": generation, "shards": shards}
+        with atomic_write(path / self._MANIFEST) as file:
+            json.dump(manifest, file)
+
+        used = {shard["file"] for shard in shards}
+        used.add(self._MANIFEST)
+        for file_path in path.iterdir():
+            if file_path.name not in used and file_path.suffix == ".json":
+                with contextlib.suppress(FileNotFoundError):
+                    file_path.unlink()
+
+
+class _LazyRecords(abc.ABC):
+    """Task records which are read when first accessed."""
+
+    def __init__(self, has_records: bool) -> None:
+        """Initialize the object.
+
+        Args:
+            has_records: Whether there are any records, which is known without
+                reading them.
+        """
+        self._has_records = has_records
+        self._records: Optional[List[Dict[str, Any]]] = None
+
+    @abc.abstractmethod
+    def _read(self) -> List[Dict[str, Any]]:
+        """Read the records."""
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        """The records, which are read the first time this is accessed."""
+        if self._records is None:
+            self._records = self._read()
+        return self._records
+
+    def __bool__(self) -> bool:
+        return self._has_records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        return self.records[index]
+
+
+class _LazyShard(_LazyRecords):
+    """The records of the sub-tasks of a top-level task, which are read from
+    its shard when first accessed."""
+
+    def __init__(self, path: Path, has_children: bool) -> None:
+        """Initialize the object.
+
+        Args:
+            path: The path of the shard.
+            has_children: Whether the top-level task has sub-tasks, which is
+                known without reading the shard.
+        """
+        super().__init__(has_children)
+        self._path = path
+
+    def _read(self) -> List[Dict[str, Any]]:
+        return ShardedBackend._json.read(self._path)
+
+
+class _IndexedRecords(_LazyRecords):
+    """The records of the sub-tasks of a task in a mapped JSON task list
+    file, or of its top-level tasks, which are decoded when first accessed.
+    See `OffsetIndex.children`."""
+
+    def __init__(
+            self, offsets: OffsetIndex, task_id: Optional[int],
+            has_records: bool
+    ) -> None:
+        """Initialize the object.
+
+        Args:
+            offsets: The offset index of the file.
+            task_id: The ID of the task, or None for the top-level tasks.
+            has_records: Whether there are any records.
+        """
+        super().__init__(has_records)
+        self._offsets = offsets
+        self._task_id = task_id
+
+    def _read(self) -> List[Dict[str, Any]]:
+        return self._offsets.children(self._task_id)
+
+
+class _SqliteTasks(_LazyRecords):
+    """The records of the top-level tasks in an SQLite task list, with their
+    descendants, which are read in one pass when first accessed."""
+
+    def __init__(self, lookup: "_SqliteRecords") -> None:
+        """Initialize the object.
+
+        Args:
+            lookup: The records of the task list by ID, which hold the
+                connection to its database.
+        """
+        super().__init__(lookup.has_tasks())
+        self._lookup = lookup
+
+    def _read(self) -> List[Dict[str, Any]]:
+        return SqliteBackend._read_tasks(self._lookup.connection)
+
+
+class _SqliteChildren(_LazyRecords):
+    """The records of the sub-tasks of a task in an SQLite task list, which
+    are queried when first accessed."""
+
+    def __init__(
+            self, lookup: "_SqliteRecords", parent_id: int, has_children: bool
+    ) -> None:
+        """Initialize the object.
+
+        Args:
+            lookup: The records of the task list by ID.
+            parent_id: The ID of the task.
+            has_children: Whether the task has sub-tasks, which is queried
+                along with the task.
+        """
+        super().__init__(has_children)
+        self._lookup = lookup
+        self._parent_id = parent_id
+
+    def _read(self) -> List[Dict[str, Any]]:
+        return self._lookup.children(self._parent_id)
+
+
+class _SqliteRecords:
+    """The records of the tasks in an SQLite task list by ID, which are
+    queried when looked up.
+
+    The sub-tasks of a record are queried when first accessed, using the
+    index of tasks by parent. The connection to the database is closed once
+    neither this nor any record from it is in use.
+
+    Attributes:
+        connection: The connection to the database.
+    """
+
+    # The columns selected for a record, including whether it has sub-tasks.
+    _SELECT = (
+        f"SELECT {SqliteBackend._COLUMNS}, EXISTS ("
+        f"SELECT 1 FROM tasks AS child WHERE child.parent = tasks.id"
+        f") FROM tasks"
+    )
+
+    def __init__(self, connection: "sqlite3.Connection") -> None:
+        """Initialize the object.
+
+        Args:
+            connection: The connection to the database, which is closed
+                along with this object.
+        """
+        import weakref
+
+        self.connection = connection
+        weakref.finalize(self, connection.close)
+
+    def has_tasks(self) -> bool:
+        """Return whether there are any tasks."""
+        (has_tasks,) = self.connection.execute(
+            "SELECT EXISTS (SELECT 1 FROM tasks)"
+        ).fetchall()[0]
+        return bool(has_tasks)
+
+    def children(self, parent_id: int) -> List[Dict[str, Any]]:
+        """Query the records of the sub-tasks of a task, in order."""
+        tags: Dict[int, List[str]] = {}
+        for task_id, tag in self.connection.execute(
+                "SELECT tags.task_id, tags.tag FROM tags "
+                "JOIN tasks ON tasks.id = tags.task_id "
+                "WHERE tasks.parent = ? ORDER BY tags.rowid",
+                (parent_id,)
+        ).fetchall():
+            tags.setdefault(task_id, []).append(tag)
+
+        rows = self.connection.execute(
+            f"{self._SELECT} WHERE parent = ? ORDER BY rowid", (parent_id,)
+        ).fetchall()
+        return [self._to_record(row, tags.get(row[0], [])) for row in rows]
+
+    def __getitem__(self, task_id: int) -> Dict[str, Any]:
+        rows = self.connection.execute(
+            f"{self._SELECT} WHERE id = ?", (task_id,)
+        ).fetchall()
+        if not rows:
+            raise KeyError(task_id)
+
+        tags = [tag for (tag,) in self.connection.execute(
+            "SELECT tag FROM tags WHERE task_id = ? ORDER BY rowid",
+            (task_id,)
+        ).fetchall()]
+        return self._to_record(rows[0], tags)
+
+    def _to_record(
+            self, row: Tuple[Any, ...], tags: List[str]
+    ) -> Dict[str, Any]:
+        """Convert a row selected by `_SELECT` to a record whose sub-tasks are
+        queried when first accessed."""
+        return SqliteBackend._to_record(
+            row, tags, _SqliteChildren(self, row[0], bool(row[-1]))
+        )
+
+
+class _ShardRecords:
+    """The records of the tasks in a lazily loaded sharded task list by ID.
+
+    The sub-tasks of a top-level task are indexed the first time one of them
+    is looked up, which reads its shard.
+    """
+
+    def __init__(
+            self, tasks: List[Dict[str, Any]], shards: List[Dict[str, Any]]
+    ) -> None:
+        """Initialize the object.
+
+        Args:
+            tasks: The records of the top-level tasks.
+            shards: The entries of the shards in the manifest.
+        """
+        self._roots = _ShardIds(shards)
+        self._records = {record["id"]: record for record in tasks}
+        self._indexed_roots = set()
+
+    def __getitem__(self, task_id: int) -> Dict[str, Any]:
+        record = self._records.get(task_id)
+        if record is not None:
+            return record
+
+        root_id = self._roots[task_id]
+        if root_id not in self._indexed_roots:
+            self._indexed_roots.add(root_id)
+            stack = list(self._records[root_id]["children"])
+            while stack:
+                record = stack.pop()
+                self._records[record["id"]] = record
+                stack.extend(record["children"])
+
+        return self._records[task_id]
+
+
+class _ShardIds:
+    """The ID of the top-level task of every task in a sharded task list, by
+    the ID of the task, looked up in the ranges of IDs in the manifest."""
+
+    def __init__(self, shards: List[Dict[str, Any]]) -> None:
+        """Initialize the object.
+
+        Args:
+            shards: The entries of the shards in the manifest.
+        """
+        import bisect
+
+        ranges = sorted(
+            (start, stop, shard["task"]["id"])
+            for shard in shards for start, stop in shard["ids"]
+        )
+        self._starts = [start for start, _, _ in ranges]
+        self._ranges = ranges
+        self._bisect = bisect.bisect_right
+
+    def get(self, task_id: int) -> Optional[int]:
+        """Return the ID of the top-level task of a task, or None if there is
+        no task with the ID."""
+        position = self._bisect(self._starts, task_id) - 1
+        if position < 0:
+            return None
+        _, stop, root_id = self._ranges[position]
+        return root_id if task_id < stop else None
+
+    def __getitem__(self, task_id: int) -> int:
+        root_id = self.get(task_id)
+        if root_id is None:
+            raise KeyError(task_id)
+        return root_id
+
+
+def _without_children(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of a task record without its sub-tasks."""
+    return {key: value for key, value in record.items() if key != "children"}
+
+
+def _to_ranges(ids: List[int]) -> List[List[int]]:
+    """Convert IDs to a sorted list of half-open ranges that contain them."""
+    ranges: List[List[int]] = []
+    for task_id in sorted(ids):
+        if ranges and ranges[-1][1] == task_id:
+            ranges[-1][1] += 1
+        else:
+            ranges.append([task_id, task_id + 1])
+    return ranges
+
+
+# The available backends. The first one is used for unknown file extensions.
+BACKENDS: List[StorageBackend] = [
+    JsonBackend(), BinaryBackend(), SqliteBackend(), ShardedBackend()
+]
+
+
+def get_backend(path: Path) -> StorageBackend:
+    """Return the storage backend for a file based on its extension."""
+    for backend in BACKENDS:
+        if path.suffix in backend.extensions:
+            return backend
+    return BACKENDS[0]
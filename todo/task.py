@@ -1,63 +1,384 @@
 """Classes for representing tasks and task lists."""
 import contextlib
 import datetime
-import itertools
-import json
+import enum
+import heapq
+import operator
+import sys
+import time
 from pathlib import Path
-from typing import List, Optional, Dict, Collection, Any, Generator
+from typing import (
+    List, Optional, Dict, Collection, Any, Generator, Union, Callable,
+    Iterable, Mapping, Sequence, Tuple
+)
 
-# The string to indent with when formatting JSON.
-from todo.constants import TODO_DIRECTORY
+from todo.constants import TODO_DIRECTORY, JOURNAL_COMPACTION_SIZE
+from todo.indexes import SiblingOrder, TaskIndex, TextIndex
+from todo.storage import get_backend, lock, Journal
+from todo.traversal import walk_preorder, walk_postorder
 
-JSON_INDENT = "  "
+
+class Priority(enum.Enum):
+    """The priority level of a task."""
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+
+
+# The sub-tasks or tags of a task that has none. This is shared between tasks so
+# that they don't each need an empty list.
+_EMPTY = ()
 
 
 class Task:
     """A task created by the user.
 
+    Tasks are stored compactly because task lists can contain millions of them.
+    Dates are stored as POSIX timestamps and only converted when they are
+    accessed, priorities are stored as `Priority` members and tags are interned
+    strings in a shared tuple.
+
+    Sub-tasks are stored in a dictionary mapping their IDs to them, which keeps
+    them in the order they were added while allowing any of them to be removed
+    in constant time.
+
+    Each task also caches how many descendants it has and how many of them are
+    incomplete. These are counted when first needed and then kept up to date by
+    `TaskList` as tasks are added, removed, checked and unchecked.
+
     Args:
         name: The name of this task.
         task_id: The ID of the task.
         completed: Whether this task has been completed.
-        created: The time and date at which this task was created. If None,
-            this is the current time and date.
+        created: The time and date at which this task was created, or its POSIX
+            timestamp. If None, this is the current time and date.
         parent: The ID of a task's parent, or None, if the task is top-level.
         description: The description of a task.
-        due: The due date of a task.
+        due: The due date of a task, or its POSIX timestamp.
         priority: The priority level of a task relative to its peer tasks.
         tags: Any specific flags attached to this task.
     """
+
+    __slots__ = (
+        "name", "task_id", "completed", "_created", "parent", "_children",
+        "description", "_due", "_priority", "_tags", "_pending_children",
+        "_descendants", "_incomplete_descendants"
+    )
+
     def __init__(
             self, name: str, task_id: int, completed: bool = False,
-            created: Optional[datetime.datetime] = None,
+            created: Union[datetime.datetime, float, None] = None,
             parent: Optional[int] = None,
             children: Optional[List["Task"]] = None,
             description: Optional[str] = None,
-            due: Optional[datetime.datetime] = None,
+            due: Union[datetime.datetime, float, None] = None,
             priority: Optional[str] = None,
-            tags: Optional[List[str]] = None
+            tags: Optional[Iterable[str]] = None
     ) -> None:
         self.name: str = name
         self.task_id: int = task_id
         self.completed: bool = completed
-        self.created: datetime.datetime = created or datetime.datetime.now()
+        self.created = time.time() if created is None else created
         self.parent: Optional[int] = parent
-        self.children: List[Task] = children or []
+        self.children = children
         self.description: str = description or ""
-        self.due: Optional[datetime.datetime] = due
-        self.priority: Optional[str] = priority
-        self.tags: List[str] = tags or []
+        self.due = due
+        self.priority = priority
+        self.tags = tags
+
+    @property
+    def created(self) -> datetime.datetime:
+        """The time and date at which this task was created."""
+        return datetime.datetime.fromtimestamp(self._created)
+
+    @created.setter
+    def created(self, created: Union[datetime.datetime, float]) -> None:
+        self._created: float = _to_timestamp(created)
+
+    @property
+    def created_timestamp(self) -> float:
+        """The POSIX timestamp at which this task was created."""
+        return self._created
+
+    @property
+    def due(self) -> Optional[datetime.datetime]:
+        """The due date of this task."""
+        return (
+            None if self._due is None
+            else datetime.datetime.fromtimestamp(self._due)
+        )
+
+    @due.setter
+    def due(self, due: Union[datetime.datetime, float, None]) -> None:
+        self._due: Optional[float] = None if due is None else _to_timestamp(due)
+
+    @property
+    def due_timestamp(self) -> Optional[float]:
+        """The POSIX timestamp of the due date of this task."""
+        return self._due
+
+    @property
+    def priority(self) -> Optional[str]:
+        """The priority level of this task, as the value of a `Priority`."""
+        return None if self._priority is None else self._priority.value
+
+    @priority.setter
+    def priority(self, priority: Union[Priority, str, None]) -> None:
+        self._priority: Optional[Priority] = (
+            None if priority is None else Priority(priority)
+        )
+
+    @property
+    def tags(self) -> Sequence[str]:
+        """The flags attached to this task."""
+        return self._tags
+
+    @tags.setter
+    def tags(self, tags: Optional[Iterable[str]]) -> None:
+        self._tags: Sequence[str] = (
+            tuple(sys.intern(tag) for tag in tags) if tags else _EMPTY
+        )
+
+    @property
+    def children(self) -> Collection["Task"]:
+        """A read-only view of the sub-tasks of this task."""
+        if self._pending_children is not None:
+            records, load_task, _, _ = self._pending_children
+            self._pending_children = None
+            self._children = {
+                record["id"]: load_task(record) for record in records
+            } or None
+        return _EMPTY if self._children is None else self._children.values()
+
+    @children.setter
+    def children(self, children: Optional[Iterable["Task"]]) -> None:
+        self._children: Optional[Dict[int, Task]] = {
+            child.task_id: child for child in children or _EMPTY
+        } or None
+
+        # The serialized sub-tasks of this task, the function to build them
+        # with, the tasks whose records are out of date and the counts of the
+        # descendants of records, if they haven't been built yet. See
+        # `TaskList.load`.
+        self._pending_children: Optional[Tuple[
+            List[Dict[str, Any]], Callable[[Dict[str, Any]], Task],
+            Mapping[int, Task], Dict[int, Tuple[int, int]]
+        ]] = None
+
+        # The number of descendants and incomplete descendants, or None if
+        # they haven't been counted yet.
+        self._descendants: Optional[int] = None if self._children else 0
+        self._incomplete_descendants: Optional[int] = (
+            None if self._children else 0
+        )
+
+    def _defer_children(
+            self, records: List[Dict[str, Any]],
+            load_task: Callable[[Dict[str, Any]], "Task"],
+            changed_tasks: Mapping[int, "Task"],
+            record_counts: Dict[int, Tuple[int, int]]
+    ) -> None:
+        """Build the sub-tasks of this task from records when first needed.
+
+        Args:
+            records: The records of the sub-tasks.
+            load_task: The function to build a task from its record with.
+            changed_tasks: The tasks, by ID, that were changed after being
+                built, whose records are therefore out of date.
+            record_counts: The number of descendants and incomplete
+                descendants of the records that have been counted, by ID,
+                which are shared by the tasks of a task list.
+        """
+        self.children = None
+        if records:
+            self._pending_children = (
+                records, load_task, changed_tasks, record_counts
+            )
+            self._descendants = None
+            self._incomplete_descendants = None
+
+    @property
+    def descendant_count(self) -> int:
+        """The number of descendants of this task."""
+        self._count_descendants()
+        return self._descendants
+
+    @property
+    def incomplete_descendant_count(self) -> int:
+        """The number of descendants of this task that aren't completed."""
+        self._count_descendants()
+        return self._incomplete_descendants
+
+    def _count_descendants(self) -> None:
+        """Count the descendants of this task if they haven't been yet.
+
+        The counts of every descendant that hasn't been counted are cached
+        along the way. Descendants that haven't been built yet are counted
+        from their records without building them.
+        """
+        if self._descendants is not None:
+            return
+
+        for task in walk_postorder([self], _get_uncounted_children):
+            descendants = incomplete_descendants = 0
+
+            if task._pending_children is not None:
+                records, _, changed_tasks, record_counts = (
+                    task._pending_children
+                )
+                if not changed_tasks:
+                    # Count from the records, reusing and caching the
+                    # counts of each of them for the tasks built later.
+                    task._descendants, task._incomplete_descendants = (
+                        _count_records(records, record_counts)
+                    )
+                    continue
+
+                for descendant in _walk_pending_descendants(task):
+                    if isinstance(descendant, Task):
+                        descendants += 1 + descendant._descendants
+                        incomplete_descendants += (
+                            (not descendant.completed)
+                            + descendant._incomplete_descendants
+                        )
+                    else:
+                        descendants += 1
+                        incomplete_descendants += not descendant["completed"]
+            else:
+                for child in task.children:
+                    descendants += 1 + child._descendants
+                    incomplete_descendants += (
+                        (not child.completed) + child._incomplete_descendants
+                    )
+
+            task._descendants = descendants
+            task._incomplete_descendants = incomplete_descendants
+
+    def _add_to_counts(
+            self, descendants: int, incomplete_descendants: int
+    ) -> None:
+        """Adjust the cached counts of descendants if they have been counted."""
+        if self._descendants is not None:
+            self._descendants += descendants
+            self._incomplete_descendants += incomplete_descendants
+
+    def _add_child(self, child: "Task") -> None:
+        """Add a task to the end of the sub-tasks of this task."""
+        if not self.children:
+            self._children = {}
+        self._children[child.task_id] = child
+
+    def _remove_child(self, child: "Task") -> None:
+        """Remove a task from the sub-tasks of this task."""
+        if self.children:
+            self._children.pop(child.task_id, None)
+            if not self._children:
+                self._children = None
 
     def walk(self) -> Generator["Task", None, None]:
         """Return a generator for iterating the descendants of this task."""
-        for child in self.children:
-            yield child
-            child.walk()
+        yield from walk_preorder(self.children, _get_children)
 
     def __repr__(self) -> str:
         return f"Task(\"{self.name}\")"
 
 
+# Functions returning the sub-tasks of a task or a serialized task.
+_get_children = operator.attrgetter("children")
+_get_json_children = operator.itemgetter("children")
+
+
+def _get_uncounted_children(task: Task) -> Sequence[Task]:
+    """Return the built sub-tasks of a task whose descendants aren't counted.
+
+    For a task whose sub-tasks haven't been built, these are the changed
+    descendants that its records are counted around instead.
+    """
+    if task._pending_children is not None:
+        if not task._pending_children[2]:
+            return _EMPTY
+        return [
+            descendant for descendant in _walk_pending_descendants(task)
+            if isinstance(descendant, Task) and descendant._descendants is None
+        ]
+    return [
+        child for child in task.children if child._descendants is None
+    ]
+
+
+def _count_records(
+        records: List[Dict[str, Any]],
+        record_counts: Dict[int, Tuple[int, int]]
+) -> Tuple[int, int]:
+    """Count records and their descendants, and how many are incomplete.
+
+    The counts of the descendants of every record are cached by ID in a single
+    post-order pass, so records that were already counted aren't walked
+    again.
+    """
+    def uncounted_children(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [
+            child for child in record["children"]
+            if child["id"] not in record_counts
+        ]
+
+    def total(children: List[Dict[str, Any]]) -> Tuple[int, int]:
+        descendants = incomplete_descendants = 0
+        for child in children:
+            child_descendants, child_incomplete = record_counts[child["id"]]
+            descendants += 1 + child_descendants
+            incomplete_descendants += (
+                (not child["completed"]) + child_incomplete
+            )
+        return descendants, incomplete_descendants
+
+    uncounted = [
+        record for record in records if record["id"] not in record_counts
+    ]
+    for record in walk_postorder(uncounted, uncounted_children):
+        record_counts[record["id"]] = total(record["children"])
+
+    return total(records)
+
+
+def _walk_pending_descendants(
+        task: Task
+) -> Generator[Union[Dict[str, Any], Task], None, None]:
+    """Return a generator for the records of the descendants of a task whose
+    sub-tasks haven't been built.
+
+    Tasks that were changed after being built are given instead of their out
+    of date records, without their descendants.
+    """
+    records, _, changed_tasks, _ = task._pending_children
+    if not changed_tasks:
+        yield from walk_preorder(records, _get_json_children)
+        return
+
+    stack = list(records)
+    while stack:
+        record = stack.pop()
+        changed_task = changed_tasks.get(record["id"])
+        if changed_task is None:
+            stack.extend(record["children"])
+            yield record
+        else:
+            yield changed_task
+
+
+def _to_timestamp(date: Union[datetime.datetime, float]) -> float:
+    """Convert a date to a POSIX timestamp if it isn't one already.
+
+    Throws:
+        TypeError: The date is neither a `datetime` nor a number.
+    """
+    if isinstance(date, datetime.datetime):
+        return date.timestamp()
+    if isinstance(date, (int, float)) and not isinstance(date, bool):
+        return float(date)
+    raise TypeError(f"{date!r} isn't a date or a POSIX timestamp.")
+
+
 class TaskList:
     """A user-defined collection of tasks.
 
@@ -69,6 +390,10 @@ class TaskList:
     The dictionary stores maps both tasks and all their sub-tasks.
     """
 
+    # Task lists kept in memory by a server, by the path of their file. These
+    # are used by `load` instead of reading the file. See `todo.server`.
+    resident: Dict[Path, "TaskList"] = {}
+
     def __init__(self, name: str, tasks: Optional[List[Task]] = None) -> None:
         """Initialize the object.
 
@@ -81,31 +406,348 @@ class TaskList:
             ValueError: There is a repeating ID in the given tasks.
         """
         self.name: str = name
-        self._tasks: Dict[int, Task] = {} if tasks is None else {
+
+        # The changes made since this task list was last saved. Storage
+        # backends that support it apply these instead of rewriting every task.
+        self._changes: List[Dict[str, Any]] = []
+
+        # Whether tasks were added without recording the changes, so that the
+        # whole task list has to be written when it's next saved. See
+        # `add_tasks`.
+        self._rewrite: bool = False
+
+        self._task_index: Dict[int, Task] = {} if tasks is None else {
             task.task_id: task for task in self._walk_tasks(tasks)
         }
 
-    def _walk_tasks(self, tasks: List[Task]) -> Generator[Task, None, None]:
+        # The top-level tasks, in the order they were added, or None if they
+        # haven't been built from the records of a lazily-loaded task list
+        # yet. See `_root_tasks`.
+        self._root_task_index: Optional[Dict[int, Task]] = {
+            task_id: task for task_id, task in self._task_index.items()
+            if task.parent is None
+        }
+
+        # The top-level tasks added to a lazily-loaded task list before the
+        # others were built, which go after them.
+        self._added_root_tasks: Dict[int, Task] = {}
+
+        # For a lazily-loaded task list, the serialized top-level tasks and,
+        # once needed, the serialized tasks by ID. Tasks are only built from
+        # these when they are accessed. See `load`.
+        self._root_records: Optional[List[Dict[str, Any]]] = None
+        self._record_index: Optional[Dict[int, Dict[str, Any]]] = None
+
+        # For a lazily-loaded task list whose storage backend provides it, the
+        # serialized tasks by ID, which lets a task be found without reading
+        # the others. See `todo.storage.StorageBackend.read_lazy`.
+        self._record_lookup: Optional[Mapping[int, Dict[str, Any]]] = None
+
+        # The tasks of a lazily-loaded task list that were changed or added
+        # after it was loaded, by ID. Their records, if any, and those of their
+        # ancestors are out of date, so these tasks are used instead.
+        self._changed_tasks: Dict[int, Task] = {}
+
+        # For a lazily-loaded task list, the number of descendants and
+        # incomplete descendants of each record that has been counted, by ID.
+        # These are only used while no task has been changed.
+        self._record_counts: Dict[int, Tuple[int, int]] = {}
+
+        # The secondary indexes of the tasks, or None if they haven't been
+        # needed yet. See `index`.
+        self._index: Optional[TaskIndex] = None
+
+        # The inverted indexes of the text of the tasks by the attribute they
+        # index, once needed. See `text_index`.
+        self._text_indexes: Dict[str, TextIndex] = {}
+
+        # The sorted orders of the sub-tasks of each task by the attribute they
+        # are sorted by and whether they are reversed, once needed. See
+        # `sibling_order`.
+        self._sibling_orders: Dict[Tuple[str, bool], SiblingOrder] = {}
+
+        self._index_ids()
+
+    def _index_ids(self) -> None:
+        """Find the unused task IDs."""
+        # IDs below the high-water mark that are not in use, kept as a min-heap
+        # so that the lowest unused ID can be found without scanning.
+        self._next_id: int = max(self._task_index, default=-1) + 1
+        self._free_ids: List[int] = [
+            task_id for task_id in range(self._next_id)
+            if task_id not in self._task_index
+        ]
+
+    @property
+    def _tasks(self) -> Dict[int, Task]:
+        """All tasks in this task list by ID, including sub-tasks."""
+        # Build any tasks that haven't been loaded yet.
+        if self._root_records is not None:
+            root_tasks = self._root_tasks
+            self._root_records = None
+            self._record_index = None
+            self._record_lookup = None
+            self._changed_tasks.clear()
+            self._record_counts.clear()
+
+            for _ in self._walk_tasks(root_tasks.values()):
+                pass
+
+            self._index_ids()
+
+        return self._task_index
+
+    @property
+    def _root_tasks(self) -> Dict[int, Task]:
+        """The top-level tasks in this task list by ID, in order."""
+        if self._root_task_index is None:
+            self._root_task_index = {
+                record["id"]: self._load_task(record)
+                for record in self._root_records
+            }
+            self._root_task_index.update(self._added_root_tasks)
+            self._added_root_tasks.clear()
+        return self._root_task_index
+
+    def _load_task(self, record: Dict[str, Any]) -> Task:
+        """Return the task for a record of a lazily-loaded task list.
+
+        The task is built the first time this is called for it, but its
+        sub-tasks aren't built until they are accessed.
+        """
+        task = self._task_index.get(record["id"])
+
+        if task is None:
+            task = Task(
+                name=record["name"], task_id=record["id"],
+                completed=record["completed"], created=record["created"],
+                parent=record["parent"], description=record["description"],
+                due=record["due"], priority=record["priority"],
+                tags=record["tags"]
+            )
+            task._defer_children(
+                record["children"], self._load_task, self._changed_tasks,
+                self._record_counts
+            )
+            self._task_index[task.task_id] = task
+
+        return task
+
+    def _find_record(self, task_id: int) -> Dict[str, Any]:
+        """Return the record of a task in a lazily-loaded task list.
+
+        Unless the storage backend can look records up by ID, the records are
+        indexed by ID the first time one is needed.
+        """
+        if self._record_lookup is not None:
+            return self._record_lookup[task_id]
+
+        if self._record_index is None:
+            self._record_index = {}
+            stack = list(self._root_records)
+            while stack:
+                record = stack.pop()
+                self._record_index[record["id"]] = record
+                stack.extend(record["children"])
+
+        return self._record_index[task_id]
+
+    @property
+    def index(self) -> TaskIndex:
+        """The secondary indexes of the tasks in this task list.
+
+        The indexes are built the first time they are accessed and then kept
+        up to date as the task list is changed. The indexes of a lazily-loaded
+        task list are built from the serialized tasks without building them,
+        unless it has been changed.
+        """
+        if self._index is None:
+            if self._root_records is not None and not self._changed_tasks:
+                self._index = TaskIndex(
+                    (
+                        record["id"], record["completed"], record["priority"],
+                        record["tags"], record["due"]
+                    )
+                    for record in walk_preorder(
+                        self._root_records, _get_json_children
+                    )
+                )
+            else:
+                self._index = TaskIndex(
+                    (
+                        task.task_id, task.completed, task.priority,
+                        task.tags, task.due_timestamp
+                    )
+                    for task in self._tasks.values()
+                )
+
+        return self._index
+
+    @property
+    def indexed(self) -> bool:
+        """Whether the secondary indexes of this task list have been built."""
+        return self._index is not None
+
+    def text_index(self, attribute: str) -> TextIndex:
+        """Return the inverted index of the names or descriptions of the tasks.
+
+        Like `index`, it is built the first time it is needed and then kept
+        up to date.
+
+        Args:
+            attribute: "name" or "description".
+        """
+        if attribute not in ("name", "description"):
+            raise ValueError(f"Tasks can't be searched by '{attribute}'.")
+
+        text_index = self._text_indexes.get(attribute)
+
+        if text_index is None:
+            if self._root_records is not None and not self._changed_tasks:
+                text_index = TextIndex(
+                    (record["id"], record[attribute] or "")
+                    for record in walk_preorder(
+                        self._root_records, _get_json_children
+                    )
+                )
+            else:
+                text_index = TextIndex(
+                    (task.task_id, getattr(task, attribute))
+                    for task in self._tasks.values()
+                )
+            self._text_indexes[attribute] = text_index
+
+        return text_index
+
+    def has_text_index(self, attribute: str) -> bool:
+        """Whether the inverted index of an attribute has been built."""
+        return attribute in self._text_indexes
+
+    def sibling_order(
+            self, attribute: str, reverse: bool = False
+    ) -> SiblingOrder:
+        """Return the order of the sub-tasks of each task by an attribute.
+
+        The sub-tasks of a task are sorted the first time they are requested
+        and then kept in order as tasks are added, removed and renamed.
+
+        Args:
+            attribute: "name" or "created".
+            reverse: Sort the tasks in descending order.
+        """
+        order = self._sibling_orders.get((attribute, reverse))
+
+        if order is None:
+            if attribute == "name":
+                key = operator.attrgetter("name")
+            elif attribute == "created":
+                key = operator.attrgetter("created_timestamp")
+            else:
+                raise ValueError(f"Tasks can't be sorted by '{attribute}'.")
+
+            order = SiblingOrder(key, self._get_children, reverse)
+            self._sibling_orders[attribute, reverse] = order
+
+        return order
+
+    def _get_children(self, task_id: Optional[int]) -> Collection[Task]:
+        """Return the sub-tasks of a task, or the top-level tasks for None."""
+        if task_id is None:
+            return self.tasks
+        return self.get_task(task_id).children
+
+    def _index_task(self, task: Task, updating: bool = False) -> None:
+        """Add a task to the indexes that have been built.
+
+        Args:
+            task: The task to add.
+            updating: The task is already in the task list and is being added
+                back after `_unindex_task` to update its attributes.
+        """
+        # Every task that is added or changed is indexed again afterwards, at
+        # which point its record, if any, is out of date.
+        if self._root_records is not None:
+            self._changed_tasks[task.task_id] = task
+        if self._index is not None:
+            self._index.add(
+                task.task_id, task.completed, task.priority, task.tags,
+                task.due_timestamp
+            )
+        for attribute, text_index in self._text_indexes.items():
+            text_index.add(task.task_id, getattr(task, attribute))
+        for order in self._sibling_orders.values():
+            if updating:
+                order.update(task)
+            else:
+                order.add(task)
+
+    def _unindex_task(self, task: Task, updating: bool = False) -> None:
+        """Remove a task from the indexes that have been built.
+
+        Args:
+            task: The task to remove.
+            updating: The task is only being removed so that its attributes can
+                be updated. See `_index_task`.
+        """
+        if self._index is not None:
+            self._index.discard(
+                task.task_id, task.completed, task.priority, task.tags,
+                task.due_timestamp
+            )
+        for text_index in self._text_indexes.values():
+            text_index.discard(task.task_id)
+        if not updating:
+            for order in self._sibling_orders.values():
+                order.discard(task)
+
+    @property
+    def dirty(self) -> bool:
+        """Whether this task list has been changed since it was last saved."""
+        return bool(self._changes) or self._rewrite
+
+    @property
+    def changes(self) -> List[Dict[str, Any]]:
+        """The changes made since this task list was last saved.
+
+        Each change is a JSON-compatible dictionary whose "op" is one of "add",
+        "remove", "modify", "check", "uncheck" or "clear".
+        """
+        return self._changes
+
+    def _walk_tasks(
+            self, tasks: Iterable[Task]
+    ) -> Generator[Task, None, None]:
         """Return a generator for iterating tasks and their descendants."""
-        for task in tasks:
-            yield task
-            yield from self._walk_tasks(task.children)
+        yield from walk_preorder(tasks, _get_children)
 
     def _find_id(self) -> int:
-        """Find the first unused task ID."""
-        for potential_id in itertools.count():
-            if potential_id not in self._tasks.keys():
-                return potential_id
+        """Find the first unused task ID and reserve it."""
+        # Every task has to be built to find the unused IDs.
+        tasks = self._tasks
+
+        while self._free_ids:
+            task_id = heapq.heappop(self._free_ids)
+
+            # IDs taken by `_insert_task` are left in the heap and skipped here.
+            if task_id not in tasks:
+                return task_id
+
+        self._next_id += 1
+        return self._next_id - 1
+
+    def _release_id(self, task_id: int) -> None:
+        """Make a task ID available to be used by a new task."""
+        heapq.heappush(self._free_ids, task_id)
 
     @property
     def tasks(self) -> Collection[Task]:
-        """A read-only view of the tasks in this task list."""
-        # Return only top-level tasks.
-        return [task for task in self._tasks.values() if task.parent is None]
+        """A read-only view of the top-level tasks in this task list."""
+        return self._root_tasks.values()
 
     def add_task(
             self, name: str, parent: Optional[int] = None,
-            description: Optional[str] = None, due: Optional[str] = None,
+            description: Optional[str] = None,
+            due: Union[datetime.datetime, float, None] = None,
             priority: Optional[str] = None, tags: Optional[List[str]] = None
     ) -> Task:
         """Add a task to this task list.
@@ -118,42 +760,191 @@ class TaskList:
             parent: The ID of a task's parent, or None, if the task is
                 top-level.
             description: The description of a task.
-            due: The due date of a task.
+            due: The due date of a task, or its POSIX timestamp.
             priority: The priority of the task.
             tags: Any flags attached to this task.
 
         Returns:
             The newly-created task.
+
+        Throws:
+            KeyError: There is no task with the ID of the parent.
         """
+        # Look up the parent first so that a missing parent doesn't leave an ID
+        # reserved.
+        if parent is not None:
+            self.get_task(parent)
+
         new_task = Task(
             name=name, task_id=self._find_id(), parent=parent,
             description=description, due=due, priority=priority,
             tags=tags
         )
 
-        self._tasks[new_task.task_id] = new_task
+        self._insert_task(new_task)
+        self._changes.append(
+            {"op": "add", "task": self._serialize_task(new_task)}
+        )
+        return new_task
+
+    def add_tasks(self, tasks: Iterable[Task], ids: Dict[int, int]) -> None:
+        """Add tasks from another task list, giving them new IDs.
 
-        if parent is not None:
-            self.get_task(parent).children.append(new_task)
+        This is much faster than adding the tasks one at a time because they
+        aren't recorded in `changes`, which would also take more memory than
+        the tasks themselves. Instead, the whole task list is written the next
+        time it's saved.
 
-        return new_task
+        Args:
+            tasks: The tasks to add, without sub-tasks, each after its parent.
+                Their IDs and the IDs of their parents are the ones they had
+                in the other task list. Tasks with an ID of None can't be
+                parents.
+            ids: The new IDs of the tasks already added from the other task
+                list, by their old IDs. The added tasks are added to it, so it
+                can be passed again with the next batch of tasks.
+
+        Throws:
+            KeyError: The parent of a task hasn't been added.
+        """
+        for task in tasks:
+            parent = None if task.parent is None else ids[task.parent]
+            old_id = task.task_id
+
+            task.task_id = self._find_id()
+            task.parent = parent
+            self._insert_task(task)
+            self._rewrite = True
+
+            # The descendants of the added tasks are counted when first
+            # needed instead of updating the counts of every ancestor of
+            # every task.
+            task._descendants = task._incomplete_descendants = None
+
+            if old_id is not None:
+                ids[old_id] = task.task_id
+
+    def _insert_task(self, task: Task) -> None:
+        """Insert a task with no children, keeping its ID."""
+        parent_task = None if task.parent is None else self.get_task(task.parent)
+
+        self._task_index[task.task_id] = task
+
+        # Mark any IDs skipped over by this task as unused. The unused IDs of
+        # a lazily-loaded task list are found once every task is built.
+        if self._root_records is None:
+            for task_id in range(self._next_id, task.task_id):
+                heapq.heappush(self._free_ids, task_id)
+            self._next_id = max(self._next_id, task.task_id + 1)
+
+        if parent_task is not None:
+            parent_task._add_child(task)
+            if self._root_records is not None:
+                self._changed_tasks[parent_task.task_id] = parent_task
+        elif self._root_task_index is None:
+            self._added_root_tasks[task.task_id] = task
+        else:
+            self._root_task_index[task.task_id] = task
+
+        self._index_task(task)
+        self._update_ancestor_counts(
+            task, 1 + task.descendant_count,
+            (not task.completed) + task.incomplete_descendant_count
+        )
+
+    def _update_ancestor_counts(
+            self, task: Task, descendants: int, incomplete_descendants: int
+    ) -> None:
+        """Adjust the cached descendant counts of the ancestors of a task."""
+        parent_id = task.parent
+
+        while parent_id is not None:
+            parent_task = self.get_task(parent_id)
+
+            # The ancestors of a task whose descendants haven't been counted
+            # haven't been counted either, except in a lazily-loaded task list,
+            # where they may have been counted from the records in between.
+            if parent_task._descendants is None and self._root_records is None:
+                break
+            parent_task._add_to_counts(descendants, incomplete_descendants)
+            parent_id = parent_task.parent
 
     def remove_all_tasks(self) -> None:
-        self._tasks.clear()
+        """Remove every task from this task list."""
+        if not self._root_tasks:
+            return
+
+        self._changes.append({"op": "clear"})
+        self._root_records = None
+        self._record_index = None
+        self._record_lookup = None
+        self._changed_tasks.clear()
+        self._record_counts.clear()
+        self._task_index.clear()
+        self._root_task_index = {}
+        self._added_root_tasks.clear()
+        self._sibling_orders.clear()
+        self._free_ids.clear()
+        self._next_id = 0
+
+        # Keep empty indexes in place of any that were built, since pipelines
+        # only use indexes that have already been built.
+        if self._index is not None:
+            self._index = TaskIndex()
+        self._text_indexes = {
+            attribute: TextIndex() for attribute in self._text_indexes
+        }
 
     def remove_task(self, task_id: int) -> Task:
-        """Remove the task with the given ID and return it."""
+        """Remove the task with the given ID and all of its sub-tasks.
+
+        Returns:
+            The removed task. Its sub-tasks are still attached to it.
+        """
         task = self.get_task(task_id)
-        parent_task = self.get_parent(task_id)
+        self._detach_task(task)
 
-        if parent_task is not None:
-            parent_task.children.remove(task)
-        return self._tasks.pop(task_id)
+        # Drop the task and its descendants from the index in a single pass.
+        tasks = self._tasks
+        for sub_task in self._walk_tasks([task]):
+            del tasks[sub_task.task_id]
+            self._release_id(sub_task.task_id)
+            self._unindex_task(sub_task)
+
+        self._changes.append({"op": "remove", "id": task_id})
+        return task
+
+    def _detach_task(self, task: Task) -> None:
+        """Remove a task from the sub-tasks of its parent."""
+        self._update_ancestor_counts(
+            task, -1 - task.descendant_count,
+            -(not task.completed) - task.incomplete_descendant_count
+        )
+
+        if task.parent is None:
+            del self._root_tasks[task.task_id]
+        else:
+            self.get_task(task.parent)._remove_child(task)
 
     def get_task(self, task_id: int) -> Task:
         """Return the task in this task list with the given ID."""
+        if self._root_records is not None:
+            # Only build the requested task if the task list is lazily loaded.
+            task = self._task_index.get(task_id)
+            if task is None:
+                task = self._load_task(self._find_record(task_id))
+            return task
         return self._tasks[task_id]
 
+    def _has_task(self, task_id: int) -> bool:
+        """Return whether this task list has a task with the given ID,
+        without building every task of a lazily-loaded task list."""
+        try:
+            self.get_task(task_id)
+        except KeyError:
+            return False
+        return True
+
     def get_parent(self, task_id: int) -> Optional[Task]:
         """Return the parent task of the task with the given ID."""
         parent_id = self.get_task(task_id).parent
@@ -164,85 +955,215 @@ class TaskList:
                     priority: Optional[str] = None, tag: Optional[str] = None) -> None:
         """Modify a task in the task list."""
         task = self.get_task(task_id)
+        fields = {}
+        self._unindex_task(task, updating=True)
 
         if name is not None:
             task.name = name
+            fields["name"] = name
 
         if description is not None:
             task.description = description
+            fields["description"] = description
 
         if due is not None:
             task.due = due
+            fields["due"] = task.due_timestamp
 
         if priority is not None:
             task.priority = priority
+            fields["priority"] = priority
 
         if tag is not None:
-            task.tags += tag
+            task.tags = [*task.tags, tag]
+            fields["tags"] = list(task.tags)
+
+        self._index_task(task, updating=True)
+        if fields:
+            self._changes.append(
+                {"op": "modify", "id": task_id, "fields": fields}
+            )
+
+    def check_task(self, task_id: int) -> Task:
+        """Mark the task with the given ID as completed and return it."""
+        task = self.get_task(task_id)
+        if not task.completed:
+            self._unindex_task(task, updating=True)
+            task.completed = True
+            self._index_task(task, updating=True)
+            self._update_ancestor_counts(task, 0, -1)
+            self._changes.append({"op": "check", "id": task_id})
+        return task
+
+    def uncheck_task(self, task_id: int) -> Task:
+        """Mark the task with the given ID as not completed and return it."""
+        task = self.get_task(task_id)
+        if task.completed:
+            self._unindex_task(task, updating=True)
+            task.completed = False
+            self._index_task(task, updating=True)
+            self._update_ancestor_counts(task, 0, 1)
+            self._changes.append({"op": "uncheck", "id": task_id})
+        return task
+
+    def apply_change(self, change: Dict[str, Any]) -> None:
+        """Apply a change recorded in `changes` to this task list.
+
+        Changes are applied such that applying one that is already reflected
+        in this task list has no effect. This makes it safe to replay a journal
+        over a snapshot that already includes some of it. The change is not
+        recorded in `changes` again.
+        """
+        op = change["op"]
+        change_count = len(self._changes)
+
+        # Skip changes to tasks that a snapshot no longer contains because
+        # they were removed by a later change.
+        if op in ("modify", "check", "uncheck"):
+            if not self._has_task(change["id"]):
+                return
+        elif op == "add":
+            parent = change["task"]["parent"]
+            if parent is not None and not self._has_task(parent):
+                return
+
+        if op == "add":
+            task = self._deserialize_task(change["task"])
+
+            # Move an existing task to the end of its siblings as if it was
+            # being added again, keeping its sub-tasks.
+            if self._has_task(task.task_id):
+                existing_task = self.get_task(task.task_id)
+                self._detach_task(existing_task)
+                del self._task_index[task.task_id]
+                self._unindex_task(existing_task)
+                task.children = existing_task.children
+
+            self._insert_task(task)
+        elif op == "remove":
+            if change["id"] in self._tasks:
+                self.remove_task(change["id"])
+        elif op == "modify":
+            fields = change["fields"]
+            self.modify_task(
+                change["id"], name=fields.get("name"),
+                description=fields.get("description"),
+                due=fields.get("due"),
+                priority=fields.get("priority")
+            )
+            if "tags" in fields:
+                task = self.get_task(change["id"])
+                self._unindex_task(task, updating=True)
+                task.tags = list(fields["tags"])
+                self._index_task(task, updating=True)
+        elif op == "check":
+            self.check_task(change["id"])
+        elif op == "uncheck":
+            self.uncheck_task(change["id"])
+        elif op == "clear":
+            self.remove_all_tasks()
+        else:
+            raise ValueError(f"Unknown change '{op}'.")
+
+        del self._changes[change_count:]
 
     @classmethod
     def _serialize_task(cls, task: Task) -> Dict[str, Any]:
         """Convert a task to a JSON-compatible dictionary."""
-        return {
-            "name": task.name,
-            "id": task.task_id,
-            "completed": task.completed,
-            "created": task.created.timestamp(),
-            "parent": task.parent,
-            "children": [
-                cls._serialize_task(sub_task) for sub_task in task.children
-            ],
-            "due": None if task.due is None else task.due.timestamp(),
-            "description": task.description,
-            "priority": task.priority,
-            "tags": task.tags
-        }
+        json_tasks: Dict[int, Dict[str, Any]] = {}
+
+        for sub_task in walk_preorder([task], _get_children):
+            json_task = {
+                "name": sub_task.name,
+                "id": sub_task.task_id,
+                "completed": sub_task.completed,
+                "created": sub_task.created_timestamp,
+                "parent": sub_task.parent,
+                "children": [],
+                "due": sub_task.due_timestamp,
+                "description": sub_task.description,
+                "priority": sub_task.priority,
+                "tags": list(sub_task.tags)
+            }
+
+            json_tasks[sub_task.task_id] = json_task
+            if sub_task is not task:
+                json_tasks[sub_task.parent]["children"].append(json_task)
+
+        return json_tasks[task.task_id]
 
     @classmethod
     def _deserialize_task(cls, json_task: Dict[str, Any]) -> Task:
         """Convert a JSON-compatible dictionary to a task."""
-        return Task(
-            name=json_task["name"],
-            task_id=json_task["id"],
-            completed=json_task["completed"],
-            created=datetime.datetime.fromtimestamp(json_task["created"]),
-            parent=json_task["parent"],
-            children=[
-                cls._deserialize_task(sub_task)
-                for sub_task in json_task["children"]
-            ],
-            due=(
-                None if json_task["due"] is None
-                else datetime.datetime.fromtimestamp(json_task["due"])
-            ),
-            description=json_task["description"],
-            priority=json_task["priority"],
-            tags=(
-                None if json_task["tags"] is None
-                else json_task["tags"]
+        tasks: Dict[int, Task] = {}
+        sub_tasks: Dict[int, List[Task]] = {}
+
+        for json_sub_task in walk_preorder([json_task], _get_json_children):
+            task = Task(
+                name=json_sub_task["name"],
+                task_id=json_sub_task["id"],
+                completed=json_sub_task["completed"],
+                created=json_sub_task["created"],
+                parent=json_sub_task["parent"],
+                due=json_sub_task["due"],
+                description=json_sub_task["description"],
+                priority=json_sub_task["priority"],
+                tags=json_sub_task["tags"]
             )
-        )
 
-    def save(self, path: Path) -> None:
+            tasks[task.task_id] = task
+            if json_sub_task is not json_task:
+                sub_tasks.setdefault(task.parent, []).append(task)
+
+        for task_id, children in sub_tasks.items():
+            tasks[task_id].children = children
+
+        return tasks[json_task["id"]]
+
+    def save(self, path: Path, incremental: bool = False) -> None:
         """Save this task list to the file system.
 
+        The file format is chosen based on the extension of the path. See
+        `todo.storage.get_backend`.
+
         Args:
             path: The path of the file to save this task list to.
+            incremental: Only write the changes made since this task list was
+                loaded from the same path. They are applied to the file by the
+                storage backend if it supports that, or appended to the
+                journal of the file otherwise. The whole task list is written
+                anyway if tasks were added with `add_tasks`.
         """
-        json_object = {
-            "name": self.name,
-            "tasks": [self._serialize_task(task) for task in self.tasks]
-        }
+        backend = get_backend(path)
+        journal = Journal(path)
+
+        if incremental and not self._rewrite and backend.update(
+                path, self._changes
+        ):
+            pass
+        elif incremental and not self._rewrite and journal.size() < max(
+                JOURNAL_COMPACTION_SIZE, path.stat().st_size
+        ):
+            journal.append(self._changes)
+        else:
+            json_object = {
+                "name": self.name,
+                "tasks": [self._serialize_task(task) for task in self.tasks]
+            }
 
-        # Create the parent directory if it doesn't already exist.
-        path.parent.mkdir(parents=True, exist_ok=True)
+            backend.write(path, json_object)
 
-        with path.open("w") as file:
-            json.dump(json_object, file, indent=JSON_INDENT)
+            # The journal is included in the new snapshot.
+            journal.clear()
+
+        self._changes = []
+        self._rewrite = False
 
     @classmethod
     @contextlib.contextmanager
-    def load(cls, path: Path) -> "TaskList":
+    def load(
+            cls, path: Path, read_only: bool = False, lazy: bool = False
+    ) -> "TaskList":
         """Load a task list from the file system.
 
         This method is a context manager. That means that it can be used in a
@@ -254,21 +1175,86 @@ class TaskList:
         >>> with TaskList.load(TODO_DIRECTORY / "tasks.json") as task_list:
         >>>     task_list.add_task("Add documentation")
 
+        The task list is only written back if it was changed, and only if the
+        `with` block finishes without raising an exception. This makes each
+        `with` block a single all-or-nothing transaction.
+
+        Any changes in the journal of the file are replayed on top of it, and
+        changes are saved by appending them to the journal when the storage
+        backend can't apply them in place. See `todo.storage.Journal`.
+
+        The task list file is locked for the duration of the `with` block, so
+        other processes loading the same file wait until it has been saved.
+
+        If the task list is resident in memory, it is used instead of reading
+        the file, and saving it is left to whatever keeps it there. If the
+        `with` block raises, its changes are undone by saving the ones made
+        before it and reloading the task list from the file.
+
         Args:
             path: The path of the file to load this task list from.
+            read_only: Never save the task list, even if it was changed. Use
+                this for commands that only read tasks.
+            lazy: Only build tasks, their dates and their lists of sub-tasks
+                when they are accessed. This makes commands that only look at
+                a few tasks faster on large task lists. Everything is built
+                as soon as tasks are added or removed.
         """
-        with path.open() as file:
-            json_object = json.load(file)
-
-        task_list = cls(
-            name=json_object["name"],
-            tasks=[
-                cls._deserialize_task(json_task)
-                for json_task in json_object["tasks"]
-            ]
-        )
+        resident = cls.resident.get(path)
+        if resident is not None:
+            change_count = len(resident._changes)
+            rewrite = resident._rewrite
+            try:
+                yield resident
+            except BaseException:
+                if (
+                        len(resident._changes) > change_count
+                        or resident._rewrite != rewrite
+                ):
+                    # Only the earlier changes can be saved, so they are
+                    # never compacted into a snapshot of the current tasks.
+                    changes = resident._changes[:change_count]
+                    with lock(path):
+                        if changes and not get_backend(path).update(
+                                path, changes
+                        ):
+                            Journal(path).append(changes)
+
+                    del cls.resident[path]
+                    with cls.load(path, read_only=True) as task_list:
+                        # Rebuild the indexes that were built, since
+                        # pipelines only use indexes that already exist.
+                        if resident.indexed:
+                            task_list.index
+                        for attribute in resident._text_indexes:
+                            task_list.text_index(attribute)
+                        cls.resident[path] = task_list
+                raise
+            return
+
+        with lock(path, shared=read_only):
+            backend = get_backend(path)
+
+            if lazy:
+                json_object = backend.read_lazy(path)
+                task_list = cls(name=json_object["name"])
+                task_list._root_records = json_object["tasks"]
+                task_list._record_lookup = json_object.get("records")
+                task_list._root_task_index = None
+            else:
+                json_object = backend.read(path)
+                task_list = cls(
+                    name=json_object["name"],
+                    tasks=[
+                        cls._deserialize_task(json_task)
+                        for json_task in json_object["tasks"]
+                    ]
+                )
+
+            for change in Journal(path).read():
+                task_list.apply_change(change)
 
-        try:
             yield task_list
-        finally:
-            task_list.save(path)
+
+            if not read_only and task_list.dirty:
+                task_list.save(path, incremental=True)
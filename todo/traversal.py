@@ -0,0 +1,84 @@
+"""Functions for traversing trees of tasks without recursion.
+
+Task lists can be nested arbitrarily deeply, so these functions keep their own
+stack instead of recursing once per level, which would fail with a
+`RecursionError` once the nesting gets deeper than Python's recursion limit.
+
+Each function takes the nodes to start from and a function that returns the
+children of a node. This allows them to walk both tasks and serialized tasks,
+and to sort or filter the children at every level.
+"""
+import math
+from typing import Callable, Iterable, Iterator, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def walk_preorder(
+        nodes: Iterable[T], children: Callable[[T], Iterable[T]]
+) -> Iterator[T]:
+    """Return a generator for iterating nodes, each followed by its descendants.
+
+    Args:
+        nodes: The nodes to start from.
+        children: A function returning the children of a node.
+    """
+    for node, _ in walk_with_depth(nodes, children):
+        yield node
+
+
+def walk_postorder(
+        nodes: Iterable[T], children: Callable[[T], Iterable[T]]
+) -> Iterator[T]:
+    """Return a generator for iterating nodes, each preceded by its descendants.
+
+    Args:
+        nodes: The nodes to start from.
+        children: A function returning the children of a node.
+    """
+    # Each entry is a node and an iterator over the children of it that haven't
+    # been visited yet. The bottom entry is a placeholder for the given nodes.
+    stack = [(None, iter(nodes))]
+
+    while stack:
+        node, remaining_children = stack[-1]
+
+        for child in remaining_children:
+            stack.append((child, iter(children(child))))
+            break
+        else:
+            stack.pop()
+            if stack:
+                yield node
+
+
+def walk_with_depth(
+        nodes: Iterable[T], children: Callable[[T], Iterable[T]],
+        max_depth: float = math.inf
+) -> Iterator[Tuple[T, int]]:
+    """Return a generator for iterating nodes in pre-order with their depth.
+
+    The children of a node are only requested once the node has been yielded,
+    and nodes are yielded as soon as they are reached, so this can be used to
+    stream a tree that is built lazily.
+
+    Args:
+        nodes: The nodes to start from. These have a depth of 1.
+        children: A function returning the children of a node.
+        max_depth: Don't descend into nodes at this depth.
+
+    Yields:
+        Each node and its depth.
+    """
+    # Iterators over the nodes at each level that haven't been visited yet.
+    stack = [iter(nodes)]
+
+    while stack:
+        for node in stack[-1]:
+            yield node, len(stack)
+
+            if len(stack) < max_depth:
+                stack.append(iter(children(node)))
+            break
+        else:
+            stack.pop()